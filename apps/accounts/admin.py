@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser, DoctorProfile, PatientProfile, Specialization
+from . import search
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -22,12 +23,25 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Doctors are also found by the full-text index: specializations, clinic and bio
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search.match_expression(search_term):
+            results = results | queryset.filter(pk__in=search.matching(search_term))
+        return results, may_have_duplicates
+
 
 @admin.register(DoctorProfile)
 class DoctorProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'license_number', 'years_experience')
     search_fields = ('user__fullname', 'license_number')
 
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search.match_expression(search_term):
+            results = results | queryset.filter(user_id__in=search.matching(search_term))
+        return results, may_have_duplicates
+
 @admin.register(PatientProfile)
 class PatientProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'insurance_details', 'emergency_contact')
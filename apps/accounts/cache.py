@@ -0,0 +1,252 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+class TTLCache:
+    """
+    Small thread-safe, size-bounded mapping whose entries expire after ``ttl`` seconds.
+    The least recently used entry is evicted once ``maxsize`` is reached.
+    """
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= self.timer():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ================================= authenticated user cache ======================================
+
+USER_VERSION_KEY = 'accounts:user-version:{}'
+
+_users = TTLCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_MAX_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def _user_version(user_id):
+    """
+    Version stamp of a user, kept in the default Django cache so that a save in one
+    worker retires the entries cached by every other worker. That only holds when the
+    default cache is shared; the LocMemCache backend is per process, and other workers
+    then keep their copy until AUTH_USER_CACHE_TTL expires.
+    """
+    return cache.get(USER_VERSION_KEY.format(user_id))
+
+
+def get_cached_user(user_model, user_id):
+    """
+    Return a fresh user instance rebuilt from the cached row, or None on a miss.
+    """
+    row = _users.get((user_id, _user_version(user_id)))
+    if row is None:
+        return None
+    field_names, values = row
+    return user_model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+def cache_user(user):
+    """
+    Store the concrete field values of ``user``. Instances are never shared between
+    requests; each hit builds a new one with ``from_db``.
+    """
+    fields = user._meta.concrete_fields
+    row = (
+        [f.attname for f in fields],
+        [getattr(user, f.attname) for f in fields],
+    )
+    _users.set((user.pk, _user_version(user.pk)), row)
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached row for ``user_id`` here and bump its version for other workers, now
+    and again when the current transaction commits: a request that loaded the old row in
+    between may have cached it under the new version.
+    """
+    _retire_user(user_id)
+    transaction.on_commit(lambda: _retire_user(user_id))
+
+
+def _retire_user(user_id):
+    _users.pop((user_id, _user_version(user_id)))
+    cache.set(USER_VERSION_KEY.format(user_id), secrets.token_hex(8), timeout=None)
+
+
+# ================================= rendered response cache ======================================
+
+class ResponseCache:
+    """
+    Two-tier cache of rendered JSON bodies, grouped so that signals can evict a whole group.
+
+    Every key embeds the group's generation stamp, stored in the shared tier
+    (``settings.RESPONSE_CACHE_ALIAS``). Invalidating a group replaces the stamp, which
+    retires the entries of every worker at once; stale bodies simply age out.
+    """
+    GENERATION_KEY = 'response-cache:gen:{}'
+    ENTRY_KEY = 'response-cache:{}:{}:{}'
+
+    def __init__(self):
+        self.local = TTLCache(
+            maxsize=getattr(settings, 'RESPONSE_CACHE_LOCAL_MAX_SIZE', 256),
+            ttl=getattr(settings, 'RESPONSE_CACHE_LOCAL_TTL', 30),
+        )
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+    def key(self, group, key):
+        """
+        Entry key for ``key`` under the current generation of ``group``. Callers take it
+        before building the body, so an invalidation that lands while the body is built
+        retires it. A body built from rows read before a write committed can still be stored
+        under the new generation; ``invalidate`` bumps it again on commit for that reason.
+        """
+        generation = self.shared.get(self.GENERATION_KEY.format(group))
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return self.ENTRY_KEY.format(group, generation, digest)
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def get(self, entry_key):
+        """
+        Return the cached body as ``(content, headers)``, or None on a miss.
+        """
+        value = self.local.get(entry_key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        value = self.shared.get(entry_key)
+        if value is not None:
+            self._count('shared_hits')
+            self.local.set(entry_key, value)
+            return value
+        self._count('misses')
+        return None
+
+    def set(self, entry_key, value):
+        self.local.set(entry_key, value)
+        self.shared.set(entry_key, value, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+    def invalidate(self, *groups):
+        """
+        Replace the generation of ``groups`` now and once more when the current transaction
+        commits, retiring anything other workers stored while the change was uncommitted.
+        """
+        self._bump(groups)
+        transaction.on_commit(lambda: self._bump(groups))
+        for group in groups:
+            self._count('invalidations')
+
+    def _bump(self, groups):
+        for group in groups:
+            self.shared.set(self.GENERATION_KEY.format(group), secrets.token_hex(8), timeout=None)
+
+    def reset_stats(self):
+        with self._lock:
+            self.counters = dict.fromkeys(('local_hits', 'shared_hits', 'misses', 'invalidations'), 0)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous JSON GET requests from ``response_cache``.
+    Views set ``cache_group``; the signals in signals.py evict it when the data changes.
+    """
+    cache_group = None
+    cached_headers = ('Content-Type', 'Vary', 'Cache-Control', 'ETag', 'Last-Modified')
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self._is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        entry_key = response_cache.key(self.cache_group, request.build_absolute_uri())
+        cached = response_cache.get(entry_key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if (
+            response.status_code == 200
+            and isinstance(response, Response)
+            and getattr(response, 'accepted_renderer', None) is not None
+            and response.accepted_renderer.format == 'json'
+        ):
+            response.render()
+            headers = {h: response[h] for h in self.cached_headers if h in response}
+            response_cache.set(entry_key, (response.content, headers))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def _is_cacheable(self, request):
+        # Authenticated, conditional and browsable-API requests always go through the view
+        return (
+            request.method == 'GET'
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and 'HTTP_IF_NONE_MATCH' not in request.META
+            and 'HTTP_IF_MODIFIED_SINCE' not in request.META
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+            and request.GET.get('format') in (None, 'json')
+        )
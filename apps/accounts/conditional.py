@@ -0,0 +1,51 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """
+    Strong ETag built from cheap validator parts (ids, counts, timestamps, query strings).
+    """
+    raw = ':'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_get(validators):
+    """
+    Decorator for DRF GET handlers.
+
+    ``validators(view, request, *args, **kwargs)`` returns ``(etag, last_modified)``
+    computed without serializing anything (e.g. from ``max(updated_at)`` and a row count).
+    When If-None-Match / If-Modified-Since match, a 304 is returned and the handler is
+    never called. Otherwise the handler runs and the validators are added to its response.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = validators(view, request, *args, **kwargs)
+            # HTTP dates have whole seconds; a fractional timestamp would never match If-Modified-Since
+            last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+            response = None
+            if etag or last_modified_ts:
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if etag:
+                    response['ETag'] = etag
+                if last_modified_ts:
+                    response['Last-Modified'] = http_date(last_modified_ts)
+
+            # Make browsers revalidate on every fetch instead of reusing a heuristically fresh copy
+            patch_cache_control(response, no_cache=True)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
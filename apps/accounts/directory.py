@@ -0,0 +1,75 @@
+"""
+Denormalized doctor directory.
+
+DoctorDirectoryEntry holds one row per doctor with the doctor's complete public
+representation (user fields, profile and specializations, exactly as CustomUserSerializer
+renders them), so the directory, profile and search endpoints read one row per doctor
+instead of joining the user, profile and specialization tables and serializing the result.
+
+The signals in signals.py call doctors_changed() for every write to those tables, inside
+the writing transaction; it refreshes the entries and the full-text index (search.py)
+together. Writes that touch a doctor several times in a row (registration, profile
+updates) wrap them in deferred() so the doctor is refreshed once, at the end.
+"""
+import threading
+from contextlib import contextmanager
+
+from . import search
+from .models import CustomUser, DoctorDirectoryEntry
+
+_local = threading.local()
+
+
+def doctors_changed(user_ids):
+    """
+    Bring the directory entries and search index of these users up to date: doctors are
+    re-rendered, anyone else is removed.
+    """
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(user_ids)
+    else:
+        refresh(user_ids)
+
+
+def refresh(user_ids):
+    from .serializers import CustomUserSerializer
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    doctors = CustomUser.objects.filter(pk__in=user_ids, role='doctor').select_related(
+        'doctor_profile'
+    ).prefetch_related('doctor_profile__specializations')
+    entries = [
+        DoctorDirectoryEntry(
+            id=doctor.pk,
+            profile_id=getattr(getattr(doctor, 'doctor_profile', None), 'pk', None),
+            data=CustomUserSerializer(doctor).data,
+        )
+        for doctor in doctors
+    ]
+    DoctorDirectoryEntry.objects.filter(pk__in=user_ids - {entry.pk for entry in entries}).delete()
+    DoctorDirectoryEntry.objects.bulk_create(
+        entries, update_conflicts=True, unique_fields=['id'], update_fields=['profile_id', 'data', 'updated_at']
+    )
+    search.index_doctors(user_ids)
+
+
+@contextmanager
+def deferred():
+    """
+    Collect the doctors changed inside the block and refresh each of them once when it
+    ends. Nothing is refreshed if the block raises, since its transaction rolls back.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        # Already deferring: the outermost block refreshes
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    refresh(pending)
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.accounts.authentication import CachedJWTAuthentication
+from apps.accounts.models import CustomUser
+from apps.accounts.views import UserProfileView
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency per request for JWTAuthentication and CachedJWTAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                email='bench-auth@example.com', username='bench-auth', password='Bench-pass-1', role='patient'
+            )
+            token = str(RefreshToken.for_user(user).access_token)
+            for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+                self.run(auth_class, token, options['requests'])
+            transaction.set_rollback(True)
+
+    def run(self, auth_class, token, count):
+        view = UserProfileView.as_view(authentication_classes=[auth_class])
+        factory = APIRequestFactory()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            for _ in range(count):
+                request = factory.get('/api/profile/', HTTP_AUTHORIZATION=f'Bearer {token}')
+                response = view(request)
+                assert response.status_code == 200, response.status_code
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{auth_class.__name__:<26} {len(ctx.captured_queries) / count:5.2f} queries/request  "
+            f"{elapsed / count * 1000:7.3f} ms/request"
+        )
@@ -0,0 +1,101 @@
+import random
+import statistics
+import time as timer
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts import directory
+from apps.accounts.models import CustomUser, DoctorProfile, Specialization
+from apps.accounts.views import DoctorSearchView
+
+FIRST_NAMES = ['Asha', 'Ravi', 'Meera', 'Arjun', 'Kavya', 'Vikram', 'Nisha', 'Rohan', 'Priya', 'Sameer']
+LAST_NAMES = ['Sharma', 'Menon', 'Iyer', 'Kapoor', 'Das', 'Rao', 'Singh', 'Gupta', 'Nair', 'Bose']
+SPECIALIZATIONS = [
+    'Cardiology', 'Neurology', 'Dermatology', 'Orthopedics', 'Pediatrics',
+    'Oncology', 'Psychiatry', 'Radiology', 'Urology', 'Nephrology',
+]
+CITIES = ['Delhi', 'Mumbai', 'Pune', 'Chennai', 'Kolkata', 'Jaipur', 'Lucknow', 'Kochi', 'Indore', 'Bhopal']
+
+
+class Command(BaseCommand):
+    help = "Time the full-text doctor search endpoint at several doctor counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help="Comma-separated doctor counts.")
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        for size in [int(value) for value in options['sizes'].split(',')]:
+            # Each size is seeded inside a transaction that is rolled back afterwards
+            with transaction.atomic():
+                doctor = self.seed(size)
+                self.report(size, doctor, options['runs'])
+                transaction.set_rollback(True)
+
+    def seed(self, size):
+        rng = random.Random(0)
+        specializations = [Specialization.objects.get_or_create(name=name)[0] for name in SPECIALIZATIONS]
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    email=f'bench-doctor{n}@example.com', username=f'bench-doctor{n}', role='doctor', password='!',
+                    fullname=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {n}',
+                    bio=f'Consultant with {rng.randint(1, 30)} years of practice in {rng.choice(CITIES)}.',
+                )
+                for n in range(size)
+            ],
+            batch_size=2000,
+        )
+        profiles = DoctorProfile.objects.bulk_create(
+            [
+                DoctorProfile(
+                    user=user, license_number=f'BENCH-{user.pk}',
+                    clinic_name=f'{rng.choice(CITIES)} Care Clinic', clinic_address=f'{n} Main Road, {rng.choice(CITIES)}',
+                )
+                for n, user in enumerate(users)
+            ],
+            batch_size=2000,
+        )
+        Through = DoctorProfile.specializations.through
+        Through.objects.bulk_create(
+            [
+                Through(doctorprofile_id=profile.pk, specialization_id=specialization.pk)
+                for profile in profiles
+                for specialization in rng.sample(specializations, 2)
+            ],
+            batch_size=5000,
+        )
+        # bulk_create sends no signals, so build the directory entries and index directly
+        ids = [user.pk for user in users]
+        for start in range(0, len(ids), 1000):
+            directory.refresh(ids[start:start + 1000])
+        # With DEBUG on, the seeding inserts would otherwise fill the bounded query log
+        connection.queries_log.clear()
+        return users[size // 2]
+
+    def report(self, size, doctor, runs):
+        scenarios = {
+            'one doctor': doctor.fullname,
+            'rare prefix': 'nephro jaip',
+            'specialization': 'cardio',
+            'common prefix': 'car',
+            'short word': 'ca',
+        }
+        view = DoctorSearchView.as_view()
+        factory = APIRequestFactory()
+        for name, query in scenarios.items():
+            timings = []
+            for _ in range(runs):
+                request = factory.get('/api/doctors/search/', {'q': query}, HTTP_HOST='localhost')
+                started = timer.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((timer.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+            timings.sort()
+            self.stdout.write(
+                f"{size:>7} doctors, {name:<15} {query!r:<20} median {statistics.median(timings):7.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms, {len(response.data['results'])} results"
+            )
@@ -0,0 +1,25 @@
+import time as timer
+
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import PasswordResetOTP
+
+
+class Command(BaseCommand):
+    help = "Delete expired password reset OTPs in batches. Safe to run from cron at any frequency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        deleted = batches = 0
+        while True:
+            count = PasswordResetOTP.objects.purge(options['batch_size'])
+            if not count:
+                break
+            deleted += count
+            batches += 1
+            if options['pause']:
+                timer.sleep(options['pause'])
+        self.stdout.write(f"Deleted {deleted} password reset OTPs in {batches} batches.")
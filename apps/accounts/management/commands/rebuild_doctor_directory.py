@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.accounts import directory, search
+from apps.accounts.models import CustomUser, DoctorDirectoryEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild the doctor directory entries and the full-text doctor search index from the doctor tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        doctor_ids = list(CustomUser.objects.filter(role='doctor').order_by('id').values_list('id', flat=True))
+        with transaction.atomic():
+            DoctorDirectoryEntry.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {search.TABLE}')
+            for start in range(0, len(doctor_ids), options['batch_size']):
+                directory.refresh(doctor_ids[start:start + options['batch_size']])
+            with connection.cursor() as cursor:
+                # Merge the index segments written batch by batch
+                cursor.execute(f"INSERT INTO {search.TABLE} ({search.TABLE}) VALUES ('optimize')")
+        self.stdout.write(f"Rebuilt the directory entries and search index of {len(doctor_ids)} doctors.")
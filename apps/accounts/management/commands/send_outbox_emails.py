@@ -0,0 +1,41 @@
+import time as timer
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the queued outbox emails in batches over one mail connection, retrying failures with "
+        "exponential backoff. Runs until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the emails due now and exit (for cron).")
+        parser.add_argument('--interval', type=float, default=2, help="Seconds between polls of an empty outbox.")
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = OutboxEmail.objects.send_batch(connection, options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+                    continue
+                if options['once']:
+                    break
+                # Nothing due: let the server drop the idle session rather than time it out
+                connection.close()
+                timer.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+        self.stdout.write(f"Sent {total_sent} emails, {total_failed} failed.")
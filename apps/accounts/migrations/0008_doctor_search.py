@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_password_reset_otp_indexes'),
+    ]
+
+    operations = [
+        # See apps/accounts/search.py; the prefix indexes serve two- and three-letter typeahead terms
+        migrations.RunSQL(
+            """
+            CREATE VIRTUAL TABLE accounts_doctor_search USING fts5(
+                fullname, specializations, clinic_name, clinic_address, bio,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """,
+            'DROP TABLE accounts_doctor_search',
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO accounts_doctor_search (rowid, fullname, specializations, clinic_name, clinic_address, bio)
+            SELECT u.id, u.fullname,
+                   (SELECT group_concat(s.name, ' ')
+                      FROM accounts_doctorprofile_specializations ds
+                      JOIN accounts_specialization s ON s.id = ds.specialization_id
+                     WHERE ds.doctorprofile_id = p.id),
+                   p.clinic_name, p.clinic_address, u.bio
+              FROM accounts_customuser u
+              LEFT JOIN accounts_doctorprofile p ON p.user_id = u.id
+             WHERE u.role = 'doctor'
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+
+def build_directory(apps, schema_editor):
+    # A frozen copy of the CustomUserSerializer output as of this migration; later changes
+    # to the serializer are picked up by manage.py rebuild_doctor_directory
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    DoctorDirectoryEntry = apps.get_model('accounts', 'DoctorDirectoryEntry')
+    DoctorProfile = apps.get_model('accounts', 'DoctorProfile')
+    doctors = CustomUser.objects.filter(role='doctor').order_by('pk')
+    for start in range(0, doctors.count(), 500):
+        batch = list(doctors[start:start + 500])
+        profiles = DoctorProfile.objects.filter(user__in=batch).prefetch_related('specializations').in_bulk(
+            field_name='user_id'
+        ) if batch else {}
+        entries = []
+        for doctor in batch:
+            profile = profiles.get(doctor.pk)
+            entries.append(DoctorDirectoryEntry(
+                id=doctor.pk,
+                profile_id=profile.pk if profile else None,
+                data={
+                    'username': doctor.username,
+                    'email': doctor.email,
+                    'phone': doctor.phone,
+                    'gender': doctor.gender,
+                    'date_of_birth': doctor.date_of_birth.isoformat() if doctor.date_of_birth else None,
+                    'address': doctor.address,
+                    'bio': doctor.bio,
+                    'profile_photo': doctor.profile_photo,
+                    'role': doctor.role,
+                    'doctor_profile': {
+                        'license_number': profile.license_number,
+                        'specialization_details': [
+                            {'id': specialization.pk, 'name': specialization.name}
+                            for specialization in sorted(profile.specializations.all(), key=lambda s: s.pk)
+                        ],
+                        'years_experience': profile.years_experience,
+                        'clinic_name': profile.clinic_name,
+                        'clinic_address': profile.clinic_address,
+                    } if profile else None,
+                },
+            ))
+        DoctorDirectoryEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_doctor_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDirectoryEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('profile_id', models.BigIntegerField(blank=True, null=True, unique=True)),
+                ('data', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_directory, migrations.RunPython.noop),
+    ]
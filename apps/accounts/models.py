@@ -1,10 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import RegexValidator, EmailValidator
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from django.db import connections, transaction
 from django.utils import timezone
 from datetime import timedelta
 import random
+from .cache import invalidate_user
 
 
 class CustomUserManager(BaseUserManager):
@@ -78,6 +80,17 @@ class CustomUser(AbstractUser):
             models.Index(fields=["phone"]),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # The role as stored, so the save signals can tell when a doctor stops being one
+        user.stored_role = user.__dict__.get('role')
+        return user
+
+    @property
+    def is_or_was_doctor(self):
+        return 'doctor' in (self.role, getattr(self, 'stored_role', None))
+
     def save(self, *args, **kwargs):
         if self.role not in ['doctor', 'patient', 'admin']:
             raise ValueError("Invalid role. Must be 'doctor', 'patient', or 'admin'.")
@@ -86,6 +99,15 @@ class CustomUser(AbstractUser):
             self.is_staff = True
             self.is_superuser = True
         super().save(*args, **kwargs)
+        self.stored_role = self.role
+        # Drop the cached copy used by JWT authentication (covers password changes too)
+        invalidate_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_user(user_id)
+        return result
 
 
 class Specialization(models.Model):
@@ -114,6 +136,21 @@ class DoctorProfile(models.Model):
         return f"DoctorProfile: {self.user.fullname}"
 
 
+class DoctorDirectoryEntry(models.Model):
+    """
+    Read model of the doctor directory (see directory.py): one row per doctor with the
+    doctor's rendered user, profile and specialization data.
+    """
+    # The doctor's user id
+    id = models.BigIntegerField(primary_key=True)
+    profile_id = models.BigIntegerField(null=True, blank=True, unique=True)
+    data = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Directory entry: {self.data.get('email')}"
+
+
 class PatientProfile(models.Model):
     """
     Additional fields only for Patients.
@@ -131,31 +168,182 @@ class PatientProfile(models.Model):
         return f"PatientProfile: {self.user.fullname}"
 
 
+class PasswordResetOTPManager(models.Manager):
+    def issue(self, user):
+        """
+        Create a fresh OTP for ``user``, replacing any outstanding one.
+        """
+        self.filter(user=user, is_verified=False).delete()
+        otp = self.model(user=user)
+        otp.generate_otp()
+        return otp
+
+    def find(self, email, otp):
+        """
+        The user's newest unverified OTP with this code (with the user loaded), or None.
+        One query: the email index finds the user, (user, otp) finds the code.
+        """
+        return (
+            self.select_related('user')
+            .filter(user__email=email, otp=otp, is_verified=False)
+            .order_by('-created_at')
+            .first()
+        )
+
+    def purge(self, batch_size=1000, now=None):
+        """
+        Delete one batch of expired OTPs, found through the created_at index. Returns the
+        number deleted. A used OTP is deleted by the password reset itself; verified rows
+        left behind go once they expire, like the rest.
+        """
+        cutoff = (now or timezone.now()) - PasswordResetOTP.LIFETIME
+        ids = list(self.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        return self.filter(pk__in=ids).delete()[0] if ids else 0
+
+
 class PasswordResetOTP(models.Model):
     """
     OTP for password reset.
     """
+    LIFETIME = timedelta(minutes=10)
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     otp = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
 
+    objects = PasswordResetOTPManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'otp'], name='reset_otp_user_code_idx'),
+            # purge_password_reset_otps finds expired codes without a table scan
+            models.Index(fields=['created_at'], name='reset_otp_created_idx'),
+        ]
+
     def generate_otp(self):
         self.otp = str(random.randint(100000, 999999))  # Generate 6-digit OTP
         self.save()
 
     def is_expired(self):
-        expiration_time = self.created_at + timedelta(minutes=10)  # OTP expires in 10 minutes
+        expiration_time = self.created_at + self.LIFETIME
         return timezone.now() > expiration_time
 
     def send_otp_email(self):
         """
-        Send OTP email to the user.
+        Queue the OTP email to the user; send_outbox_emails delivers it.
         """
-        send_mail(
+        OutboxEmail.objects.enqueue(
             'Password Reset OTP',
             f'Your OTP for password reset is {self.otp}',
-            'from@example.com',
             [self.user.email],
-            fail_silently=False,
+            from_email='from@example.com',
         )
+
+
+class OutboxEmailManager(models.Manager):
+    def enqueue(self, subject, body, to, from_email=None):
+        """
+        Store an email for the outbox worker. One INSERT in the caller's transaction, so the
+        email only goes out if the transaction commits.
+        """
+        return self.create(subject=subject, body=body, to=list(to), from_email=from_email or '')
+
+    def send_batch(self, connection, batch_size=50, now=None):
+        """
+        Send up to ``batch_size`` due emails over ``connection``, which is opened if needed and
+        left open for the next batch. A failed email is retried after an exponential backoff
+        and given up after MAX_ATTEMPTS. Returns (sent, failed).
+        """
+        now = now or timezone.now()
+        with transaction.atomic(using=self.db):
+            due = self.filter(status='PENDING', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                # Rows another worker is claiming are locked and skipped
+                due = due.select_for_update(skip_locked=True)
+            batch = self.claim(list(due[:batch_size]), now + OutboxEmail.LEASE)
+
+        sent, failed = [], []
+        for email in batch:
+            try:
+                connection.open()
+                connection.send_messages([email.message(connection)])
+            except Exception as exc:
+                # Reconnect for the next email; the SMTP session may be unusable
+                connection.close()
+                failed.append((email, exc))
+            else:
+                sent.append(email.pk)
+
+        if sent:
+            self.filter(pk__in=sent).update(
+                status='SENT', sent_at=timezone.now(), attempts=models.F('attempts') + 1, last_error=''
+            )
+        for email, exc in failed:
+            email.attempts += 1
+            email.last_error = f'{type(exc).__name__}: {exc}'
+            if email.attempts >= OutboxEmail.MAX_ATTEMPTS:
+                email.status = 'FAILED'
+            else:
+                email.next_attempt_at = now + min(OutboxEmail.RETRY_DELAY * 2 ** (email.attempts - 1), OutboxEmail.MAX_RETRY_DELAY)
+            email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+        return len(sent), len(failed)
+
+    def claim(self, emails, lease_until):
+        """
+        Lease ``emails`` until ``lease_until``, so another worker, or this one after a crash,
+        only retries them then. Returns the emails claimed: without row locks another worker
+        may have read the same rows, and each row is only claimed by the UPDATE that still
+        finds it as it was read.
+        """
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            self.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=lease_until)
+            return emails
+        return [
+            email for email in emails
+            if self.filter(pk=email.pk, status='PENDING', next_attempt_at=email.next_attempt_at).update(
+                next_attempt_at=lease_until
+            )
+        ]
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent by manage.py send_outbox_emails, so requests never wait on SMTP.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+
+    # Retries wait RETRY_DELAY, then twice as long each time, up to MAX_RETRY_DELAY
+    MAX_ATTEMPTS = 8
+    RETRY_DELAY = timedelta(seconds=30)
+    MAX_RETRY_DELAY = timedelta(hours=1)
+    LEASE = timedelta(minutes=5)
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxEmailManager()
+
+    class Meta:
+        indexes = [
+            # The worker's queue of due emails
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def message(self, connection=None):
+        return EmailMessage(self.subject, self.body, self.from_email or None, self.to, connection=connection)
+
+    def __str__(self):
+        return f"Email to {', '.join(self.to)}: {self.subject} ({self.status})"
@@ -0,0 +1,11 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DoctorCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, so deep pages cost the same as the first one.
+    """
+    ordering = 'id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,92 @@
+"""
+Full-text doctor search on an SQLite FTS5 table.
+
+accounts_doctor_search holds one row per doctor, keyed by the user id (its rowid), with the
+doctor's name, specialization names, clinic name and address, and bio. The signals in
+signals.py re-index a doctor in the same transaction as any change to those fields, so
+search never sees a half-applied write. manage.py rebuild_doctor_directory rebuilds the
+whole table.
+
+Queries are typeahead-style: every word of the query must match the start of a word in
+the document, and results are ranked with bm25, a name match counting most. Words shorter
+than MIN_PREFIX_LENGTH match whole words only, since a one- or two-letter prefix matches
+most of the directory and ranking all of it is slow.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+TABLE = 'accounts_doctor_search'
+
+# bm25 weights, in column order: fullname, specializations, clinic_name, clinic_address, bio
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 1.0)
+
+MAX_TERMS = 8
+
+MIN_PREFIX_LENGTH = 3
+
+# The indexed text of the doctors in the placeholder list
+DOCUMENTS_SQL = """
+    SELECT u.id, u.fullname,
+           (SELECT group_concat(s.name, ' ')
+              FROM accounts_doctorprofile_specializations ds
+              JOIN accounts_specialization s ON s.id = ds.specialization_id
+             WHERE ds.doctorprofile_id = p.id),
+           p.clinic_name, p.clinic_address, u.bio
+      FROM accounts_customuser u
+      LEFT JOIN accounts_doctorprofile p ON p.user_id = u.id
+     WHERE u.role = 'doctor' AND u.id IN ({})
+"""
+
+
+def match_expression(query):
+    """
+    The FTS5 query for ``query``: each word becomes a quoted prefix term (a whole-word
+    term when shorter than MIN_PREFIX_LENGTH), so user input can never be read as FTS5
+    syntax. Returns '' when the query has no words.
+    """
+    terms = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' if len(term) >= MIN_PREFIX_LENGTH else f'"{term}"' for term in terms)
+
+
+def search(query, limit=20, offset=0):
+    """
+    ``(id, fullname)`` of the doctors matching ``query``, best match first.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, fullname FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY bm25({TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [expression, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def matching(query):
+    """
+    A subquery of the ids of every doctor matching ``query``, unranked, to filter a
+    queryset with ``pk__in``. ``query`` must have a word (see match_expression).
+    """
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [match_expression(query)])
+
+
+def index_doctors(user_ids):
+    """
+    Re-index these users: doctors get their current document, anyone else is removed.
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', user_ids)
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, fullname, specializations, clinic_name, clinic_address, bio) '
+            + DOCUMENTS_SQL.format(placeholders),
+            user_ids,
+        )
@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from . import directory
 from .models import DoctorProfile, PatientProfile, CustomUser, Specialization, PasswordResetOTP
 from django.core.exceptions import ValidationError
 import re
@@ -19,6 +20,18 @@ class SpecializationSerializer(serializers.ModelSerializer):
         model = Specialization
         fields = ['id', 'name']
 
+
+def specializations_named(names):
+    """
+    The specializations with these names, creating any that do not exist yet.
+    One query when they all exist.
+    """
+    names = {name.strip() for name in names if name.strip()}
+    found = {specialization.name: specialization for specialization in Specialization.objects.filter(name__in=names)}
+    for name in names - found.keys():
+        found[name], _ = Specialization.objects.get_or_create(name=name)
+    return list(found.values())
+
 #  =================================================== doctor proflie ===================================
     
 class DoctorProfileSerializer(serializers.ModelSerializer):
@@ -66,11 +79,7 @@ class DoctorProfileSerializer(serializers.ModelSerializer):
             doctor_profile = DoctorProfile.objects.create(user=user, **doctor_data)
             
             # Handle specializations
-            specialization_objects = []
-            for spec_name in specializations:
-                specialization, _ = Specialization.objects.get_or_create(name=spec_name)
-                specialization_objects.append(specialization)
-            doctor_profile.specializations.set(specialization_objects)
+            doctor_profile.specializations.set(specializations_named(specializations))
 
         # Create PatientProfile if role=patient
         if user.role == 'patient' and patient_data:
@@ -84,11 +93,8 @@ class DoctorProfileSerializer(serializers.ModelSerializer):
         doctor_profile = super().update(instance, validated_data)
 
         if specializations_data is not None:
-            # Clear existing specializations and re-add
-            doctor_profile.specializations.clear()
-            for spec_name in specializations_data:
-                specialization, created = Specialization.objects.get_or_create(name=spec_name.strip())
-                doctor_profile.specializations.add(specialization)
+            # Replace the specializations; set() only writes the difference
+            doctor_profile.specializations.set(specializations_named(specializations_data))
 
         return doctor_profile
 
@@ -140,35 +146,34 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         doctor_data = validated_data.pop('doctor_profile', None)
         patient_data = validated_data.pop('patient_profile', None)
 
-        # Create user with hashed password using create_user or set_password
-        password = validated_data.pop('password')
-        try:
-            user = User.objects.create_user(**validated_data)
-        except IntegrityError as e:
-            raise serializers.ValidationError({"detail": str(e)})
-
-        user.set_password(password)
-        user.save()
-
-        # Create DoctorProfile if role=doctor
-        if user.role == 'doctor' and doctor_data:
-            specializations = doctor_data.pop('specializations', [])
+        # One transaction: a failed profile leaves no user behind, and the doctor's
+        # directory entry is written once, with the user
+        with transaction.atomic(), directory.deferred():
+            # Create user with hashed password using create_user or set_password
+            password = validated_data.pop('password')
             try:
-                doctor_profile = DoctorProfile.objects.create(user=user, **doctor_data)
-                for spec_name in specializations:
-                    specialization, created = Specialization.objects.get_or_create(name=spec_name.strip())
-                    doctor_profile.specializations.add(specialization)
+                user = User.objects.create_user(**validated_data)
             except IntegrityError as e:
-                user.delete()  # Cleanup the created user if profile fails
                 raise serializers.ValidationError({"detail": str(e)})
 
-        # Create PatientProfile if role=patient
-        if user.role == 'patient' and patient_data:
-            try:
-                PatientProfile.objects.create(user=user, **patient_data)
-            except IntegrityError as e:
-                user.delete()
-                raise serializers.ValidationError({"detail": str(e)})
+            user.set_password(password)
+            user.save()
+
+            # Create DoctorProfile if role=doctor
+            if user.role == 'doctor' and doctor_data:
+                specializations = doctor_data.pop('specializations', [])
+                try:
+                    doctor_profile = DoctorProfile.objects.create(user=user, **doctor_data)
+                except IntegrityError as e:
+                    raise serializers.ValidationError({"detail": str(e)})
+                doctor_profile.specializations.set(specializations_named(specializations))
+
+            # Create PatientProfile if role=patient
+            if user.role == 'patient' and patient_data:
+                try:
+                    PatientProfile.objects.create(user=user, **patient_data)
+                except IntegrityError as e:
+                    raise serializers.ValidationError({"detail": str(e)})
 
         return user
 
@@ -251,6 +256,12 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, validated_data):
+        # One transaction, and the doctor's directory entry is written once at the end
+        with transaction.atomic(), directory.deferred():
+            self.apply_update(instance, validated_data)
+        return instance
+
+    def apply_update(self, instance, validated_data):
         # Update User fields
         instance.fullname = validated_data.get('fullname', instance.fullname)  # Update fullname
         instance.email = validated_data.get('email', instance.email)
@@ -279,12 +290,9 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 setattr(doctor_profile, attr, value)
             doctor_profile.save()
 
-            # Handle specializations update
+            # Handle specializations update; set() only writes the difference
             if specializations_data is not None:
-                doctor_profile.specializations.clear()  # Clear existing specializations
-                for spec_name in specializations_data:
-                    specialization, created = Specialization.objects.get_or_create(name=spec_name.strip())
-                    doctor_profile.specializations.add(specialization)
+                doctor_profile.specializations.set(specializations_named(specializations_data))
 
         # Handle patient profile updates
         patient_data = validated_data.get('patient_profile', None)
@@ -294,8 +302,6 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 setattr(patient_profile, attr, value)
             patient_profile.save()
 
-        return instance
-
 
 # ================================= change password serializer ======================================
 
@@ -343,13 +349,14 @@ class PasswordResetOTPSerializer(serializers.Serializer):
 
     def validate_otp(self, value):
         email = self.initial_data.get('email')
-        try:
-            otp_obj = PasswordResetOTP.objects.get(user__email=email, otp=value, is_verified=False)
-            if otp_obj.is_expired():
-                raise serializers.ValidationError("OTP has expired. Please request a new one.")
-            return value
-        except PasswordResetOTP.DoesNotExist:
+        otp_obj = PasswordResetOTP.objects.find(email, value)
+        if otp_obj is None:
             raise serializers.ValidationError("Invalid OTP.")
+        if otp_obj.is_expired():
+            raise serializers.ValidationError("OTP has expired. Please request a new one.")
+        # Kept for PasswordResetView, so the OTP is looked up once per request
+        self.otp_obj = otp_obj
+        return value
         
 
 # ============================================ user details ==============================================
@@ -366,6 +373,14 @@ class CustomUserSerializer(serializers.ModelSerializer):
             'address', 'bio', 'profile_photo', 'role', 'doctor_profile'
         ]
 
+
+class DoctorDirectoryEntrySerializer(serializers.BaseSerializer):
+    """
+    Renders a doctor from its directory entry, which already holds the CustomUserSerializer output.
+    """
+    def to_representation(self, instance):
+        return instance.data
+
 # ============================================ user details ==============================================
 class UserDetailSerializer(serializers.ModelSerializer):
     """
@@ -0,0 +1,123 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from . import directory
+from .cache import invalidate_user, response_cache
+from .models import CustomUser, DoctorProfile, PatientProfile, Specialization
+
+
+def touch_users(user_ids):
+    """
+    Bump updated_at of users whose nested profile data changed, so that the
+    ETag / Last-Modified validators derived from it change as well.
+    """
+    user_ids = list(user_ids)
+    CustomUser.objects.filter(pk__in=user_ids).update(updated_at=timezone.now())
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_doctor_user_responses(sender, instance, **kwargs):
+    # Patients and admins are not in the doctor responses
+    if instance.is_or_was_doctor:
+        response_cache.invalidate('doctors')
+
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def invalidate_doctor_responses(sender, **kwargs):
+    response_cache.invalidate('doctors')
+
+
+@receiver(m2m_changed, sender=DoctorProfile.specializations.through)
+def invalidate_doctor_specializations(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # pk_set is not available after a reverse clear, so collect the doctors first
+        touch_users(instance.doctors.values_list('user_id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    response_cache.invalidate('doctors')
+    if not reverse:
+        touch_users([instance.user_id])
+    elif pk_set:
+        touch_users(DoctorProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+@receiver(post_save, sender=PatientProfile)
+@receiver(post_delete, sender=PatientProfile)
+def touch_profile_owner(sender, instance, **kwargs):
+    touch_users([instance.user_id])
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def invalidate_specialization_responses(sender, **kwargs):
+    # Specialization names are nested in the doctor directory as well
+    response_cache.invalidate('specializations', 'doctors')
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(pre_delete, sender=Specialization)
+def touch_specialization_doctors(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    touch_users(instance.doctors.values_list('user_id', flat=True))
+
+
+# ================================ doctor directory and search ====================================
+# Users saved with only these fields (logins, password changes) keep their directory entry
+UNLISTED_USER_FIELDS = {'last_login', 'password', 'updated_at'}
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_user_directory_entry(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= UNLISTED_USER_FIELDS:
+        return
+    if instance.is_or_was_doctor:
+        # A user that is no longer a doctor is removed
+        directory.doctors_changed([instance.pk])
+
+
+@receiver(post_delete, sender=CustomUser)
+def remove_user_directory_entry(sender, instance, **kwargs):
+    if instance.is_or_was_doctor:
+        directory.doctors_changed([instance.pk])
+
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def refresh_profile_directory_entry(sender, instance, **kwargs):
+    directory.doctors_changed([instance.user_id])
+
+
+@receiver(m2m_changed, sender=DoctorProfile.specializations.through)
+def refresh_doctor_specializations(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._directory_doctor_ids = list(instance.doctors.values_list('user_id', flat=True))
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        directory.doctors_changed([instance.user_id])
+    elif action == 'post_clear':
+        directory.doctors_changed(instance.__dict__.pop('_directory_doctor_ids', []))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        directory.doctors_changed(DoctorProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Specialization)
+def refresh_specialization_doctors(sender, instance, created, **kwargs):
+    if not created:
+        directory.doctors_changed(instance.doctors.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Specialization)
+def collect_specialization_doctors(sender, instance, **kwargs):
+    # The join rows are gone by post_delete
+    instance._directory_doctor_ids = list(instance.doctors.values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Specialization)
+def refresh_former_specialization_doctors(sender, instance, **kwargs):
+    directory.doctors_changed(instance.__dict__.pop('_directory_doctor_ids', []))
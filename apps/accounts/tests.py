@@ -1,3 +1,547 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.management import call_command
+from django.contrib.admin import site
+from django.test import RequestFactory, TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from django.core.cache import cache
+from .cache import _users as cached_users, cache_user, response_cache
+from .models import CustomUser, DoctorDirectoryEntry, DoctorProfile, OutboxEmail, PasswordResetOTP, Specialization
+from .serializers import CustomUserSerializer
 
-# Create your tests here.
+
+class DoctorDirectoryTests(TestCase):
+    """
+    The doctor directory must cost the same number of queries however many doctors exist.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.specializations = [
+            Specialization.objects.create(name=name) for name in ('Cardiology', 'Neurology', 'Orthopedics')
+        ]
+        self.doctor_count = 0
+
+    def add_doctors(self, count):
+        for _ in range(count):
+            self.doctor_count += 1
+            n = self.doctor_count
+            user = CustomUser.objects.create_user(
+                email=f'doctor{n}@example.com', username=f'doctor{n}', role='doctor'
+            )
+            profile = DoctorProfile.objects.create(user=user, license_number=f'LIC-{n}')
+            profile.specializations.set(self.specializations[:1 + n % 3])
+
+    def count_list_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('doctor-profile-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_is_constant(self):
+        self.add_doctors(3)
+        small, _ = self.count_list_queries()
+        self.add_doctors(30)
+        large, data = self.count_list_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['results']), 20)
+
+    def test_cursor_pages_cover_every_doctor_once(self):
+        self.add_doctors(12)
+        seen = []
+        _, data = self.count_list_queries(page_size=5)
+        seen += [doctor['email'] for doctor in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [doctor['email'] for doctor in data['results']]
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(len(set(seen)), 12)
+
+    def test_specialization_filter(self):
+        self.add_doctors(6)
+        _, data = self.count_list_queries(specialization=self.specializations[2].id)
+        for doctor in data['results']:
+            names = [spec['name'] for spec in doctor['doctor_profile']['specialization_details']]
+            self.assertIn('Orthopedics', names)
+        self.assertEqual(len(data['results']), 2)
+
+    def test_non_integer_filters_are_rejected(self):
+        self.add_doctors(1)
+        for params in ({'specialization': 'abc'}, {'doctor_id': 'x'}):
+            response = self.client.get(reverse('doctor-profile-list'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_reads_use_the_directory_entries_only(self):
+        self.add_doctors(4)
+        for params in ({}, {'specialization': self.specializations[1].id}):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('doctor-profile-list'), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            self.assertNotIn('accounts_customuser', ctx.captured_queries[0]['sql'])
+
+    def test_registration_and_update_keep_the_entry_in_step(self):
+        response = self.client.post('/api/register/', {
+            'username': 'newdoc', 'email': 'newdoc@example.com', 'password': 'Secret-pass1', 'role': 'doctor',
+            'fullname': 'New Doctor',
+            'doctor_profile': {'license_number': 'LIC-NEW', 'specializations': ['Cardiology', 'Dermatology']},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        user = CustomUser.objects.get(email='newdoc@example.com')
+        entry = DoctorDirectoryEntry.objects.get(pk=user.pk)
+        self.assertEqual(entry.profile_id, user.doctor_profile.pk)
+        self.assertEqual(entry.data, CustomUserSerializer(user).data)
+
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(reverse('user-update', args=[user.pk]), {
+                'email': 'newdoc@example.com', 'bio': 'Heart specialist',
+                'doctor_profile': {'specializations': ['Neurology']},
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        # The entry is written once, at the end of the update
+        self.assertEqual(sum('INSERT INTO "accounts_doctordirectoryentry"' in q['sql'] for q in ctx.captured_queries), 1)
+        entry.refresh_from_db()
+        self.assertEqual(entry.data['bio'], 'Heart specialist')
+        self.assertEqual([spec['name'] for spec in entry.data['doctor_profile']['specialization_details']], ['Neurology'])
+
+        user.delete()
+        self.assertFalse(DoctorDirectoryEntry.objects.filter(pk=user.pk).exists())
+
+    def test_patient_saves_leave_the_directory_alone(self):
+        patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        patient = CustomUser.objects.get(pk=patient.pk)
+        patient.bio = 'Allergic to penicillin'
+        with CaptureQueriesContext(connection) as ctx:
+            patient.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'doctor' in q['sql']])
+
+    def test_doctor_who_becomes_a_patient_is_removed(self):
+        self.add_doctors(1)
+        user = CustomUser.objects.get(role='doctor')
+        user.role = 'patient'
+        user.save()
+        self.assertFalse(DoctorDirectoryEntry.objects.filter(pk=user.pk).exists())
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Doctor and specialization lists are served from the response cache until a signal evicts them.
+    A file-based cache stands in for the shared tier.
+    """
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        settings_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.cache_dir}}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        response_cache.local.clear()
+        response_cache.reset_stats()
+        self.client = APIClient()
+
+    def test_specializations_hit_then_invalidate(self):
+        Specialization.objects.create(name='Cardiology')
+        first = self.client.get(reverse('specialization-list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('specialization-list'))
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+        Specialization.objects.create(name='Neurology')
+        third = self.client.get(reverse('specialization-list'))
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(len(third.json()), 2)
+
+    def test_shared_tier_serves_other_workers(self):
+        self.client.get(reverse('specialization-list'))
+        response_cache.local.clear()  # a different worker starts with an empty local tier
+        self.assertEqual(self.client.get(reverse('specialization-list'))['X-Cache'], 'HIT')
+        stats = response_cache.stats()
+        self.assertEqual((stats['misses'], stats['shared_hits']), (1, 1))
+
+    def test_invalidation_is_repeated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Specialization.objects.create(name='Cardiology')
+            # A reader that ran before the commit stores its body under the new generation
+            self.client.get(reverse('specialization-list'))
+            self.assertEqual(self.client.get(reverse('specialization-list'))['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(reverse('specialization-list'))['X-Cache'], 'MISS')
+
+    def test_doctor_specialization_change_evicts_directory(self):
+        user = CustomUser.objects.create_user(email='doc@example.com', username='doc', role='doctor')
+        profile = DoctorProfile.objects.create(user=user, license_number='LIC-1')
+        self.client.get(reverse('doctor-profile-list'))
+        self.assertEqual(self.client.get(reverse('doctor-profile-list'))['X-Cache'], 'HIT')
+
+        profile.specializations.add(Specialization.objects.create(name='Cardiology'))
+        response = self.client.get(reverse('doctor-profile-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        details = response.json()['results'][0]['doctor_profile']['specialization_details']
+        self.assertEqual([spec['name'] for spec in details], ['Cardiology'])
+
+    def test_only_doctor_saves_evict_the_directory(self):
+        doctor = CustomUser.objects.create_user(email='doc@example.com', username='doc', role='doctor')
+        patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.client.get(reverse('doctor-profile-list'))
+
+        patient = CustomUser.objects.get(pk=patient.pk)
+        patient.set_password('Another-pass1')
+        patient.save()
+        patient.bio = 'Allergic to penicillin'
+        patient.save()
+        self.assertEqual(self.client.get(reverse('doctor-profile-list'))['X-Cache'], 'HIT')
+
+        doctor = CustomUser.objects.get(pk=doctor.pk)
+        doctor.role = 'patient'
+        doctor.save()
+        response = self.client.get(reverse('doctor-profile-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'], [])
+
+
+class CachedAuthenticationTests(TestCase):
+    """
+    JWT requests resolve the user from the per-process cache until the user is saved or deleted.
+    """
+    def setUp(self):
+        cache.clear()
+        cached_users.clear()
+        self.user = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('profile'))
+        user_queries = [q for q in ctx.captured_queries if 'FROM "accounts_customuser"' in q['sql']]
+        return response, len(user_queries)
+
+    def test_warm_cache_makes_no_user_queries(self):
+        self.assertEqual(self.get_profile()[1], 1)
+        response, queries = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 0)
+
+    def test_save_and_password_change_invalidate_the_entry(self):
+        self.get_profile()
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.fullname = 'Renamed Patient'
+        user.save()
+        response, queries = self.get_profile()
+        self.assertEqual((queries, response.json()['fullname']), (1, 'Renamed Patient'))
+
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.set_password('Another-pass1')
+        user.save()
+        response, queries = self.get_profile()
+        self.assertEqual((response.status_code, queries), (200, 1))
+
+    def test_rows_cached_before_the_commit_are_retired(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = CustomUser.objects.get(pk=self.user.pk)
+            user.fullname = 'Renamed Patient'
+            user.save()
+            # Another request caches the row under the new version before the commit
+            self.get_profile()
+            self.assertEqual(self.get_profile()[1], 0)
+        self.assertEqual(self.get_profile()[1], 1)
+
+    def test_deleted_user_is_rejected(self):
+        self.get_profile()
+        self.user.delete()
+        self.assertEqual(self.get_profile()[0].status_code, 401)
+
+    def test_inactive_user_is_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile()[0].status_code, 401)
+        # Also when the inactive user is already cached
+        cache_user(self.user)
+        response, queries = self.get_profile()
+        self.assertEqual((response.status_code, queries), (401, 0))
+
+
+class ConditionalGetTests(TestCase):
+    """
+    The profile and doctor detail answer 304 Not Modified from their validators, without rendering.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.doctor = CustomUser.objects.create_user(email='doc@example.com', username='doc', role='doctor')
+        self.profile = DoctorProfile.objects.create(user=self.doctor, license_number='LIC-1')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def assert_not_modified(self, url, first, serializer):
+        with mock.patch(serializer) as rendered:
+            for headers in ({'HTTP_IF_NONE_MATCH': first['ETag']}, {'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']}):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+        rendered.assert_not_called()
+
+    def test_unchanged_profile_is_not_modified(self):
+        first = self.client.get(reverse('profile'))
+        self.assertEqual(first.status_code, 200)
+        self.assert_not_modified(reverse('profile'), first, 'apps.accounts.views.UserDetailSerializer')
+
+    def test_profile_etag_changes_after_an_edit(self):
+        etag = self.client.get(reverse('profile'))['ETag']
+        response = self.client.patch(reverse('user-update', args=[self.user.pk]), {
+            'email': 'patient@example.com', 'bio': 'Allergic to penicillin',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['bio'], 'Allergic to penicillin')
+
+    def test_unchanged_doctor_is_not_modified(self):
+        url = reverse('doctor-profile-detail', args=[self.doctor.pk])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assert_not_modified(url, first, 'apps.accounts.views.DoctorProfileViewSet.get_serializer')
+
+    def test_doctor_etag_changes_after_an_edit(self):
+        url = reverse('doctor-profile-detail', args=[self.doctor.pk])
+        seen = [self.client.get(url)['ETag']]
+        self.profile.clinic_name = 'Lakeside Clinic'
+        self.profile.save()
+        seen.append(self.client.get(url)['ETag'])
+        self.profile.specializations.add(Specialization.objects.create(name='Cardiology'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=seen[-1])
+        self.assertEqual(response.status_code, 200)
+        seen.append(response['ETag'])
+        self.assertEqual(len(set(seen)), 3)
+        self.assertEqual(response.json()['doctor_profile']['clinic_name'], 'Lakeside Clinic')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailOutboxTests(TestCase):
+    """
+    Requests queue their emails; send_outbox_emails delivers them and retries failures.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.client = APIClient()
+
+    def test_otp_request_queues_the_email(self):
+        response = self.client.post(reverse('request-password-reset'), {'email': 'patient@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.status, queued.to), ('PENDING', ['patient@example.com']))
+
+        call_command('send_outbox_emails', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Password Reset OTP')
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('SENT', 1))
+
+    def test_batches_share_one_connection(self):
+        for n in range(5):
+            OutboxEmail.objects.enqueue(f'Notice {n}', 'Body', [f'user{n}@example.com'])
+        connection = mail.get_connection()
+        with mock.patch.object(connection, 'open', wraps=connection.open) as opened:
+            self.assertEqual(OutboxEmail.objects.send_batch(connection, batch_size=3), (3, 0))
+            self.assertEqual(OutboxEmail.objects.send_batch(connection, batch_size=3), (2, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(opened.call_count, 5)
+        self.assertFalse(OutboxEmail.objects.filter(status='PENDING').exists())
+
+    def test_overlapping_batches_send_each_email_once(self):
+        for n in range(4):
+            OutboxEmail.objects.enqueue(f'Notice {n}', 'Body', [f'user{n}@example.com'])
+        claim = OutboxEmail.objects.claim
+        results = []
+
+        def claim_after_another_worker(emails, lease_until):
+            # A second worker reads and sends the same due rows before this one claims them
+            with mock.patch.object(OutboxEmail.objects, 'claim', claim):
+                results.append(OutboxEmail.objects.send_batch(mail.get_connection()))
+            return claim(emails, lease_until)
+
+        with mock.patch.object(OutboxEmail.objects, 'claim', side_effect=claim_after_another_worker):
+            results.append(OutboxEmail.objects.send_batch(mail.get_connection()))
+        self.assertEqual(results, [(4, 0), (0, 0)])
+        self.assertEqual(sorted(message.subject for message in mail.outbox), [f'Notice {n}' for n in range(4)])
+
+    def test_failures_back_off_then_give_up(self):
+        email = OutboxEmail.objects.enqueue('Notice', 'Body', ['user@example.com'])
+        connection = mail.get_connection()
+        start = email.next_attempt_at
+        with mock.patch.object(connection, 'send_messages', side_effect=OSError('connection refused')):
+            self.assertEqual(OutboxEmail.objects.send_batch(connection, now=start), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+            self.assertEqual(email.next_attempt_at, start + OutboxEmail.RETRY_DELAY)
+            # Not due again until the backoff has passed
+            self.assertEqual(OutboxEmail.objects.send_batch(connection, now=start + timedelta(seconds=10)), (0, 0))
+
+            for _ in range(OutboxEmail.MAX_ATTEMPTS - 1):
+                OutboxEmail.objects.send_batch(connection, now=email.next_attempt_at)
+                email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('FAILED', OutboxEmail.MAX_ATTEMPTS))
+        self.assertIn('connection refused', email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class PasswordResetTests(TestCase):
+    """
+    A reset looks its OTP up once, uses it once, and the purge job clears old codes.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='patient@example.com', username='patient', role='patient', password='old-password'
+        )
+        self.client = APIClient()
+
+    def request_otp(self):
+        response = self.client.post(reverse('request-password-reset'), {'email': 'patient@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return PasswordResetOTP.objects.get(user=self.user).otp
+
+    def reset(self, otp):
+        return self.client.put(reverse('reset-password'), {
+            'email': 'patient@example.com', 'otp': otp, 'new_password': 'new-password-1',
+        }, format='json')
+
+    def test_reset_uses_the_newest_otp_once(self):
+        self.request_otp()
+        otp = self.request_otp()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.reset(otp)
+        self.assertEqual(response.status_code, 200, response.content)
+        lookups = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'passwordresetotp' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-password-1'))
+        self.assertFalse(PasswordResetOTP.objects.exists())
+
+        self.assertEqual(self.reset(otp).status_code, 400)
+
+    def test_expired_otp_is_rejected(self):
+        otp = self.request_otp()
+        PasswordResetOTP.objects.update(created_at=timezone.now() - timedelta(minutes=11))
+        response = self.reset(otp)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expired', response.json()['otp'][0])
+
+    def test_purge_deletes_expired_otps_in_batches(self):
+        fresh = PasswordResetOTP.objects.issue(self.user)
+        other = CustomUser.objects.create_user(email='other@example.com', username='other', role='patient')
+        old = [PasswordResetOTP.objects.create(user=other, otp=f'{n:06}') for n in range(5)]
+        old.append(PasswordResetOTP.objects.create(user=other, otp='123456', is_verified=True))
+        PasswordResetOTP.objects.filter(pk__in=[otp.pk for otp in old]).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        out = StringIO()
+        call_command('purge_password_reset_otps', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 6 password reset OTPs in 3 batches', out.getvalue())
+        self.assertEqual(list(PasswordResetOTP.objects.all()), [fresh])
+
+
+class DoctorSearchTests(TestCase):
+    """
+    /api/doctors/search/ ranks word-prefix matches from the FTS index, which follows every write.
+    """
+    def setUp(self):
+        self.cardiology = Specialization.objects.create(name='Cardiology')
+        self.neurology = Specialization.objects.create(name='Neurology')
+        self.heart = self.doctor('Asha Heart', clinic_name='Lakeside Clinic', specializations=[self.cardiology])
+        self.brain = self.doctor(
+            'Ravi Menon', bio='Works closely with heart surgeons.', specializations=[self.neurology]
+        )
+        self.client = APIClient()
+
+    def doctor(self, fullname, bio=None, clinic_name=None, specializations=()):
+        username = fullname.lower().replace(' ', '.')
+        user = CustomUser.objects.create_user(
+            email=f'{username}@example.com', username=username, role='doctor', fullname=fullname, bio=bio
+        )
+        profile = DoctorProfile.objects.create(user=user, license_number=f'LIC-{username}', clinic_name=clinic_name)
+        profile.specializations.set(specializations)
+        return user
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('doctor-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def emails(self, q):
+        return [doctor['email'] for doctor in self.search(q)['results']]
+
+    def test_prefix_matches_ranked_by_field(self):
+        self.assertEqual(self.emails('card'), [self.heart.email])
+        self.assertEqual(self.emails('lake cli'), [self.heart.email])
+        # A name match outranks a bio match
+        self.assertEqual(self.emails('heart'), [self.heart.email, self.brain.email])
+        self.assertEqual(self.emails('heart*)('), [self.heart.email, self.brain.email])
+        self.assertEqual(self.client.get(reverse('doctor-search'), {'q': ' ?'}).status_code, 400)
+
+    def test_index_follows_writes(self):
+        self.heart.doctor_profile.specializations.add(self.neurology)
+        self.assertEqual(set(self.emails('neuro')), {self.heart.email, self.brain.email})
+        self.neurology.doctors.clear()
+        self.assertEqual(self.emails('neuro'), [])
+
+        self.cardiology.name = 'Cardiac Surgery'
+        self.cardiology.save()
+        self.assertEqual(self.emails('surg'), [self.heart.email, self.brain.email])
+
+        self.brain.fullname = 'Ravi Kapoor'
+        self.brain.save()
+        self.assertEqual(self.emails('kapoor'), [self.brain.email])
+        self.assertEqual(self.emails('menon'), [])
+
+        self.cardiology.delete()
+        self.assertEqual(self.emails('cardiac'), [])
+        self.brain.delete()
+        self.assertEqual(self.emails('ravi'), [])
+
+    def test_results_carry_id_and_fullname(self):
+        result = self.search('asha')['results'][0]
+        self.assertEqual((result['id'], result['fullname'], result['email']), (self.heart.pk, 'Asha Heart', self.heart.email))
+
+    def test_short_words_match_whole_words_only(self):
+        self.assertEqual(self.emails('as'), [])
+        self.assertEqual(self.emails('ash'), [self.heart.email])
+        self.doctor('Li Wei')
+        self.assertEqual(self.emails('li'), ['li.wei@example.com'])
+
+    def test_pages_follow_rank(self):
+        for n in range(3):
+            self.doctor(f'Orthopedist {n}', bio='orthopedics ' * (n + 1))
+        first = self.search('ortho', limit=2)
+        self.assertEqual(len(first['results']), 2)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+    def test_admin_search_uses_the_index(self):
+        patient = CustomUser.objects.create_user(email='asha.patient@example.com', username='asha', role='patient')
+        request = RequestFactory().get('/admin/')
+        users, _ = site._registry[CustomUser].get_search_results(request, CustomUser.objects.all(), 'asha')
+        self.assertEqual({user.pk for user in users}, {self.heart.pk, patient.pk})
+        profiles, _ = site._registry[DoctorProfile].get_search_results(request, DoctorProfile.objects.all(), 'neuro')
+        self.assertEqual([profile.user_id for profile in profiles], [self.brain.pk])
+
+    def test_admin_search_still_matches_doctor_emails(self):
+        request = RequestFactory().get('/admin/')
+        users, _ = site._registry[CustomUser].get_search_results(request, CustomUser.objects.all(), 'ravi.menon@example')
+        self.assertEqual([user.pk for user in users], [self.brain.pk])
+        profiles, _ = site._registry[DoctorProfile].get_search_results(request, DoctorProfile.objects.all(), 'LIC-asha')
+        self.assertEqual([profile.user_id for profile in profiles], [self.heart.pk])
@@ -1,7 +1,7 @@
 # apps/accounts/urls.py
 
 from django.urls import path
-from .views import RegisterView,DoctorProfileViewSet,UserProfileView, LoginView, UserUpdateView, ChangePasswordView, RequestPasswordResetOTPView, PasswordResetView, SpecializationListView
+from .views import RegisterView,DoctorProfileViewSet,DoctorSearchView,UserProfileView, LoginView, UserUpdateView, ChangePasswordView, RequestPasswordResetOTPView, PasswordResetView, SpecializationListView, ResponseCacheStatsView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -12,6 +12,8 @@ urlpatterns = [
     path('request-password-reset/', RequestPasswordResetOTPView.as_view(), name='request-password-reset'),
     path('reset-password/', PasswordResetView.as_view(), name='reset-password'),
     path('doctors/', DoctorProfileViewSet.as_view({'get': 'list'}), name='doctor-profile-list'),  # For listing doctor profiles
+    path('doctors/search/', DoctorSearchView.as_view(), name='doctor-search'),
     path('doctors/<int:pk>/', DoctorProfileViewSet.as_view({'get': 'retrieve'}), name='doctor-profile-detail'),  # For retrieving a single doctor profile
     path('specializations/', SpecializationListView.as_view(), name='specialization-list'),
+    path('cache-stats/', ResponseCacheStatsView.as_view(), name='cache-stats'),
 ]
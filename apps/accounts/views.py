@@ -1,17 +1,23 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
-from django.db import DatabaseError
+from django.db import DatabaseError, transaction
 from rest_framework.exceptions import ValidationError
-from .serializers import UserRegistrationSerializer,SpecializationSerializer,CustomUserSerializer,UserDetailSerializer, LoginSerializer, UserUpdateSerializer, ChangePasswordSerializer, PasswordResetOTPSerializer
+from .serializers import UserRegistrationSerializer,SpecializationSerializer,UserDetailSerializer, LoginSerializer, UserUpdateSerializer, ChangePasswordSerializer, PasswordResetOTPSerializer, DoctorDirectoryEntrySerializer
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import permissions
 import logging
+import os
 from rest_framework.views import APIView
-from .models import PasswordResetOTP, Specialization, CustomUser
+from .models import PasswordResetOTP, Specialization, CustomUser, DoctorDirectoryEntry, DoctorProfile
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import viewsets
+from .pagination import DoctorCursorPagination
+from . import search
+from rest_framework.utils.urls import replace_query_param
+from .cache import CachedResponseMixin, response_cache
+from .conditional import conditional_get, make_etag
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -19,10 +25,12 @@ logger = logging.getLogger(__name__)
 User = get_user_model()
 
 # ====================================== specialization view ==================================================
-class SpecializationListView(APIView):
+class SpecializationListView(CachedResponseMixin, APIView):
     """
     API view to get the list of all specializations.
     """
+    cache_group = 'specializations'
+
     def get(self, request):
         specializations = Specialization.objects.all()
         serializer = SpecializationSerializer(specializations, many=True)
@@ -91,23 +99,84 @@ class LoginView(APIView):
 
 
 # ========================================== doctor profile view ===============================================
-class DoctorProfileViewSet(viewsets.ModelViewSet):
+class DoctorProfileViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet to retrieve details for doctors including their user and doctor profile information.
+    The list is cursor-paginated and costs a fixed number of queries per page.
     """
-    queryset = CustomUser.objects.filter(role='doctor')  # Only fetch users with role "doctor"
-    serializer_class = CustomUserSerializer
+    cache_group = 'doctors'
+    # One row per doctor, rendered ahead of time (see directory.py)
+    queryset = DoctorDirectoryEntry.objects.all()
+    serializer_class = DoctorDirectoryEntrySerializer
+    pagination_class = DoctorCursorPagination
 
     def get_queryset(self):
         """
         Optionally restricts the returned doctor profiles
-        by filtering against a 'doctor_id' query parameter in the URL.
+        by filtering against the 'doctor_id' and 'specialization' query parameters in the URL.
         """
         queryset = super().get_queryset()
-        doctor_id = self.request.query_params.get('doctor_id', None)
+        try:
+            doctor_id = int(self.request.query_params.get('doctor_id') or 0)
+            specialization_id = int(self.request.query_params.get('specialization') or 0)
+        except ValueError:
+            raise ValidationError({'detail': 'doctor_id and specialization must be integers.'})
         if doctor_id:
             queryset = queryset.filter(id=doctor_id)
+        if specialization_id:
+            # The specialization's index on the join table yields the profile ids directly
+            queryset = queryset.filter(
+                profile_id__in=DoctorProfile.specializations.through.objects.filter(
+                    specialization_id=specialization_id
+                ).values('doctorprofile_id')
+            )
         return queryset   
+
+    def doctor_validators(self, request, pk=None, *args, **kwargs):
+        updated_at = CustomUser.objects.filter(pk=pk, role='doctor').values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return make_etag('doctor', pk, updated_at.isoformat()), updated_at
+
+    @conditional_get(doctor_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class DoctorSearchView(APIView):
+    """
+    Full-text doctor search: ``?q=`` matches word prefixes in the name, specializations,
+    clinic name and address and bio, best match first (see search.py). Each result is the
+    doctor's directory entry with its ``id`` and ``fullname``.
+    Paged with ``limit`` and ``offset``.
+    """
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        if not search.match_expression(query):
+            raise ValidationError({'q': 'Enter at least one word to search for.'})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError({'detail': 'limit and offset must be integers.'})
+
+        # One extra hit tells whether there is a next page
+        hits = search.search(query, limit + 1, offset)
+        doctors = DoctorDirectoryEntry.objects.in_bulk([pk for pk, _ in hits[:limit]])
+        next_url = None
+        if len(hits) > limit:
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + limit)
+        return Response({
+            'next': next_url,
+            'results': [
+                {'id': pk, 'fullname': fullname, **doctors[pk].data}
+                for pk, fullname in hits[:limit] if pk in doctors
+            ],
+        })
+
+
 # ========================================= update view =========================================
 
 class UserUpdateView(APIView):
@@ -231,12 +300,7 @@ class RequestPasswordResetOTPView(generics.CreateAPIView):
         email = request.data.get('email')
         try:
             user = User.objects.get(email=email)
-            otp_obj, created = PasswordResetOTP.objects.get_or_create(user=user)
-
-            if not created:
-                # If OTP exists, generate a new one
-                otp_obj.generate_otp()
-            
+            otp_obj = PasswordResetOTP.objects.issue(user)
             otp_obj.send_otp_email()
             return Response({"message": "OTP sent to email."}, status=status.HTTP_200_OK)
         
@@ -254,41 +318,47 @@ class PasswordResetView(generics.UpdateAPIView):
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            email = request.data.get('email')
-            otp = request.data.get('otp')
-            new_password = request.data.get('new_password')
-
-            # Validate OTP
-            try:
-                otp_obj = PasswordResetOTP.objects.get(user__email=email, otp=otp, is_verified=False)
-                if otp_obj.is_expired():
-                    return Response({"detail": "OTP has expired."}, status=status.HTTP_400_BAD_REQUEST)
-                
+            otp_obj = serializer.otp_obj
+            with transaction.atomic():
+                # An OTP works once: of two concurrent resets only the one that deletes it proceeds
+                deleted, _ = PasswordResetOTP.objects.filter(pk=otp_obj.pk).delete()
+                if not deleted:
+                    return Response({"detail": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
+
                 # Reset password
                 user = otp_obj.user
-                user.set_password(new_password)
+                user.set_password(serializer.validated_data['new_password'])
                 user.save()
 
-                # Mark OTP as verified
-                otp_obj.is_verified = True
-                otp_obj.save()
-
-                return Response({"message": "Password has been reset successfully."}, status=status.HTTP_200_OK)
-
-            except PasswordResetOTP.DoesNotExist:
-                return Response({"detail": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"message": "Password has been reset successfully."}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
 class UserProfileView(APIView):
     """
     API endpoint to fetch user details based on authentication.
+    Answers 304 Not Modified from the authenticated user's updated_at alone.
     """
     permission_classes = [IsAuthenticated]
 
+    def profile_validators(self, request, *args, **kwargs):
+        user = request.user
+        return make_etag('profile', user.pk, user.updated_at.isoformat()), user.updated_at
+
+    @conditional_get(profile_validators)
     def get(self, request, *args, **kwargs):
         user = request.user
         serializer = UserDetailSerializer(user)
         return Response(serializer.data)
 
-    
\ No newline at end of file
+    
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    Hit/miss counters of the response cache for the worker serving the request.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'pid': os.getpid(), **response_cache.stats()})
@@ -0,0 +1,43 @@
+"""
+Listings that read the hot appointment table and the archive together.
+
+The archive only holds final appointments dated before the archive horizon, so a listing
+reads it only when the requested date range reaches back that far (see
+AppointmentListCreateView.list). When it does, the two tables are merged page by page.
+"""
+
+
+class ArchiveUnion:
+    """
+    The part of the QuerySet API that CursorPagination uses -- order_by(), filter() and
+    slicing -- over several querysets of rows with the same fields.
+
+    A slice ``[start:stop]`` reads at most ``stop`` rows from each queryset with its own
+    indexed query and merges them in Python. With cursor pagination ``stop`` is one page
+    plus the cursor offset, so a page costs one query per table whatever the table sizes.
+    """
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = tuple(ordering)
+
+    def order_by(self, *ordering):
+        return ArchiveUnion(*(queryset.order_by(*ordering) for queryset in self.querysets), ordering=ordering)
+
+    def filter(self, *args, **kwargs):
+        return ArchiveUnion(*(queryset.filter(*args, **kwargs) for queryset in self.querysets), ordering=self.ordering)
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice) or k.step is not None:
+            raise TypeError("ArchiveUnion only supports slices without a step.")
+        rows = []
+        for queryset in self.querysets:
+            rows += queryset[:k.stop] if k.stop is not None else queryset
+        # CursorPagination flips every field of the ordering together, so one direction suffices
+        rows.sort(key=self._sort_key, reverse=bool(self.ordering) and self.ordering[0].startswith('-'))
+        return rows[k.start:k.stop]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def _sort_key(self, row):
+        return tuple(getattr(row, field.lstrip('-')) for field in self.ordering)
@@ -0,0 +1,141 @@
+"""
+Free-time computation for doctors' schedules.
+
+For one doctor, busy intervals come from a single query over the requested date range,
+ordered by (date, start_time). A sweep over that ordered stream merges overlapping
+appointments and emits the gaps within opening hours that are long enough for the
+requested duration. Searches across many doctors work on the day bitmaps instead.
+"""
+import math
+from datetime import time, timedelta
+
+import numpy as np
+from django.conf import settings
+
+from . import slots
+
+
+def opening_hours():
+    return (
+        time.fromisoformat(getattr(settings, 'CLINIC_OPENING_TIME', '09:00')),
+        time.fromisoformat(getattr(settings, 'CLINIC_CLOSING_TIME', '17:00')),
+    )
+
+
+def _minutes(t, round_up=False):
+    value = t.hour * 60 + t.minute + t.second / 60 + t.microsecond / 60_000_000
+    return math.ceil(value) if round_up else math.floor(value)
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def free_windows(busy, start_date, end_date, duration, opening, closing, now=None):
+    """
+    Sweep ``busy`` -- ``(date, start_time, end_time)`` tuples sorted by date then start --
+    and return ``{date: [(start, end), ...]}`` with every free window of at least
+    ``duration`` minutes between ``opening`` and ``closing``, for each day of the range.
+    Time before ``now`` (a naive datetime) counts as busy.
+    """
+    open_at, close_at = _minutes(opening, round_up=True), _minutes(closing)
+    busy = iter(busy)
+    pending = next(busy, None)
+    windows = {}
+
+    day = start_date
+    while day <= end_date:
+        cursor = open_at
+        if now is not None and day < now.date():
+            cursor = close_at
+        elif now is not None and day == now.date():
+            cursor = max(cursor, _minutes(now.time(), round_up=True))
+
+        gaps = []
+        while pending is not None and pending[0] < day:
+            pending = next(busy, None)
+        while pending is not None and pending[0] == day:
+            busy_start, busy_end = _minutes(pending[1]), _minutes(pending[2], round_up=True)
+            if min(busy_start, close_at) - cursor >= duration:
+                gaps.append((_time(cursor), _time(min(busy_start, close_at))))
+            cursor = max(cursor, busy_end)
+            pending = next(busy, None)
+        if close_at - cursor >= duration:
+            gaps.append((_time(cursor), _time(close_at)))
+
+        windows[day] = gaps
+        day += timedelta(days=1)
+    return windows
+
+
+def earliest_free_slots(doctor_ids, day_bitmaps, start_date, end_date, duration, opening, closing, limit, now=None):
+    """
+    Earliest ``limit`` slots of ``duration`` minutes across many doctors, from their
+    day bitmaps (see slots.py), computed without a per-doctor loop.
+
+    ``day_bitmaps`` yields ``(doctor_id, date, bitmap)``. They are unpacked into one boolean
+    occupancy array of shape (doctors, days, slots within opening hours); a sliding-window
+    sum over the slot axis marks every start with ``duration`` free minutes after it. Each
+    free window is then cut into back-to-back slots from its start, as the doctor
+    availability endpoint does, so no two results of a doctor overlap.
+    Returns ``[(date, start_time, end_time, doctor_id), ...]`` ordered by date, time, doctor.
+    """
+    first_slot = -(-_minutes(opening, round_up=True) // slots.SLOT_MINUTES)
+    last_slot = _minutes(closing) // slots.SLOT_MINUTES
+    length = -(-duration // slots.SLOT_MINUTES)
+    days = (end_date - start_date).days + 1
+    width = last_slot - first_slot
+    if not doctor_ids or width < length:
+        return []
+
+    occupied = np.zeros((len(doctor_ids), days, width), dtype=bool)
+    day_bitmaps = list(day_bitmaps)
+    if day_bitmaps:
+        row_of = {doctor_id: row for row, doctor_id in enumerate(doctor_ids)}
+        first_ordinal = start_date.toordinal()
+        ids, dates, bitmaps = zip(*day_bitmaps)
+        rows = [row_of[doctor_id] for doctor_id in ids]
+        offsets = [day.toordinal() - first_ordinal for day in dates]
+        packed = np.frombuffer(b''.join(bitmaps), dtype=np.uint8).reshape(len(bitmaps), slots.BITMAP_BYTES)
+        bits = np.unpackbits(packed, axis=1, bitorder='little').astype(bool)
+        occupied[rows, offsets] = bits[:, first_slot:last_slot]
+
+    # Time that has already passed is never offered
+    if now is not None:
+        today = (now.date() - start_date).days
+        if today >= 0:
+            occupied[:, :min(today, days)] = True
+            if today < days:
+                past = -(-_minutes(now.time(), round_up=True) // slots.SLOT_MINUTES) - first_slot
+                occupied[:, today, :max(past, 0)] = True
+
+    # A start j is free when the running count of occupied slots is equal at j and j + length
+    counts = np.zeros((len(doctor_ids), days, width + 1), dtype=np.int16)
+    np.cumsum(occupied, axis=2, out=counts[:, :, 1:])
+    free = counts[:, :, length:] == counts[:, :, :-length]
+
+    # Only the days needed to reach ``limit`` slots are cut up and ordered by (day, slot,
+    # doctor): a run of n free starts holds at least n / length back-to-back slots
+    per_day = np.cumsum(free.sum(axis=(0, 2)))
+    last_day = int(np.searchsorted(per_day, limit * length)) + 1
+    free = free[:, :last_day]
+
+    # Keep every length-th start of each run of free starts, counted from the run's first
+    position = np.arange(free.shape[2], dtype=np.int16)
+    run_starts = free.copy()
+    run_starts[:, :, 1:] &= ~free[:, :, :-1]
+    offset = np.maximum.accumulate(run_starts * position, axis=2)
+    np.subtract(position, offset, out=offset)
+    free &= offset % length == 0
+
+    day_index, slot_index, doctor_index = np.nonzero(free.transpose(1, 2, 0))
+    results = []
+    for d, s, r in zip(day_index[:limit], slot_index[:limit], doctor_index[:limit]):
+        start = (first_slot + int(s)) * slots.SLOT_MINUTES
+        results.append((
+            start_date + timedelta(days=int(d)),
+            _time(start),
+            _time(start + duration),
+            doctor_ids[int(r)],
+        ))
+    return results
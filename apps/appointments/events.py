@@ -0,0 +1,224 @@
+"""
+Live appointment events for the dashboards.
+
+Writes publish small JSON-serialisable dicts to one channel per user (``user:<id>``) once
+their transaction commits, and the server-sent-events view streams the requesting user's
+channel. The broker is chosen with ``settings.APPOINTMENT_EVENTS_BROKER``:
+
+* InProcessBroker (default) fans messages out inside one process -- enough for a single
+  ASGI worker.
+* CacheBroker keeps a short per-channel log in a shared Django cache
+  (``settings.APPOINTMENT_EVENTS_CACHE_ALIAS``) that every worker tails. It stands in for a
+  real message broker when several workers run on one machine.
+
+A broker only needs ``publish(channel, message)``, callable from any thread, and
+``subscribe(channel)``, returning an object with ``async get()`` and ``close()``.
+
+EventSource cannot send an Authorization header, and an access token in the stream's URL
+would end up in server and proxy logs. Clients exchange their token for a stream ticket
+instead: signed, valid for TICKET_MAX_AGE seconds and accepted once.
+"""
+import asyncio
+import secrets
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """
+    Fan-out to the subscribers of this process. Each subscriber has a bounded queue;
+    a subscriber that falls ``max_pending`` messages behind misses the newer ones.
+    """
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.offer(message)
+
+    def subscribe(self, channel):
+        subscription = _QueueSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+
+class _QueueSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        # Created from the subscriber's event loop; publishers hand messages over to it
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=broker.max_pending)
+
+    def offer(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop is closed; close() will follow
+            pass
+
+    def _put(self, message):
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class CacheBroker:
+    """
+    Per-channel event log in a shared cache: an incrementing sequence number plus one key
+    per message that expires after ``ttl`` seconds. Subscribers poll the sequence number
+    every ``poll_interval`` seconds and read the new messages with one get_many().
+    """
+    SEQUENCE_KEY = 'appointment-events:{}:seq'
+    MESSAGE_KEY = 'appointment-events:{}:{}'
+
+    def __init__(self, alias=None, poll_interval=0.5, ttl=60):
+        self.alias = alias or getattr(settings, 'APPOINTMENT_EVENTS_CACHE_ALIAS', 'default')
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def publish(self, channel, message):
+        sequence_key = self.SEQUENCE_KEY.format(channel)
+        self.cache.add(sequence_key, 0, timeout=None)
+        sequence = self.cache.incr(sequence_key)
+        self.cache.set(self.MESSAGE_KEY.format(channel, sequence), message, self.ttl)
+
+    def subscribe(self, channel):
+        return _CacheSubscription(self, channel)
+
+
+class _CacheSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.last = None
+        self.waiting_for = None
+        self.buffer = deque()
+
+    async def get(self):
+        while not self.buffer:
+            await self._poll()
+            if not self.buffer:
+                await asyncio.sleep(self.broker.poll_interval)
+        return self.buffer.popleft()
+
+    async def _poll(self):
+        cache = self.broker.cache
+        current = await cache.aget(self.broker.SEQUENCE_KEY.format(self.channel), 0)
+        if self.last is None:
+            # Only messages published after subscribing are delivered
+            self.last = current
+            return
+        keys = [self.broker.MESSAGE_KEY.format(self.channel, n) for n in range(self.last + 1, current + 1)]
+        messages = await cache.aget_many(keys) if keys else {}
+        for n, key in enumerate(keys, start=self.last + 1):
+            if key not in messages:
+                # A publisher bumps the sequence before it stores the message: wait one poll
+                # for it, then treat it as expired
+                if self.waiting_for != n:
+                    self.waiting_for = n
+                    break
+            else:
+                self.buffer.append(messages[key])
+            self.last = n
+
+    def close(self):
+        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(
+                getattr(settings, 'APPOINTMENT_EVENTS_BROKER', 'apps.appointments.events.InProcessBroker')
+            )()
+        return _broker
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+TICKET_SALT = 'appointment-events.ticket'
+TICKET_USED_KEY = 'appointment-events:ticket:{}'
+TICKET_MAX_AGE = 30  # seconds
+
+
+def issue_stream_ticket(user_id):
+    return signing.dumps({'user': user_id, 'nonce': secrets.token_urlsafe(12)}, salt=TICKET_SALT, compress=True)
+
+
+def redeem_stream_ticket(ticket):
+    """
+    The user id of a ticket that is genuine, recent and not redeemed before; None otherwise.
+    Redeemed tickets are recorded in the events cache, which must be shared by every worker.
+    """
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    cache = caches[getattr(settings, 'APPOINTMENT_EVENTS_CACHE_ALIAS', 'default')]
+    if not cache.add(TICKET_USED_KEY.format(payload['nonce']), True, timeout=TICKET_MAX_AGE + 1):
+        return None
+    return payload['user']
+
+
+def publish_appointment_events(event_type, appointments):
+    """
+    After the current transaction commits, send ``event_type`` for each appointment
+    (a mapping of its fields) to its doctor's and its patient's channels.
+    """
+    messages = [
+        {
+            'type': event_type,
+            'id': appointment['id'],
+            'doctor': appointment['doctor_id'],
+            'patient': appointment['patient_id'],
+            'appointment_date': appointment['appointment_date'].isoformat(),
+            'start_time': appointment['start_time'].isoformat(),
+            'end_time': appointment['end_time'].isoformat(),
+            'status': appointment['status'],
+        }
+        for appointment in appointments
+    ]
+
+    def publish():
+        broker = get_broker()
+        for message in messages:
+            broker.publish(user_channel(message['doctor']), message)
+            broker.publish(user_channel(message['patient']), message)
+
+    if messages:
+        transaction.on_commit(publish)
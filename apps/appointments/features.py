@@ -0,0 +1,95 @@
+"""
+Input encoding for the recommendation model (recommendations.py).
+
+FeatureEncoder compiles the saved label encoders into dicts once, when the model is
+loaded, and then writes any number of requests straight into a float32 array in the
+model's column order: one dict lookup per categorical field and one array write per
+batch, with no per-value LabelEncoder.transform() and no DataFrame. float32 is what the
+forest's trees compare against, so scikit-learn uses the array as it is. Predictions are
+decoded by indexing the encoders' classes_ arrays.
+
+manage.py bench_recommendation_features compares this with the encoding in model.ipynb.
+"""
+import numpy as np
+
+# The model's input columns, in order
+FEATURES = (
+    'specialization', 'time_slot', 'patient_age', 'patient_gender', 'day_of_week',
+    'is_holiday', 'month', 'year', 'day',
+)
+
+# The code of a category the model was not trained on, as in model.ipynb
+UNKNOWN = -1
+
+
+class FeatureEncoder:
+    def __init__(self, tables, doctors, time_slots):
+        self.tables = tables
+        self.doctors = doctors
+        self.time_slots = time_slots
+
+    @classmethod
+    def compile(cls, encoders, names):
+        """
+        An encoder for the saved label ``encoders``. ``names`` gives the specialization and
+        gender name of each code of those two encoders, which were fitted on codes.
+        """
+        return cls(
+            tables={
+                'specialization': {
+                    name: int(code) for name, code in zip(names['specialization'], encoders['specialization'].classes_)
+                },
+                'time_slot': {str(name): code for code, name in enumerate(encoders['time_slot'].classes_)},
+                'patient_gender': {
+                    name: int(code) for name, code in zip(names['patient_gender'], encoders['gender'].classes_)
+                },
+            },
+            doctors=encoders['doctor'].classes_,
+            time_slots=encoders['time_slot'].classes_.astype(str),
+        )
+
+    def encode(self, requests, out=None):
+        """
+        The model input for these requests, one row each, written into ``out`` when given.
+        A request is a dict with specialization, time_slot, patient_age, patient_gender,
+        date and optionally is_holiday.
+        """
+        if out is None:
+            out = np.empty((len(requests), len(FEATURES)), dtype=np.float32)
+        specializations = self.tables['specialization']
+        time_slots = self.tables['time_slot']
+        genders = self.tables['patient_gender']
+        values = []
+        for request in requests:
+            day = request['date']
+            values += (
+                specializations.get(request['specialization'], UNKNOWN),
+                time_slots.get(request['time_slot'], UNKNOWN),
+                request['patient_age'],
+                genders.get(request['patient_gender'], UNKNOWN),
+                day.weekday(),
+                request.get('is_holiday', False),
+                day.month,
+                day.year,
+                day.day,
+            )
+        out.reshape(-1)[:] = values
+        return out
+
+    def encode_one(self, request):
+        return self.encode((request,))
+
+    def decode(self, predictions):
+        """
+        The recommendations for the model's ``predictions``, in order.
+        """
+        doctors = self.doctors[predictions[:, 0]].tolist()
+        time_slots = self.time_slots[predictions[:, 1]].tolist()
+        return [
+            {
+                'recommended_doctor': doctor,
+                'recommended_time_slot': time_slot,
+                'peak_demand_alert': 'Yes' if alert == 1 else 'No',
+            }
+            for doctor, time_slot, alert in zip(doctors, time_slots, predictions[:, 2].tolist())
+        ]
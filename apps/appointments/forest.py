@@ -0,0 +1,155 @@
+"""
+The recommendation forest as flat NumPy arrays.
+
+CompiledForest.compile() flattens the trees of the RandomForestClassifier saved by
+model.ipynb into a handful of contiguous arrays covering every node of every tree, and
+save() writes them as .npy files next to a JSON manifest. CompiledForest.load()
+memory-maps them, so loading reads no tree data up front and every process on the
+machine shares one copy of the pages. Built by manage.py compile_recommendation_model.
+
+CompiledForest.predict() walks all trees for all rows at once, one array step per level,
+and then adds up the leaf class fractions tree by tree and takes the argmax per output,
+exactly as RandomForestClassifier.predict() does, so its predictions are identical.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+ARRAYS = ('roots', 'feature', 'threshold', 'children', 'leaf', 'value')
+
+# Rows predicted together; bounds the (rows, trees, classes) array of leaf values
+CHUNK_SIZE = 1024
+
+
+def compile_forest(model):
+    """
+    The arrays of a fitted multi-output RandomForestClassifier:
+
+    roots      int32 (trees,)       node of the root of each tree
+    feature    int32 (nodes,)       column compared at each node
+    threshold  float64 (nodes,)     go left when the column is <= the threshold
+    children   int32 (nodes, 2)     left and right child of each node
+    leaf       int32 (nodes,)       row of ``value`` of each leaf
+    value      float64 (leaves, classes of all outputs)
+                                    class fractions of each leaf, the outputs side by side
+
+    Leaves compare column 0 against +inf and are their own children, so every row can
+    take max_depth steps and stay on its leaf once there.
+    """
+    n_classes = [len(classes) for classes in model.classes_]
+    roots, features, thresholds, children, leaves, values = [], [], [], [], [], []
+    offset = leaf_offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        children.append(np.column_stack([
+            np.where(is_leaf, nodes, tree.children_left), np.where(is_leaf, nodes, tree.children_right),
+        ]) + offset)
+        leaf = np.zeros(tree.node_count, dtype=np.int64)
+        leaf[is_leaf] = leaf_offset + np.arange(is_leaf.sum())
+        leaves.append(leaf)
+        values.append(np.hstack([tree.value[is_leaf, k, :n] for k, n in enumerate(n_classes)]))
+        offset += tree.node_count
+        leaf_offset += is_leaf.sum()
+    return {
+        'roots': np.array(roots, dtype=np.int32),
+        'feature': np.concatenate(features).astype(np.int32),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'children': np.ascontiguousarray(np.vstack(children), dtype=np.int32),
+        'leaf': np.concatenate(leaves).astype(np.int32),
+        'value': np.ascontiguousarray(np.vstack(values), dtype=np.float64),
+    }
+
+
+class CompiledForest:
+    def __init__(self, arrays, manifest):
+        self.manifest = manifest
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = [np.array(classes) for classes in manifest['classes']]
+        self.n_outputs_ = len(self.classes_)
+        self.n_features_in_ = manifest['n_features']
+        self.feature_names_in_ = np.array(manifest['feature_names'], dtype=object)
+        self.max_depth = manifest['max_depth']
+        # Column range of each output in ``value``
+        bounds = np.cumsum([0] + [len(classes) for classes in self.classes_])
+        self._outputs = list(zip(bounds[:-1], bounds[1:]))
+
+    @classmethod
+    def compile(cls, model, feature_names, **manifest):
+        """
+        The compiled form of ``model``, whose input columns are ``feature_names``. Extra
+        keyword arguments go into the manifest.
+        """
+        manifest.update(
+            format=FORMAT,
+            feature_names=list(feature_names),
+            n_features=int(model.n_features_in_),
+            classes=[classes.tolist() for classes in model.classes_],
+            max_depth=int(max(estimator.tree_.max_depth for estimator in model.estimators_)),
+        )
+        return cls(compile_forest(model), manifest)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(directory / f'{name}.npy', getattr(self, name))
+        (directory / MANIFEST_FILE).write_text(json.dumps(self.manifest, indent=2))
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        The forest compiled into ``directory``, its arrays memory-mapped read-only unless
+        ``mmap_mode`` is None.
+        """
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST_FILE).read_text())
+        if manifest.get('format') != FORMAT:
+            raise ValueError(f"{directory} holds a compiled forest of format {manifest.get('format')}, not {FORMAT}.")
+        # Plain ndarray views of the maps: indexing an np.memmap is several times slower
+        arrays = {name: np.asarray(np.load(directory / f'{name}.npy', mmap_mode=mmap_mode)) for name in ARRAYS}
+        return cls(arrays, manifest)
+
+    def apply(self, X):
+        """
+        The leaf (row of ``value``) reached in each tree by each row of X, shape (rows, trees).
+        """
+        # The trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        values = X.reshape(-1)
+        row_start = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+        children = self.children.reshape(-1)
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            goes_right = values[row_start + self.feature[node]] > self.threshold[node]
+            node = children[2 * node + goes_right]
+        return self.leaf[node]
+
+    def predict_proba(self, X):
+        probabilities = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), CHUNK_SIZE):
+            leaves = self.apply(X[start:start + CHUNK_SIZE])
+            # A sum over the middle axis adds the trees one after another, in order, as
+            # RandomForestClassifier does, so the totals are bit for bit the same
+            np.add.reduce(self.value[leaves], axis=1, out=probabilities[start:start + CHUNK_SIZE])
+        probabilities /= len(self.roots)
+        return [probabilities[:, start:end] for start, end in self._outputs]
+
+    def predict(self, X):
+        probabilities = self.predict_proba(X)
+        predictions = np.empty((len(probabilities[0]), self.n_outputs_), dtype=self.classes_[0].dtype)
+        for k, proba in enumerate(probabilities):
+            predictions[:, k] = self.classes_[k].take(np.argmax(proba, axis=1))
+        return predictions
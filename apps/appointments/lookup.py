@@ -0,0 +1,173 @@
+"""
+Precomputed recommendations for the whole input space.
+
+The forest only ever compares an input against its split thresholds, so two values of a
+feature that fall between the same pair of thresholds take the same path through every
+tree and get the same prediction. LookupTable cuts each feature at the forest's own
+thresholds, keeps the cells that contain a value the feature can take (the category codes,
+days of the week, months, days of the month; any year), and stores the prediction for
+every combination in one uint8 array. Those features are exact. Patient age, with the most
+thresholds, is cut into buckets of fixed width instead, each predicted at its middle age.
+Buckets of one year, the default of build_recommendation_lookup, cover every whole age
+and keep the table exact; wider buckets make it smaller but disagree with live inference
+on some requests.
+
+A lookup is a threshold search per feature and one array index. Inputs outside the table
+(ages outside its range, codes between cells) are reported as missing, for the registry to
+predict live. Built by manage.py build_recommendation_lookup, next to the compiled forest.
+"""
+import itertools
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .features import FEATURES
+
+TABLE_FILE = 'lookup.npy'
+MANIFEST_FILE = 'lookup.json'
+AGE = FEATURES.index('patient_age')
+
+
+def input_domains(choices):
+    """
+    The values each encoded feature other than patient_age can take, None for any value,
+    given the registry's category ``choices``.
+    """
+    return {
+        'specialization': range(len(choices['specialization'])),
+        'time_slot': range(len(choices['time_slot'])),
+        'patient_gender': range(len(choices['patient_gender'])),
+        'day_of_week': range(7),
+        'is_holiday': (0, 1),
+        'month': range(1, 13),
+        'year': None,
+        'day': range(1, 32),
+    }
+
+
+def split_thresholds(model, feature):
+    """
+    The distinct thresholds the forest compares ``feature`` (a column index) against.
+    """
+    if hasattr(model, 'estimators_'):
+        thresholds = [
+            estimator.tree_.threshold[estimator.tree_.feature == feature] for estimator in model.estimators_
+        ]
+        return np.unique(np.concatenate(thresholds))
+    # A compiled forest: leaves compare column 0 against +inf
+    return np.unique(model.threshold[(model.feature == feature) & np.isfinite(model.threshold)])
+
+
+class LookupTable:
+    def __init__(self, table, manifest):
+        self.table = table
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.n_classes = manifest['n_classes']
+        self.age_range = manifest['age_range']
+        self.age_bucket = manifest['age_bucket']
+        self.thresholds = {}
+        self.cells = {}
+        for feature, cut in manifest['features'].items():
+            self.thresholds[int(feature)] = np.array(cut['thresholds'], dtype=np.float64)
+            self.cells[int(feature)] = np.array(cut['cells'], dtype=np.int64)
+        # Flat index of a cell: the dot product of its coordinates with these strides
+        self.strides = np.array([stride // table.itemsize for stride in table.strides], dtype=np.int64)
+
+    @classmethod
+    def build(cls, registry, age_bucket, age_range, domains, chunk_size=50_000):
+        """
+        Predict every cell with ``registry``. ``domains`` gives the values each feature
+        other than patient_age can take, None for any value.
+        """
+        registry.load()
+        features, axes = {}, []
+        for column, name in enumerate(FEATURES):
+            if column == AGE:
+                low, high = age_range
+                axes.append([min(start + age_bucket // 2, high) for start in range(low, high + 1, age_bucket)])
+                continue
+            thresholds = split_thresholds(registry.model, column)
+            domain = domains[name]
+            if domain is None:
+                # One cell per interval, represented by a value inside it
+                if len(thresholds):
+                    domain = np.concatenate([
+                        [thresholds[0] - 1], (thresholds[:-1] + thresholds[1:]) / 2, [thresholds[-1] + 1],
+                    ])
+                else:
+                    domain = [0]
+            domain = np.asarray(domain, dtype=np.float64)
+            intervals = np.searchsorted(thresholds, domain, side='left')
+            kept, first = np.unique(intervals, return_index=True)
+            cells = np.full(len(thresholds) + 1, -1)
+            cells[kept] = np.arange(len(kept))
+            features[column] = {'thresholds': thresholds.tolist(), 'cells': cells.tolist()}
+            axes.append(domain[first].tolist())
+
+        shape = tuple(len(axis) for axis in axes)
+        n_classes = [len(classes) for classes in registry.model.classes_]
+        if np.prod(n_classes) > 256:
+            raise ValueError("The model's outputs do not fit one byte.")
+        table = np.empty(int(np.prod(shape)), dtype=np.uint8)
+        grid = itertools.product(*axes)
+        for start in range(0, len(table), chunk_size):
+            rows = np.array(list(itertools.islice(grid, chunk_size)), dtype=np.float32)
+            table[start:start + len(rows)] = cls.pack(registry.predict(rows), n_classes)
+        manifest = {
+            'version': registry.version,
+            'n_classes': n_classes,
+            'age_range': list(age_range),
+            'age_bucket': age_bucket,
+            'features': features,
+            'axes': axes,
+        }
+        return cls(table.reshape(shape), manifest)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST_FILE).read_text())
+        return cls(np.asarray(np.load(directory / TABLE_FILE, mmap_mode=mmap_mode)), manifest)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / TABLE_FILE, np.ascontiguousarray(self.table))
+        (directory / MANIFEST_FILE).write_text(json.dumps(self.manifest))
+
+    @staticmethod
+    def pack(predictions, n_classes):
+        """
+        One byte per prediction: its class codes as the digits of a mixed-radix number.
+        """
+        packed = np.zeros(len(predictions), dtype=np.int64)
+        for output, size in enumerate(n_classes):
+            packed = packed * size + predictions[:, output]
+        return packed
+
+    def unpack(self, packed):
+        predictions = np.empty((len(packed), len(self.n_classes)), dtype=np.int64)
+        packed = packed.astype(np.int64)
+        for output in reversed(range(len(self.n_classes))):
+            packed, predictions[:, output] = np.divmod(packed, self.n_classes[output])
+        return predictions
+
+    def predict(self, X):
+        """
+        The predictions for the rows of X (encoded features) that are in the table, and a
+        mask of those rows. The other rows of the predictions are zero.
+        """
+        X = np.asarray(X)
+        coordinates = np.empty(X.shape, dtype=np.int64)
+        for column, thresholds in self.thresholds.items():
+            coordinates[:, column] = self.cells[column][np.searchsorted(thresholds, X[:, column], side='left')]
+        low, high = self.age_range
+        ages = X[:, AGE]
+        coordinates[:, AGE] = (ages - low) // self.age_bucket
+        found = (coordinates >= 0).all(axis=1) & (ages >= low) & (ages <= high) & (ages == np.floor(ages))
+        index = coordinates[found] @ self.strides
+        predictions = np.zeros((len(X), len(self.n_classes)), dtype=np.int64)
+        predictions[found] = self.unpack(self.table.reshape(-1)[index])
+        return predictions, found
@@ -0,0 +1,43 @@
+import time as timer
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from apps.appointments.models import ArchivedAppointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed and cancelled appointments older than the archive horizon into the archive table, "
+        "one transaction per batch. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int,
+            help="Archive appointments dated more than this many days ago "
+                 "(default: settings.APPOINTMENT_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches.")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        if options['older_than'] is None:
+            cutoff = ArchivedAppointment.objects.default_cutoff()
+        else:
+            cutoff = now().date() - timedelta(days=options['older_than'])
+
+        moved = batches = 0
+        last_id = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count, last_id = ArchivedAppointment.objects.archive_batch(cutoff, options['batch_size'], after_id=last_id)
+            if not count:
+                break
+            moved += count
+            batches += 1
+            if options['pause']:
+                timer.sleep(options['pause'])
+
+        self.stdout.write(f"Archived {moved} appointments dated before {cutoff} in {batches} batches.")
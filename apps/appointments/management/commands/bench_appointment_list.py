@@ -0,0 +1,97 @@
+import random
+import statistics
+import time as timer
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import CustomUser
+from apps.appointments.models import Appointment
+from apps.appointments.views import AppointmentListCreateView
+
+
+class Command(BaseCommand):
+    help = "Time the appointment list endpoint at several table sizes, with and without the composite indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000', help="Comma-separated row counts.")
+        parser.add_argument('--doctors', type=int, default=100)
+        parser.add_argument('--runs', type=int, default=30)
+
+    def handle(self, *args, **options):
+        for size in [int(value) for value in options['sizes'].split(',')]:
+            # Each size is seeded inside a transaction that is rolled back afterwards
+            with transaction.atomic():
+                doctor = self.seed(size, options['doctors'])
+                self.report(size, 'indexed', doctor, options['runs'])
+                # DROP INDEX is transactional too, so the rollback restores the indexes
+                with connection.cursor() as cursor:
+                    for index in Appointment._meta.indexes:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                self.report(size, 'no index', doctor, options['runs'])
+                transaction.set_rollback(True)
+
+    def seed(self, size, doctor_count):
+        doctors = [
+            CustomUser.objects.create_user(email=f'bench-doctor{n}@example.com', username=f'bench-doctor{n}', role='doctor')
+            for n in range(doctor_count)
+        ]
+        patients = [
+            CustomUser.objects.create_user(email=f'bench-patient{n}@example.com', username=f'bench-patient{n}', role='patient')
+            for n in range(doctor_count * 10)
+        ]
+        rng = random.Random(0)
+        # Every doctor sees 16 half-hour appointments a day; the history is centred on today
+        days = -(-size // (doctor_count * 16))
+        first_day = date.today() - timedelta(days=days // 2)
+        batch = []
+        for n in range(size):
+            slot, day = (n // doctor_count) % 16, n // (doctor_count * 16)
+            start = datetime.combine(first_day + timedelta(days=day), time(9)) + timedelta(minutes=30 * slot)
+            batch.append(Appointment(
+                doctor=doctors[n % doctor_count], patient=rng.choice(patients),
+                appointment_date=start.date(), start_time=start.time(),
+                end_time=(start + timedelta(minutes=30)).time(),
+                status='SCHEDULED' if start.date() >= date.today() else rng.choice(['COMPLETED', 'CANCELLED']),
+            ))
+            if len(batch) == 10_000:
+                Appointment.objects.bulk_create(batch, batch_size=2000)
+                batch = []
+        Appointment.objects.bulk_create(batch, batch_size=2000)
+        # With DEBUG on, the seeding inserts would otherwise fill the bounded query log
+        connection.queries_log.clear()
+        return doctors[0]
+
+    def report(self, size, label, doctor, runs):
+        scenarios = {
+            'first page': {},
+            'next 30 days': {
+                'from': date.today().isoformat(), 'to': (date.today() + timedelta(days=29)).isoformat(),
+            },
+            'scheduled only': {'status': 'SCHEDULED'},
+        }
+        for name, params in scenarios.items():
+            timings, queries = self.measure(doctor, params, runs)
+            self.stdout.write(
+                f"{size:>9} rows, {label:<8} {name:<15} median {statistics.median(timings):8.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms, {queries} queries/request"
+            )
+
+    def measure(self, doctor, params, runs):
+        view = AppointmentListCreateView.as_view()
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(runs):
+            request = factory.get('/api/', params, HTTP_HOST='localhost')
+            force_authenticate(request, user=doctor)
+            with CaptureQueriesContext(connection) as ctx:
+                started = timer.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((timer.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+        timings.sort()
+        return timings, len(ctx.captured_queries)
@@ -0,0 +1,80 @@
+import random
+import statistics
+import time as timer
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import CustomUser
+from apps.appointments.models import Appointment
+from apps.appointments.views import DoctorAvailabilityView
+
+
+class Command(BaseCommand):
+    help = "Time the doctor availability endpoint over a 90-day window for a doctor with a long history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history', type=int, default=50_000, help="Past appointments of the doctor.")
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            doctor, patient = self.seed(options['history'], options['days'])
+            self.measure(doctor, options['days'], options['runs'])
+            transaction.set_rollback(True)
+
+    def seed(self, history, days):
+        doctor = CustomUser.objects.create_user(email='bench-doctor@example.com', username='bench-doctor', role='doctor')
+        patient = CustomUser.objects.create_user(email='bench-patient@example.com', username='bench-patient', role='patient')
+        rng = random.Random(0)
+        rows = []
+        # 16 half-hour appointments per day going back from yesterday
+        for n in range(history):
+            day = date.today() - timedelta(days=1 + n // 16)
+            start = datetime.combine(day, time(9)) + timedelta(minutes=30 * (n % 16))
+            rows.append(Appointment(
+                doctor=doctor, patient=patient, appointment_date=day,
+                start_time=start.time(), end_time=(start + timedelta(minutes=30)).time(),
+                status=rng.choice(['COMPLETED', 'COMPLETED', 'CANCELLED']),
+            ))
+        # About half of the upcoming half-hour slots are booked
+        for offset in range(days):
+            day = date.today() + timedelta(days=offset)
+            for slot in range(16):
+                if rng.random() < 0.5:
+                    start = datetime.combine(day, time(9)) + timedelta(minutes=30 * slot)
+                    rows.append(Appointment(
+                        doctor=doctor, patient=patient, appointment_date=day,
+                        start_time=start.time(), end_time=(start + timedelta(minutes=30)).time(),
+                    ))
+        Appointment.objects.bulk_create(rows, batch_size=2000)
+        self.stdout.write(f"Seeded {len(rows)} appointments for doctor {doctor.id}.")
+        return doctor, patient
+
+    def measure(self, doctor, days, runs):
+        view = DoctorAvailabilityView.as_view()
+        factory = APIRequestFactory()
+        params = {
+            'from': date.today().isoformat(),
+            'to': (date.today() + timedelta(days=days - 1)).isoformat(),
+            'duration': 30,
+        }
+        timings = []
+        for _ in range(runs):
+            request = factory.get(f'/api/doctors/{doctor.id}/availability/', params)
+            with CaptureQueriesContext(connection) as ctx:
+                started = timer.perf_counter()
+                response = view(request, pk=doctor.id)
+                response.render()
+                timings.append((timer.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+        timings.sort()
+        self.stdout.write(
+            f"{days}-day window: median {statistics.median(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, {len(ctx.captured_queries)} queries/request"
+        )
@@ -0,0 +1,104 @@
+import random
+import statistics
+import time as timer
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from apps.appointments.features import FEATURES
+from apps.appointments.recommendations import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the recommendation feature encoding against the encoding in model.ipynb "
+        "(LabelEncoder.transform per value and a one-row DataFrame), for single requests and batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=2000, help="Single-request encodings per approach.")
+        parser.add_argument('--batch-sizes', default='10,100,1000', help="Comma-separated batch sizes.")
+
+    def handle(self, *args, **options):
+        registry = ModelRegistry().load()
+        rng = random.Random(0)
+        requests = [self.random_request(rng, registry.choices) for _ in range(options['runs'])]
+        notebook = NotebookEncoding(registry)
+
+        for request in requests[:100]:
+            assert np.array_equal(notebook.encode_one(request), registry.features.encode_one(request)), request
+
+        for name, encode in [('notebook', notebook.encode_one), ('FeatureEncoder', registry.features.encode_one)]:
+            timings = []
+            for request in requests:
+                started = timer.perf_counter()
+                encode(request)
+                timings.append((timer.perf_counter() - started) * 1e6)
+            timings.sort()
+            self.stdout.write(
+                f"single request, {name:<15} median {statistics.median(timings):8.1f} us, "
+                f"p99 {timings[int(len(timings) * 0.99) - 1]:8.1f} us"
+            )
+
+        for size in [int(value) for value in options['batch_sizes'].split(',')]:
+            batch = [self.random_request(rng, registry.choices) for _ in range(size)]
+            for name, encode in [('notebook', notebook.encode), ('FeatureEncoder', registry.features.encode)]:
+                timings = []
+                for _ in range(20):
+                    started = timer.perf_counter()
+                    encode(batch)
+                    timings.append((timer.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"batch of {size:>5}, {name:<15} median {statistics.median(timings):8.3f} ms, "
+                    f"{statistics.median(timings) * 1000 / size:6.2f} us per request"
+                )
+
+    def random_request(self, rng, choices):
+        return {
+            'specialization': rng.choice(choices['specialization']),
+            'time_slot': rng.choice(choices['time_slot']),
+            'patient_age': rng.randint(1, 90),
+            'patient_gender': rng.choice(choices['patient_gender']),
+            'date': date.fromordinal(date(2025, 1, 1).toordinal() + rng.randrange(365)),
+            'is_holiday': rng.random() < 0.1,
+        }
+
+
+class NotebookEncoding:
+    """
+    The inference cell of model.ipynb, given the training codes of the specialization and
+    gender names that its identity encoders expect.
+    """
+    def __init__(self, registry):
+        self.encoders = registry.encoders
+        self.codes = {
+            field: {name: code for code, name in enumerate(registry.choices[field])}
+            for field in ('specialization', 'patient_gender')
+        }
+
+    def row(self, request):
+        specialization_encoder = self.encoders['specialization']
+        time_slot_encoder = self.encoders['time_slot']
+        gender_encoder = self.encoders['gender']
+        specialization = self.codes['specialization'][request['specialization']]
+        gender = self.codes['patient_gender'][request['patient_gender']]
+        day = request['date']
+        return [
+            specialization_encoder.transform([specialization])[0] if specialization in specialization_encoder.classes_ else -1,
+            time_slot_encoder.transform([request['time_slot']])[0] if request['time_slot'] in time_slot_encoder.classes_ else -1,
+            request['patient_age'],
+            gender_encoder.transform([gender])[0] if gender in gender_encoder.classes_ else -1,
+            day.weekday(),
+            int(request['is_holiday']),
+            day.month,
+            day.year,
+            day.day,
+        ]
+
+    def encode_one(self, request):
+        return pd.DataFrame([self.row(request)], columns=list(FEATURES))
+
+    def encode(self, requests):
+        return pd.DataFrame([self.row(request) for request in requests], columns=list(FEATURES))
@@ -0,0 +1,70 @@
+import gc
+import multiprocessing
+import random
+import statistics
+import time as timer
+
+import psutil
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.appointments.recommendations import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the recommendation model unpickled with joblib against the compiled, memory-mapped "
+        "forest: load time, process RSS, and single-request and batch prediction latency. "
+        "Each is measured in a fresh process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=2000, help="Single-request predictions per model.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not ModelRegistry().compiled or not (ModelRegistry().compiled / 'manifest.json').exists():
+            raise CommandError("Run manage.py compile_recommendation_model first.")
+        context = multiprocessing.get_context('fork')
+        for name, compiled in [('joblib', ''), ('compiled', None)]:
+            with context.Pool(1) as pool:
+                result = pool.apply(measure, (compiled, options['runs'], options['batch_size']))
+            self.stdout.write(
+                f"{name:<9} load {result['load'] * 1000:8.1f} ms, RSS +{result['rss_loaded'] / 2**20:6.1f} MiB "
+                f"after load, +{result['rss_used'] / 2**20:6.1f} MiB after predicting; single request "
+                f"median {result['median'] * 1e6:7.1f} us, p99 {result['p99'] * 1e6:7.1f} us; "
+                f"batch of {options['batch_size']} {result['batch'] * 1000:7.1f} ms"
+            )
+
+
+def measure(compiled, runs, batch_size):
+    process = psutil.Process()
+    gc.collect()
+    rss = process.memory_info().rss
+    started = timer.perf_counter()
+    registry = ModelRegistry(compiled=compiled).load()
+    load = timer.perf_counter() - started
+    rss_loaded = process.memory_info().rss - rss
+
+    rng = random.Random(0)
+    requests = registry.training_requests()
+    rows = registry.features.encode([rng.choice(requests) for _ in range(runs)])
+    timings = []
+    for n in range(runs):
+        started = timer.perf_counter()
+        registry.predict(rows[n:n + 1])
+        timings.append(timer.perf_counter() - started)
+    timings.sort()
+    batch = registry.features.encode([rng.choice(requests) for _ in range(batch_size)])
+    batch_timings = []
+    for _ in range(10):
+        started = timer.perf_counter()
+        registry.predict(batch)
+        batch_timings.append(timer.perf_counter() - started)
+    return {
+        'load': load,
+        'rss_loaded': rss_loaded,
+        'rss_used': process.memory_info().rss - rss,
+        'median': statistics.median(timings),
+        'p99': timings[int(len(timings) * 0.99) - 1],
+        'batch': statistics.median(batch_timings),
+    }
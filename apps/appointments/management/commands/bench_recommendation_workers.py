@@ -0,0 +1,79 @@
+import gc
+import multiprocessing
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.appointments.recommendations import ModelRegistry
+
+MODES = [
+    ('pickle, loaded by each worker', '', False),
+    ('pickle, preloaded before fork', '', True),
+    ('compiled, loaded by each worker', None, False),
+    ('compiled, preloaded before fork', None, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fork several workers serving recommendations and report the memory each holds alone and shares, "
+        "for the pickled and the compiled model, loaded before or after the fork."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=500, help="Requests each worker scores before measuring.")
+
+    def handle(self, *args, **options):
+        if not ModelRegistry().compiled or not (ModelRegistry().compiled / 'manifest.json').exists():
+            raise CommandError("Run manage.py compile_recommendation_model first.")
+        context = multiprocessing.get_context('fork')
+        mib = 2**20
+        for name, compiled, preload in MODES:
+            # Each mode runs under its own master process, as a server would
+            results = context.Queue()
+            master = context.Process(
+                target=serve, args=(context, results, compiled, preload, options['workers'], options['requests'])
+            )
+            master.start()
+            reports = [results.get() for _ in range(options['workers'])]
+            master.join()
+            total_pss = sum(report['process']['pss'] for report in reports)
+            self.stdout.write(f"{name}: {options['workers']} workers, {total_pss / mib:.1f} MiB PSS in total")
+            for report in reports:
+                usage, files = report['process'], report['model_files']
+                line = (
+                    f"  pid {report['pid']:>7}  uss {usage['uss'] / mib:6.1f} MiB  pss {usage['pss'] / mib:6.1f} MiB  "
+                    f"shared {usage['shared'] / mib:6.1f} MiB"
+                )
+                if files:
+                    line += f"  model files: unique {files['unique'] / mib:5.1f} MiB, shared {files['shared'] / mib:5.1f} MiB"
+                self.stdout.write(line)
+
+
+def serve(context, results, compiled, preload, workers, requests):
+    registry = ModelRegistry(compiled=compiled)
+    if preload:
+        registry.load()
+        gc.freeze()
+    barrier = context.Barrier(workers)
+    processes = [
+        context.Process(target=work, args=(registry, barrier, results, requests, seed)) for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def work(registry, barrier, results, requests, seed):
+    registry.load()
+    rng = random.Random(seed)
+    training = registry.training_requests()
+    for _ in range(requests):
+        registry.recommend([rng.choice(training)])
+    # Measure once every worker has loaded and used the model, and stay alive until all
+    # have measured, so each sees the pages the others share
+    barrier.wait()
+    results.put(registry.memory())
+    barrier.wait()
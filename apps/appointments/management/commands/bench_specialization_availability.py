@@ -0,0 +1,83 @@
+import random
+import statistics
+import time as timer
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import CustomUser, DoctorProfile, Specialization
+from apps.appointments import slots
+from apps.appointments.models import DoctorDaySlots
+from apps.appointments.views import SpecializationAvailabilityView
+
+
+class Command(BaseCommand):
+    help = "Time the specialization-wide availability search for many doctors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=300)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--occupancy', type=float, default=0.9, help="Share of opening hours already booked.")
+        parser.add_argument('--runs', type=int, default=30)
+
+    def handle(self, *args, **options):
+        # Everything runs inside a transaction that is rolled back at the end
+        with transaction.atomic():
+            specialization = self.seed(options['doctors'], options['days'], options['occupancy'])
+            self.measure(specialization, options['days'], options['runs'])
+            transaction.set_rollback(True)
+
+    def seed(self, doctors, days, occupancy):
+        specialization = Specialization.objects.create(name='Bench specialization')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f'bench-doctor{n}@example.com', username=f'bench-doctor{n}', role='doctor')
+            for n in range(doctors)
+        ])
+        profiles = DoctorProfile.objects.bulk_create([
+            DoctorProfile(user=user, license_number=f'BENCH-{user.pk}') for user in users
+        ])
+        DoctorProfile.specializations.through.objects.bulk_create([
+            DoctorProfile.specializations.through(doctorprofile_id=p.pk, specialization_id=specialization.pk)
+            for p in profiles
+        ])
+        # Day bitmaps with the 9:00-17:00 half-hour blocks booked at random
+        rng = random.Random(0)
+        rows = []
+        for user in users:
+            for offset in range(days):
+                mask = 0
+                for block in range(16):
+                    if rng.random() < occupancy:
+                        mask |= ((1 << 6) - 1) << (108 + 6 * block)
+                rows.append(DoctorDaySlots(doctor=user, date=date.today() + timedelta(days=offset), bitmap=slots.to_bytes(mask)))
+        DoctorDaySlots.objects.bulk_create(rows, batch_size=2000)
+        self.stdout.write(f"Seeded {doctors} doctors and {len(rows)} day bitmaps.")
+        return specialization
+
+    def measure(self, specialization, days, runs):
+        view = SpecializationAvailabilityView.as_view()
+        factory = APIRequestFactory()
+        for limit in (10, 100):
+            params = {
+                'from': date.today().isoformat(),
+                'to': (date.today() + timedelta(days=days - 1)).isoformat(),
+                'duration': 60,
+                'limit': limit,
+            }
+            timings = []
+            for _ in range(runs):
+                request = factory.get(f'/api/specializations/{specialization.id}/availability/', params)
+                with CaptureQueriesContext(connection) as ctx:
+                    started = timer.perf_counter()
+                    response = view(request, pk=specialization.id)
+                    response.render()
+                    timings.append((timer.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+            timings.sort()
+            self.stdout.write(
+                f"limit={limit}: median {statistics.median(timings):.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, {len(ctx.captured_queries)} queries/request"
+            )
@@ -0,0 +1,70 @@
+import random
+import time as timer
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.appointments.features import FEATURES
+from apps.appointments.lookup import LookupTable, input_domains
+from apps.appointments.recommendations import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the recommendation of every input combination, ages bucketed, into a lookup table "
+        "next to the compiled forest, and report its size and agreement with live inference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age-bucket', type=int, default=1,
+            help="Years per age bucket. 1 makes the table exact; wider buckets shrink it but disagree with "
+                 "live inference on some requests (5: a fifth of the size, about 94%% agreement).",
+        )
+        parser.add_argument('--ages', help="Age range as LOW-HIGH; defaults to that of the training data.")
+        parser.add_argument('--sample', type=int, default=20_000, help="Random requests to check agreement on.")
+        parser.add_argument('--output', help="Directory to write; defaults to RECOMMENDATION_COMPILED_MODEL_DIR.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or ModelRegistry().compiled
+        if output is None:
+            raise CommandError("Give --output or set RECOMMENDATION_COMPILED_MODEL_DIR.")
+        # Live inference: the model itself, not a table
+        registry = ModelRegistry(compiled='').load()
+        training = registry.training_requests()
+        if options['ages']:
+            low, high = (int(age) for age in options['ages'].split('-'))
+        else:
+            ages = [request['patient_age'] for request in training]
+            low, high = min(ages), max(ages)
+
+        started = timer.perf_counter()
+        lookup = LookupTable.build(registry, options['age_bucket'], (low, high), input_domains(registry.choices))
+        elapsed = timer.perf_counter() - started
+        shape = ' x '.join(f"{size} {name}" for size, name in zip(lookup.table.shape, FEATURES))
+        self.stdout.write(
+            f"Built {lookup.table.size} entries ({lookup.table.nbytes / 2**20:.1f} MiB) in {elapsed:.1f} s: {shape}."
+        )
+
+        rng = random.Random(0)
+        sample = [
+            dict(
+                rng.choice(training), patient_age=rng.randint(low, high),
+                date=date(2025, 1, 1) + timedelta(days=rng.randrange(365)), is_holiday=rng.random() < 0.5,
+            )
+            for _ in range(options['sample'])
+        ]
+        for name, requests in [('training data', training), ('random requests', sample)]:
+            features = registry.features.encode(requests)
+            predictions, found = lookup.predict(features)
+            live = registry.predict(features[found])
+            agree = predictions[found] == live
+            per_output = ', '.join(
+                f"{output} {agree[:, k].mean():.2%}" for k, output in enumerate(('doctor', 'time slot', 'peak alert'))
+            )
+            self.stdout.write(
+                f"{name}: {found.mean():.1%} of {len(requests)} in the table; all outputs agree on "
+                f"{agree.all(axis=1).mean():.2%} ({per_output})."
+            )
+        lookup.save(output)
+        self.stdout.write(f"Saved to {output}.")
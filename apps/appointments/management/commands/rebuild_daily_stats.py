@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.appointments import stats
+from apps.appointments.models import Appointment, ArchivedAppointment, DoctorDailyStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-doctor daily appointment totals from the appointment and archive tables "
+        "and report every row that differed from the stored totals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, help="Only rebuild this doctor's totals.")
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only compare; exit with an error if any stored total is wrong.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        sources = [Appointment.objects.all(), ArchivedAppointment.objects.all()]
+        stored_rows = DoctorDailyStats.objects.all()
+        if options['doctor']:
+            sources = [queryset.filter(doctor_id=options['doctor']) for queryset in sources]
+            stored_rows = stored_rows.filter(doctor_id=options['doctor'])
+
+        with transaction.atomic():
+            totals = {}
+            for queryset in sources:
+                stats.fold(
+                    queryset.values_list('doctor_id', 'appointment_date', 'start_time', 'end_time', 'status').iterator(),
+                    totals=totals,
+                )
+            stored = {
+                (doctor_id, day, status): (count, minutes)
+                for doctor_id, day, status, count, minutes in stored_rows.values_list(
+                    'doctor_id', 'date', 'status', 'count', 'booked_minutes'
+                ).iterator()
+            }
+            drifted = sorted(key for key in totals.keys() | stored.keys() if totals.get(key) != stored.get(key))
+            for doctor_id, day, status in drifted[:20]:
+                self.stdout.write(
+                    f"  doctor {doctor_id} {day} {status}: stored {stored.get((doctor_id, day, status))}, "
+                    f"actual {totals.get((doctor_id, day, status))}"
+                )
+
+            if options['verify']:
+                if drifted:
+                    raise CommandError(f"{len(drifted)} of {len(totals)} daily totals are wrong.")
+                self.stdout.write(f"All {len(totals)} daily totals match the appointment tables.")
+                return
+
+            stored_rows.delete()
+            DoctorDailyStats.objects.bulk_create(
+                [
+                    DoctorDailyStats(doctor_id=doctor_id, date=day, status=status, count=count, booked_minutes=minutes)
+                    for (doctor_id, day, status), (count, minutes) in totals.items()
+                ],
+                batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(f"Rebuilt {len(totals)} daily totals ({len(drifted)} differed from the stored totals).")
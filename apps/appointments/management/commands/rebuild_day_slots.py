@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.appointments import slots
+from apps.appointments.models import Appointment, DoctorDaySlots
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-doctor day-slot bitmaps from SCHEDULED appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, help="Only rebuild this doctor's bitmaps.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        appointments = Appointment.objects.filter(status='SCHEDULED')
+        day_slots = DoctorDaySlots.objects.all()
+        if options['doctor']:
+            appointments = appointments.filter(doctor_id=options['doctor'])
+            day_slots = day_slots.filter(doctor_id=options['doctor'])
+
+        with transaction.atomic():
+            masks = slots.day_masks(
+                appointments.values_list('doctor_id', 'appointment_date', 'start_time', 'end_time').iterator()
+            )
+            previous = {
+                (doctor_id, day): slots.from_bytes(bitmap)
+                for doctor_id, day, bitmap in day_slots.values_list('doctor_id', 'date', 'bitmap').iterator()
+            }
+            day_slots.delete()
+            DoctorDaySlots.objects.bulk_create(
+                [
+                    DoctorDaySlots(doctor_id=doctor_id, date=day, bitmap=slots.to_bytes(mask))
+                    for (doctor_id, day), mask in masks.items()
+                ],
+                batch_size=options['batch_size'],
+            )
+
+        drifted = sum(1 for key in masks.keys() | previous.keys() if masks.get(key) != previous.get(key))
+        self.stdout.write(f"Rebuilt {len(masks)} doctor-days ({drifted} differed from the stored bitmaps).")
@@ -0,0 +1,47 @@
+import time as timer
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.appointments.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Email patients a reminder ahead of each scheduled appointment. Runs until interrupted "
+        "and resumes where it stopped when restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the reminders due now and exit (for cron).")
+        parser.add_argument('--interval', type=float, default=30, help="Seconds between checks for new bookings.")
+        parser.add_argument(
+            '--lead-minutes', type=int,
+            help="Remind this long before the appointment (default: settings.APPOINTMENT_REMINDER_LEAD_MINUTES).",
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help="Emails per send.")
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            lead=timedelta(minutes=options['lead_minutes']) if options['lead_minutes'] is not None else None,
+            # Reminders due before the next check must already be on the heap
+            lookahead=timedelta(seconds=max(600, 2 * options['interval'])),
+            batch_size=options['batch_size'],
+        )
+        try:
+            while True:
+                current = datetime.now()
+                sent = scheduler.tick(current)
+                if sent or options['once']:
+                    self.stdout.write(f"{current:%Y-%m-%d %H:%M:%S} sent {sent} reminders.")
+                if options['once']:
+                    break
+                wait = options['interval']
+                due = scheduler.next_due()
+                if due is not None:
+                    wait = min(wait, max((due - datetime.now()).total_seconds(), 0))
+                timer.sleep(wait)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.close()
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.appointments import slots
+
+
+def build_day_slots(apps, schema_editor):
+    Appointment = apps.get_model('appointments', 'Appointment')
+    DoctorDaySlots = apps.get_model('appointments', 'DoctorDaySlots')
+    rows = Appointment.objects.filter(status='SCHEDULED').values_list(
+        'doctor_id', 'appointment_date', 'start_time', 'end_time'
+    )
+    DoctorDaySlots.objects.bulk_create(
+        [
+            DoctorDaySlots(doctor_id=doctor_id, date=day, bitmap=slots.to_bytes(mask))
+            for (doctor_id, day), mask in slots.day_masks(rows.iterator()).items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_alter_appointment_unique_together_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='doctor_appointments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='patient_appointments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='DoctorDaySlots',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bitmap', models.BinaryField(max_length=36)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date'), name='unique_doctor_day_slots')],
+            },
+        ),
+        migrations.RunPython(build_day_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.appointments import stats
+
+
+def build_daily_stats(apps, schema_editor):
+    DoctorDailyStats = apps.get_model('appointments', 'DoctorDailyStats')
+    totals = {}
+    for model_name in ('Appointment', 'ArchivedAppointment'):
+        rows = apps.get_model('appointments', model_name).objects.values_list(
+            'doctor_id', 'appointment_date', 'start_time', 'end_time', 'status'
+        )
+        stats.fold(rows.iterator(), totals=totals)
+    DoctorDailyStats.objects.bulk_create(
+        [
+            DoctorDailyStats(doctor_id=doctor_id, date=day, status=status, count=count, booked_minutes=minutes)
+            for (doctor_id, day, status), (count, minutes) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_archivedappointment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('SCHEDULED', 'Scheduled'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date', 'status'), name='unique_doctor_daily_stats')],
+            },
+        ),
+        migrations.RunPython(build_daily_stats, migrations.RunPython.noop),
+    ]
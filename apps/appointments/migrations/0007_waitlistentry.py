@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-18 16:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_doctordailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('earliest_date', models.DateField()),
+                ('latest_date', models.DateField()),
+                ('earliest_time', models.TimeField(blank=True, null=True)),
+                ('latest_time', models.TimeField(blank=True, null=True)),
+                ('reason_for_visit', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('BOOKED', 'Booked'), ('WITHDRAWN', 'Withdrawn')], default='WAITING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('appointment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='appointments.appointment')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'status', 'created_at'], name='waitlist_queue_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,150 @@
 # appointments/models.py
-from django.db import models
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import connections, models, transaction
 from django.utils.timezone import now
 from apps.accounts.models import CustomUser
+from . import slots, stats
+from .events import publish_appointment_events
+
+
+class SlotUnavailable(Exception):
+    """
+    Raised when a booking overlaps a SCHEDULED appointment of the same doctor.
+    """
+
+
+class AppointmentManager(models.Manager):
+    def overlapping(self, doctor, appointment_date, start_time, end_time):
+        """
+        SCHEDULED appointments of ``doctor`` that overlap the given slot.
+        """
+        return self.filter(
+            doctor=doctor,
+            appointment_date=appointment_date,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+            status='SCHEDULED'
+        )
+
+    def lock_doctor(self, doctor_id):
+        """
+        Serialise writes to a doctor's schedule by locking the doctor row
+        (SELECT ... FOR UPDATE). SQLite ignores row locks, but with the database
+        option transaction_mode=IMMEDIATE every atomic block takes the write lock
+        at BEGIN, which gives the same guarantee. Must run inside a transaction.
+        """
+        list(CustomUser.objects.using(self.db).select_for_update().filter(pk=doctor_id).values_list('pk'))
+
+    def is_free(self, doctor, appointment_date, start_time, end_time):
+        """
+        Conflict check against the doctor's day bitmap. Only requests that do not
+        start or end on a 5-minute boundary fall back to the range query.
+        """
+        day_mask = DoctorDaySlots.objects.mask_for(doctor, appointment_date)
+        if not day_mask & slots.slot_mask(start_time, end_time):
+            return True
+        if slots.is_aligned(start_time) and slots.is_aligned(end_time):
+            return False
+        return not self.overlapping(doctor, appointment_date, start_time, end_time).exists()
+
+    def book(self, **fields):
+        """
+        Check the slot and insert the appointment as one atomic operation.
+        """
+        with transaction.atomic(using=self.db):
+            self.lock_doctor(fields['doctor'].pk)
+            if not self.is_free(
+                fields['doctor'], fields['appointment_date'], fields['start_time'], fields['end_time']
+            ):
+                raise SlotUnavailable("The selected time slot is already booked. Please choose a different time.")
+            return self.create(**fields)
+
+    def book_many(self, doctor, patient, requested, **fields):
+        """
+        Book every free slot of ``requested`` -- ``(appointment_date, start_time, end_time)``
+        tuples -- for one doctor and patient, in one transaction.
+
+        A single query loads the doctor's SCHEDULED appointments on the requested dates; slots
+        that overlap them, or an earlier slot of the same request, are skipped. The rest are
+        inserted with one bulk INSERT. Returns the new Appointment, or None for a conflicting
+        slot, in the order requested.
+        """
+        with transaction.atomic(using=self.db):
+            self.lock_doctor(doctor.pk)
+            busy = {}
+            for day, start_time, end_time in self.filter(
+                doctor=doctor, appointment_date__in={day for day, _, _ in requested}, status='SCHEDULED'
+            ).values_list('appointment_date', 'start_time', 'end_time'):
+                busy.setdefault(day, []).append((start_time, end_time))
+
+            results, created = [], []
+            for day, start_time, end_time in requested:
+                taken = busy.setdefault(day, [])
+                if any(start < end_time and end > start_time for start, end in taken):
+                    results.append(None)
+                    continue
+                taken.append((start_time, end_time))
+                appointment = self.model(
+                    doctor=doctor, patient=patient, appointment_date=day,
+                    start_time=start_time, end_time=end_time, **fields
+                )
+                results.append(appointment)
+                created.append(appointment)
+
+            # bulk_create() skips save(), so the day bitmaps are updated here
+            self.bulk_create(created)
+            DoctorDaySlots.objects.occupy_many(slots.day_masks(
+                (doctor.pk, a.appointment_date, a.start_time, a.end_time) for a in created
+            ))
+            DoctorDailyStats.objects.apply(stats.fold(a.slot_state() for a in created))
+            publish_appointment_events('appointment.created', [vars(a) for a in created])
+            return results
+
+    def transition(self, doctor, ids, new_status):
+        """
+        Move the appointments ``ids`` of ``doctor`` to ``new_status`` where
+        ``Appointment.ALLOWED_TRANSITIONS`` permits it. One query checks ownership and the
+        current status of every id; one UPDATE applies the change.
+        Returns ``(changed_ids, skipped)`` where ``skipped`` maps an id to the reason.
+        """
+        with transaction.atomic(using=self.db):
+            self.lock_doctor(doctor.pk)
+            current = {
+                row['id']: row
+                for row in self.filter(pk__in=ids, doctor=doctor).values(
+                    'id', 'doctor_id', 'patient_id', 'appointment_date', 'start_time', 'end_time', 'status'
+                )
+            }
+            changed, skipped, released = [], {}, set()
+            for pk in dict.fromkeys(ids):
+                if pk not in current:
+                    skipped[pk] = "Not found."
+                    continue
+                status, day = current[pk]['status'], current[pk]['appointment_date']
+                if new_status not in self.model.ALLOWED_TRANSITIONS.get(status, ()):
+                    skipped[pk] = f"Cannot change status from {status} to {new_status}."
+                    continue
+                changed.append(pk)
+                if status == 'SCHEDULED':
+                    released.add(day)
+
+            if changed:
+                # update() skips save(), so updated_at and the day bitmaps are maintained here
+                self.filter(pk__in=changed).update(status=new_status, updated_at=now())
+                DoctorDaySlots.objects.rebuild_days(doctor.pk, released)
+                moved = [
+                    tuple(current[pk][field] for field in self.model.SLOT_FIELDS) for pk in changed
+                ]
+                totals = stats.fold(moved, sign=-1)
+                DoctorDailyStats.objects.apply(stats.fold((row[:4] + (new_status,) for row in moved), totals=totals))
+                publish_appointment_events(
+                    'appointment.status_changed', [{**current[pk], 'status': new_status} for pk in changed]
+                )
+                if new_status == 'CANCELLED':
+                    WaitlistEntry.objects.fill(doctor.pk, [row[1:4] for row in moved if row[4] == 'SCHEDULED'])
+            return changed, skipped
+
 
 class Appointment(models.Model):
     STATUS_CHOICES = [
@@ -20,15 +163,423 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AppointmentManager()
+
+    # Status changes a doctor may make; COMPLETED and CANCELLED are final
+    ALLOWED_TRANSITIONS = {
+        'SCHEDULED': {'COMPLETED', 'CANCELLED'},
+    }
+
+    class Meta:
+        indexes = [
+            # Doctor dashboards and the overlap/availability queries scan a doctor's days in time order
+            models.Index(fields=['doctor', 'appointment_date', 'start_time'], name='appt_doctor_date_start_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appt_patient_date_idx'),
+            # The reminder scheduler reads upcoming appointments in start order
+            models.Index(fields=['appointment_date', 'start_time'], name='appt_date_start_idx'),
+        ]
+
+    # Fields that decide which day-bitmap bits an appointment occupies
+    SLOT_FIELDS = ('doctor_id', 'appointment_date', 'start_time', 'end_time', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.SLOT_FIELDS) <= set(field_names):
+            instance._loaded_slot = instance.slot_state()
+        return instance
+
+    def slot_state(self):
+        return tuple(getattr(self, name) for name in self.SLOT_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # Keep the doctor's day bitmaps in step with booking, cancelling and rescheduling
+        with transaction.atomic():
+            previous = self.__dict__.get('_loaded_slot')
+            if previous is None and not self._state.adding:
+                previous = Appointment.objects.filter(pk=self.pk).values_list(*self.SLOT_FIELDS).first()
+            Appointment.objects.lock_doctor(self.doctor_id)
+            created = self._state.adding
+            super().save(*args, **kwargs)
+            current = self.slot_state()
+            DoctorDaySlots.objects.appointment_changed(previous, current)
+            DoctorDailyStats.objects.appointment_changed(previous, current)
+            self._loaded_slot = current
+            if created:
+                publish_appointment_events('appointment.created', [vars(self)])
+            elif previous is not None and previous[4] != self.status:
+                publish_appointment_events('appointment.status_changed', [vars(self)])
+            if previous is not None and previous[4] == 'SCHEDULED' and self.status == 'CANCELLED':
+                WaitlistEntry.objects.fill(self.doctor_id, [previous[1:4]])
+
     def is_slot_available(self):
         """
         Check if the appointment slot is already booked.
         """
-        overlapping_appointments = Appointment.objects.filter(
-            doctor=self.doctor,
-            appointment_date=self.appointment_date,
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time,
-            status='SCHEDULED'
-        )
+        if self.pk is None:
+            return Appointment.objects.is_free(self.doctor, self.appointment_date, self.start_time, self.end_time)
+        # A saved appointment occupies its own bits, so exclude it with the range query
+        overlapping_appointments = Appointment.objects.overlapping(
+            self.doctor, self.appointment_date, self.start_time, self.end_time
+        ).exclude(pk=self.pk)
         return not overlapping_appointments.exists()
+
+
+class DoctorDaySlotsManager(models.Manager):
+    def mask_for(self, doctor, day):
+        bitmap = self.filter(doctor=doctor, date=day).values_list('bitmap', flat=True).first()
+        return slots.from_bytes(bitmap)
+
+    def occupy(self, doctor_id, day, mask):
+        updated = self.filter(doctor_id=doctor_id, date=day).first()
+        if updated is None:
+            self.create(doctor_id=doctor_id, date=day, bitmap=slots.to_bytes(mask))
+        else:
+            updated.bitmap = slots.to_bytes(updated.mask | mask)
+            updated.save(update_fields=['bitmap'])
+
+    def occupy_many(self, masks):
+        """
+        OR ``{(doctor_id, date): mask}`` into the bitmaps with one read, one bulk INSERT
+        for new days and one bulk UPDATE for existing ones.
+        """
+        if not masks:
+            return
+        existing = {
+            (row.doctor_id, row.date): row
+            for row in self.filter(
+                doctor_id__in={doctor_id for doctor_id, _ in masks}, date__in={day for _, day in masks}
+            )
+        }
+        created, updated = [], []
+        for (doctor_id, day), mask in masks.items():
+            row = existing.get((doctor_id, day))
+            if row is None:
+                created.append(self.model(doctor_id=doctor_id, date=day, bitmap=slots.to_bytes(mask)))
+            else:
+                row.bitmap = slots.to_bytes(row.mask | mask)
+                updated.append(row)
+        self.bulk_create(created)
+        self.bulk_update(updated, ['bitmap'])
+
+    def rebuild_day(self, doctor_id, day):
+        """
+        Recompute one day from its SCHEDULED appointments. Used when bits are released:
+        two appointments that do not start on a slot boundary can share a slot, so
+        clearing one appointment's bits in place could free time that is still booked.
+        """
+        mask = 0
+        for start_time, end_time in Appointment.objects.filter(
+            doctor_id=doctor_id, appointment_date=day, status='SCHEDULED'
+        ).values_list('start_time', 'end_time'):
+            mask |= slots.slot_mask(start_time, end_time)
+        if mask:
+            self.update_or_create(doctor_id=doctor_id, date=day, defaults={'bitmap': slots.to_bytes(mask)})
+        else:
+            self.filter(doctor_id=doctor_id, date=day).delete()
+
+    def rebuild_days(self, doctor_id, days):
+        """
+        rebuild_day() for several days of one doctor, with one read and bulk writes.
+        """
+        if not days:
+            return
+        masks = dict.fromkeys(days, 0)
+        for day, start_time, end_time in Appointment.objects.filter(
+            doctor_id=doctor_id, appointment_date__in=days, status='SCHEDULED'
+        ).values_list('appointment_date', 'start_time', 'end_time'):
+            masks[day] |= slots.slot_mask(start_time, end_time)
+        self.filter(doctor_id=doctor_id, date__in=[day for day, mask in masks.items() if not mask]).delete()
+        rows = {row.date: row for row in self.filter(doctor_id=doctor_id, date__in=days)}
+        created, updated = [], []
+        for day, mask in masks.items():
+            if not mask:
+                continue
+            row = rows.get(day)
+            if row is None:
+                created.append(self.model(doctor_id=doctor_id, date=day, bitmap=slots.to_bytes(mask)))
+            else:
+                row.bitmap = slots.to_bytes(mask)
+                updated.append(row)
+        self.bulk_create(created)
+        self.bulk_update(updated, ['bitmap'])
+
+    def appointment_changed(self, previous, current):
+        """
+        Apply an appointment's transition between two ``slot_state()`` tuples.
+        """
+        if previous == current:
+            return
+        rebuilt = None
+        if previous is not None and previous[4] == 'SCHEDULED':
+            rebuilt = previous[:2]
+            self.rebuild_day(*rebuilt)
+        if current[4] == 'SCHEDULED' and current[:2] != rebuilt:
+            self.occupy(current[0], current[1], slots.slot_mask(current[2], current[3]))
+
+
+class DoctorDaySlots(models.Model):
+    """
+    Occupancy of one doctor's day as a bitmap of 5-minute slots (see slots.py).
+    Derived from SCHEDULED appointments; rebuild with `manage.py rebuild_day_slots`.
+    """
+    doctor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='day_slots')
+    date = models.DateField()
+    bitmap = models.BinaryField(max_length=slots.BITMAP_BYTES)
+
+    objects = DoctorDaySlotsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='unique_doctor_day_slots'),
+        ]
+
+    @property
+    def mask(self):
+        return slots.from_bytes(self.bitmap)
+
+    def __str__(self):
+        return f"DoctorDaySlots: {self.doctor_id} on {self.date}"
+
+
+class DoctorDailyStatsManager(models.Manager):
+    def apply(self, totals):
+        """
+        Add ``{(doctor_id, date, status): (count, minutes)}`` (see stats.fold) to the stored
+        rows with one read and bulk writes. Rows whose count drops to zero are deleted.
+        """
+        totals = {key: change for key, change in totals.items() if change != (0, 0)}
+        if not totals:
+            return
+        existing = {
+            (row.doctor_id, row.date, row.status): row
+            for row in self.filter(
+                doctor_id__in={doctor_id for doctor_id, _, _ in totals},
+                date__in={day for _, day, _ in totals},
+            )
+        }
+        created, updated, emptied = [], [], []
+        for (doctor_id, day, status), (count, minutes) in totals.items():
+            row = existing.get((doctor_id, day, status))
+            if row is None:
+                # Nothing to subtract from: the row went with its doctor in a cascade delete
+                if count > 0:
+                    created.append(self.model(
+                        doctor_id=doctor_id, date=day, status=status, count=count, booked_minutes=max(minutes, 0)
+                    ))
+                continue
+            row.count += count
+            row.booked_minutes = max(row.booked_minutes + minutes, 0)
+            if row.count > 0:
+                updated.append(row)
+            else:
+                emptied.append(row.pk)
+        self.bulk_create(created)
+        self.bulk_update(updated, ['count', 'booked_minutes'])
+        if emptied:
+            self.filter(pk__in=emptied).delete()
+
+    def appointment_changed(self, previous, current):
+        """
+        Move one appointment between two ``slot_state()`` tuples; ``previous`` is None on create.
+        """
+        if previous == current:
+            return
+        totals = stats.fold([previous], sign=-1) if previous is not None else {}
+        self.apply(stats.fold([current], totals=totals))
+
+
+class DoctorDailyStats(models.Model):
+    """
+    Number of appointments and booked minutes per doctor, day and status, maintained with
+    every booking and status change. Archived appointments stay counted.
+    Recompute and verify with `manage.py rebuild_daily_stats`.
+    """
+    doctor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    status = models.CharField(max_length=50, choices=Appointment.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    booked_minutes = models.PositiveIntegerField(default=0)
+
+    objects = DoctorDailyStatsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date', 'status'], name='unique_doctor_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f"DoctorDailyStats: {self.doctor_id} on {self.date} ({self.status}: {self.count})"
+
+
+class ArchivedAppointmentManager(models.Manager):
+    # Only final appointments leave the hot table; a stale SCHEDULED row still needs attention
+    ARCHIVED_STATUSES = ('COMPLETED', 'CANCELLED')
+
+    def default_cutoff(self):
+        """
+        Appointments dated before this day are archived (``APPOINTMENT_ARCHIVE_AFTER_DAYS``).
+        """
+        return now().date() - timedelta(days=getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365))
+
+    def archive_batch(self, cutoff, batch_size=1000, after_id=0):
+        """
+        Move up to ``batch_size`` final appointments dated before ``cutoff`` -- the ones with
+        the lowest ids above ``after_id`` -- into the archive, in one transaction.
+        Each batch is complete or absent, so an interrupted run simply resumes on the next call.
+        Returns ``(number moved, highest id moved)``; ``(0, None)`` once nothing is left.
+        """
+        field_names = [field.attname for field in Appointment._meta.concrete_fields]
+        with transaction.atomic(using=self.db):
+            rows = list(
+                Appointment.objects.filter(
+                    pk__gt=after_id, appointment_date__lt=cutoff, status__in=self.ARCHIVED_STATUSES
+                ).order_by('pk').values_list(*field_names)[:batch_size]
+            )
+            if not rows:
+                return 0, None
+            self.bulk_create([self.model(**dict(zip(field_names, row))) for row in rows])
+            # The rows move rather than disappear, so Appointment's delete signals (which
+            # release slots and decrement the daily stats) must not run: delete them directly
+            table, pk = (connections[self.db].ops.quote_name(name) for name in (Appointment._meta.db_table, 'id'))
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(rows))})', [row[0] for row in rows]
+                )
+        return len(rows), rows[-1][0]
+
+
+class ArchivedAppointment(models.Model):
+    """
+    Cold storage for final appointments past the archive horizon. Rows keep their original
+    id and timestamps; see `manage.py archive_appointments`.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    doctor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_doctor_appointments')
+    patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_patient_appointments')
+    appointment_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=50, choices=Appointment.STATUS_CHOICES)
+    reason_for_visit = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedAppointmentManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'appointment_date', 'start_time'], name='archived_doctor_date_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='archived_patient_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived appointment {self.id} on {self.appointment_date}"
+
+
+class WaitlistEntryManager(models.Manager):
+    def fill(self, doctor_id, freed):
+        """
+        Offer a doctor's freed ``(date, start_time, end_time)`` slots to the waitlist. Waiting
+        entries are taken in queue order (request time, then id) and each is booked into the
+        earliest freed slot its window accepts, until the slots run out.
+
+        Runs in the caller's transaction, under its doctor lock, so a cancelled slot is either
+        refilled or left free atomically with the cancellation. The queue is read through the
+        (doctor, status, created_at) index and only as far as needed.
+        Returns the booked appointments.
+        """
+        cutoff = datetime.now()
+        open_slots = sorted(slot for slot in freed if datetime.combine(slot[0], slot[1]) > cutoff)
+        if not open_slots:
+            return []
+        # Bounds that every acceptable entry meets; accepts() makes the exact per-slot check
+        waiting = self.filter(
+            models.Q(earliest_time__isnull=True) | models.Q(earliest_time__lte=max(slot[1] for slot in open_slots)),
+            models.Q(latest_time__isnull=True) | models.Q(latest_time__gte=min(slot[2] for slot in open_slots)),
+            doctor_id=doctor_id, status='WAITING',
+            earliest_date__lte=open_slots[-1][0], latest_date__gte=open_slots[0][0],
+        ).select_related('doctor', 'patient').order_by('created_at', 'id')
+
+        booked = []
+        for entry in waiting.iterator(chunk_size=200):
+            slot = next((slot for slot in open_slots if entry.accepts(*slot)), None)
+            if slot is None:
+                continue
+            open_slots.remove(slot)
+            appointment, = Appointment.objects.book_many(
+                entry.doctor, entry.patient, [slot], reason_for_visit=entry.reason_for_visit
+            )
+            if appointment is not None:
+                entry.status, entry.appointment = 'BOOKED', appointment
+                entry.save(update_fields=['status', 'appointment', 'updated_at'])
+                booked.append(appointment)
+            if not open_slots:
+                break
+        return booked
+
+
+class WaitlistEntry(models.Model):
+    """
+    A patient waiting for an earlier appointment with a doctor, on any day between
+    earliest_date and latest_date and, optionally, within a daily time window.
+    Filled automatically when one of the doctor's SCHEDULED appointments is cancelled.
+    """
+    STATUS_CHOICES = [
+        ('WAITING', 'Waiting'),
+        ('BOOKED', 'Booked'),
+        ('WITHDRAWN', 'Withdrawn'),
+    ]
+
+    doctor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='waitlist_entries')
+    patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='waitlist_requests')
+    earliest_date = models.DateField()
+    latest_date = models.DateField()
+    earliest_time = models.TimeField(null=True, blank=True)
+    latest_time = models.TimeField(null=True, blank=True)
+    reason_for_visit = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
+    # No database constraint: archived appointments keep their id in the archive table
+    appointment = models.ForeignKey(
+        Appointment, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WaitlistEntryManager()
+
+    class Meta:
+        indexes = [
+            # The per-doctor queue, read in priority order
+            models.Index(fields=['doctor', 'status', 'created_at'], name='waitlist_queue_idx'),
+        ]
+
+    def accepts(self, day, start_time, end_time):
+        return (
+            self.earliest_date <= day <= self.latest_date
+            and (self.earliest_time is None or start_time >= self.earliest_time)
+            and (self.latest_time is None or end_time <= self.latest_time)
+        )
+
+    def __str__(self):
+        return f"Waitlist: patient {self.patient_id} for doctor {self.doctor_id} ({self.status})"
+
+
+class ReminderCursor(models.Model):
+    """
+    Where the reminder scheduler (apps/appointments/reminders.py) stopped, so a restart
+    resumes from here instead of rescanning the appointment table.
+
+    Every appointment with an id up to ``last_seen_id`` that starts at or before
+    (sent_through_date, sent_through_time, sent_through_id) has been handled.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_seen_id = models.BigIntegerField(default=0)
+    sent_through_date = models.DateField()
+    sent_through_time = models.TimeField()
+    sent_through_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Reminders {self.name}: sent through {self.sent_through_date} {self.sent_through_time}"
@@ -0,0 +1,312 @@
+"""
+Doctor and time slot recommendations from the model trained in models/new/model.ipynb.
+
+The notebook saved a RandomForestClassifier with three outputs (recommended doctor,
+recommended time slot, peak demand alert) and the label encoders of its inputs and
+outputs as joblib pickles. ModelRegistry loads them once per process, on first use, checks
+that they fit together and were pickled by the installed scikit-learn, and then scores any
+number of requests with a single predict() call. Inputs are encoded and outputs decoded
+by the FeatureEncoder compiled from the encoders (features.py). When the forest has been
+compiled into flat arrays (forest.py, manage.py compile_recommendation_model), those are
+memory-mapped instead of unpickling the model; recompile after retraining. A lookup table
+built next to them (lookup.py, manage.py build_recommendation_lookup) answers the requests
+it covers without running the model.
+
+Workers share one copy of the model. preload(), called by config/wsgi.py and
+config/asgi.py, loads it when the application is imported: a server that imports it
+before forking its workers (gunicorn --preload) loads the model once in the parent, and
+the compiled arrays are read-only file mappings that every process, forked or spawned
+(uvicorn --workers), shares through the page cache. ModelRegistry.memory() reports how much
+of the model's memory a worker holds alone, served by the recommendation health endpoint.
+
+The specialization and gender encoders that were saved map codes to themselves: the
+notebook label-encoded those columns twice and only kept the second encoders. The first
+step, name to code, is rebuilt here exactly as LabelEncoder did it: the sorted distinct
+values of the training data (data.csv).
+"""
+import csv
+import gc
+import hashlib
+import io
+import logging
+import os
+import threading
+import warnings
+import zipfile
+import zlib
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from .features import FEATURES, FeatureEncoder
+from .forest import MANIFEST_FILE, CompiledForest
+from .lookup import MANIFEST_FILE as LOOKUP_MANIFEST_FILE, LookupTable
+
+MODEL_FILE = 'healthcare_appointment_model.pkl'
+ENCODER_FILES = {
+    'doctor': 'doctor_encoder.pkl',
+    'specialization': 'specialization_encoder.pkl',
+    'time_slot': 'time_slot_encoder.pkl',
+    'gender': 'gender_encoder.pkl',
+}
+TRAINING_DATA_FILE = 'data.csv'
+OUTPUTS = ('recommended_doctor', 'recommended_time_slot', 'peak_demand_alert')
+
+logger = logging.getLogger(__name__)
+
+
+class ModelArtifactError(Exception):
+    """The saved artifacts are missing, unreadable, inconsistent, or from another scikit-learn version."""
+
+
+class ModelRegistry:
+    """
+    The recommendation model and its encoders, loaded on first use and kept for the life of
+    the process. Safe to share between threads: prediction only reads the loaded objects.
+    """
+    def __init__(self, directory=None, archive=None, compiled=None):
+        self.directory = Path(directory or settings.RECOMMENDATION_MODEL_DIR)
+        archive = archive if archive is not None else getattr(settings, 'RECOMMENDATION_MODEL_ARCHIVE', None)
+        self.archive = Path(archive) if archive else None
+        compiled = compiled if compiled is not None else getattr(settings, 'RECOMMENDATION_COMPILED_MODEL_DIR', None)
+        self.compiled = Path(compiled) if compiled else None
+        self.version = None
+        self.loaded_in_pid = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        if self._loaded:
+            return self
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self.loaded_in_pid = os.getpid()
+                self._loaded = True
+        return self
+
+    def _load(self):
+        if self.compiled and (self.compiled / MANIFEST_FILE).exists():
+            try:
+                self.model = CompiledForest.load(self.compiled)
+            except (ValueError, OSError, EOFError) as e:
+                raise ModelArtifactError(f"The compiled model in {self.compiled} could not be read: {e}") from None
+            # The encoders' classes are compiled along with the forest, so neither pickles
+            # nor scikit-learn are loaded
+            self.encoders = {
+                name: SimpleNamespace(classes_=np.array(classes))
+                for name, classes in self.model.manifest['encoders'].items()
+            }
+            self.version = self.model.manifest['version']
+        else:
+            digest = hashlib.sha256()
+            content = self._read(MODEL_FILE)
+            digest.update(hashlib.sha256(content).hexdigest().encode())
+            self.model = self._unpickle(MODEL_FILE, content)
+            self.encoders = {}
+            for name, filename in ENCODER_FILES.items():
+                content = self._read(filename)
+                digest.update(content)
+                self.encoders[name] = self._unpickle(filename, content)
+            self.version = digest.hexdigest()[:12]
+        with io.TextIOWrapper(io.BytesIO(self._read(TRAINING_DATA_FILE)), encoding='utf-8') as data:
+            rows = list(csv.DictReader(data))
+        self.choices = {
+            'specialization': sorted({row['specialization'] for row in rows}),
+            'time_slot': [str(value) for value in self.encoders['time_slot'].classes_],
+            'patient_gender': sorted({row['patient_gender'] for row in rows}),
+        }
+        self._validate()
+        self.features = FeatureEncoder.compile(self.encoders, self.choices)
+        self.lookup = None
+        if self.compiled and (self.compiled / LOOKUP_MANIFEST_FILE).exists():
+            try:
+                lookup = LookupTable.load(self.compiled)
+            except (ValueError, OSError, EOFError) as e:
+                logger.warning("The recommendation lookup table could not be read (%s); predicting live.", e)
+            else:
+                if lookup.version == self.version:
+                    self.lookup = lookup
+                else:
+                    logger.warning(
+                        "The recommendation lookup table was built for model %s, not %s; predicting live.",
+                        lookup.version, self.version,
+                    )
+        if not isinstance(self.model, CompiledForest):
+            # Columns are passed in FEATURES order as a plain array; without the fitted names
+            # scikit-learn no longer warns on every call that the array has none
+            del self.model.feature_names_in_
+
+    def _read(self, filename):
+        path = self.directory / filename
+        try:
+            if path.exists():
+                return path.read_bytes()
+            # The model pickle is too large for the repository and only ships inside the archive
+            if self.archive and self.archive.exists():
+                with zipfile.ZipFile(self.archive) as archive:
+                    for member in (f'{self.directory.name}/{filename}', filename):
+                        if member in archive.namelist():
+                            return archive.read(member)
+        except (OSError, EOFError, zipfile.BadZipFile, zlib.error) as e:
+            raise ModelArtifactError(f"{filename} could not be read: {e}") from None
+        raise ModelArtifactError(f"{filename} is in neither {self.directory} nor {self.archive}.")
+
+    def _unpickle(self, filename, content):
+        from sklearn.exceptions import InconsistentVersionWarning
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', InconsistentVersionWarning)
+            try:
+                return joblib.load(io.BytesIO(content))
+            except InconsistentVersionWarning as warning:
+                raise ModelArtifactError(
+                    f"{filename} was saved by scikit-learn {warning.original_sklearn_version}, "
+                    f"but {warning.current_sklearn_version} is installed."
+                ) from None
+            except Exception as e:
+                # A truncated or corrupt pickle can fail in almost any way (UnpicklingError,
+                # EOFError, KeyError, ...) depending on where the damage is
+                raise ModelArtifactError(f"{filename} could not be unpickled: {e!r}") from None
+
+    def _validate(self):
+        model, encoders = self.model, self.encoders
+        if tuple(getattr(model, 'feature_names_in_', ())) != FEATURES:
+            raise ModelArtifactError(f"The model's input columns are not {', '.join(FEATURES)}.")
+        if getattr(model, 'n_outputs_', None) != len(OUTPUTS):
+            raise ModelArtifactError(f"The model should have {len(OUTPUTS)} outputs.")
+        expected = [
+            ('recommended_doctor', model.classes_[0], np.arange(len(encoders['doctor'].classes_))),
+            ('recommended_time_slot', model.classes_[1], np.arange(len(encoders['time_slot'].classes_))),
+            ('peak_demand_alert', model.classes_[2], np.arange(2)),
+            ('specialization', encoders['specialization'].classes_, np.arange(len(self.choices['specialization']))),
+            ('patient_gender', encoders['gender'].classes_, np.arange(len(self.choices['patient_gender']))),
+        ]
+        for name, classes, codes in expected:
+            if not np.array_equal(classes, codes):
+                raise ModelArtifactError(f"The {name} classes of the model and its encoders do not match.")
+
+    @property
+    def backend(self):
+        if not self._loaded:
+            return None
+        return 'compiled' if isinstance(self.model, CompiledForest) else 'pickle'
+
+    def memory(self):
+        """
+        Memory of this process, in bytes: rss, uss (the pages no other process shares) and
+        pss (rss with each shared page split between its sharers). With the compiled model,
+        the same for the pages of its mapped files, whose unique share should stay near zero
+        when several workers serve it. Read from /proc; Linux only.
+        """
+        import psutil
+
+        process = psutil.Process()
+        usage = process.memory_full_info()
+        report = {
+            'pid': os.getpid(),
+            'loaded': self._loaded,
+            'loaded_before_fork': self._loaded and self.loaded_in_pid != os.getpid(),
+            'backend': self.backend,
+            'version': self.version,
+            'process': {'rss': usage.rss, 'uss': usage.uss, 'pss': usage.pss, 'shared': usage.rss - usage.uss},
+            'model_files': None,
+        }
+        if self.backend == 'compiled':
+            directory = self.compiled.resolve()
+            maps = [mapping for mapping in process.memory_maps() if Path(mapping.path).parent == directory]
+            report['model_files'] = {
+                'rss': sum(mapping.rss for mapping in maps),
+                'unique': sum(mapping.private_clean + mapping.private_dirty for mapping in maps),
+                'shared': sum(mapping.shared_clean + mapping.shared_dirty for mapping in maps),
+                'pss': sum(mapping.pss for mapping in maps),
+            }
+        return report
+
+    def training_requests(self):
+        """
+        The rows of the training data as requests, in file order.
+        """
+        with io.TextIOWrapper(io.BytesIO(self._read(TRAINING_DATA_FILE)), encoding='utf-8') as data:
+            return [
+                {
+                    'specialization': row['specialization'],
+                    'time_slot': row['time_slot'],
+                    'patient_age': int(row['patient_age']),
+                    'patient_gender': row['patient_gender'],
+                    'date': date.fromisoformat(row['date'][:10]),
+                    'is_holiday': row['is_holiday'] == '1',
+                }
+                for row in csv.DictReader(data)
+            ]
+
+    def holdout_requests(self):
+        """
+        The training rows model.ipynb held out for testing.
+        """
+        from sklearn.model_selection import train_test_split
+
+        return train_test_split(self.training_requests(), test_size=0.2, random_state=42)[1]
+
+    def predict(self, features):
+        self.load()
+        return self.model.predict(features)
+
+    def recommend(self, requests):
+        """
+        The recommendation for each request, in order: from the lookup table when there is
+        one, and from one predict() call for the requests it does not cover.
+        """
+        if not requests:
+            return []
+        self.load()
+        features = self.features.encode(requests)
+        if self.lookup is None:
+            return self.features.decode(self.predict(features))
+        predictions, found = self.lookup.predict(features)
+        if not found.all():
+            predictions[~found] = self.predict(features[~found])
+        return self.features.decode(predictions)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    The process-wide registry. Its artifacts are loaded by the first request that needs them.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def preload():
+    """
+    Load the process-wide registry now, unless RECOMMENDATION_PRELOAD is off. Missing or
+    broken artifacts are logged and left to fail the requests that need them, so the
+    application still starts.
+    """
+    registry = get_registry()
+    if not getattr(settings, 'RECOMMENDATION_PRELOAD', True):
+        return registry
+    try:
+        registry.load()
+    except ModelArtifactError:
+        logger.exception("The recommendation model could not be preloaded.")
+        return registry
+    # Move everything loaded so far out of the collector's reach: a collection in a forked
+    # worker writes to the header of every object it visits, copying the page it is on
+    gc.freeze()
+    return registry
@@ -0,0 +1,167 @@
+"""
+Reminder emails ahead of scheduled appointments (manage.py send_appointment_reminders).
+
+ReminderScheduler keeps the reminders due soon in a min-heap ordered by send time. On each
+tick it
+
+* loads the next SCHEDULED appointments, in start order, from where the previous load
+  stopped, up to those whose reminder falls due within ``lookahead``;
+* picks up appointments booked since the previous tick that start before the loads have
+  already reached (bookings made less than the lead time ahead), by id;
+* pops the due reminders and emails them in batches over one mail connection that stays
+  open across batches and ticks.
+
+Both positions are stored in a ReminderCursor row after every batch, so a restarted
+scheduler resumes from there instead of rescanning the table. A batch that fails to send
+goes back on the heap for the next tick; only a crash between sending a batch and saving
+the cursor can repeat a reminder.
+"""
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Max, Q
+
+from .models import Appointment, ReminderCursor
+
+logger = logging.getLogger(__name__)
+
+
+def starts_after(key):
+    """Appointments that come after ``key`` = (date, start_time, id) in start order."""
+    day, start, pk = key
+    return (
+        Q(appointment_date__gt=day)
+        | Q(appointment_date=day, start_time__gt=start)
+        | Q(appointment_date=day, start_time=start, id__gt=pk)
+    )
+
+
+class ReminderScheduler:
+    def __init__(self, name='default', lead=None, lookahead=timedelta(minutes=10), batch_size=100,
+                 load_limit=5000, connection=None):
+        if lead is None:
+            lead = timedelta(minutes=getattr(settings, 'APPOINTMENT_REMINDER_LEAD_MINUTES', 24 * 60))
+        self.name = name
+        self.lead = lead
+        self.lookahead = lookahead
+        self.batch_size = batch_size
+        self.load_limit = load_limit
+        self.connection = connection or get_connection()
+        # (send at, date, start_time, id) for every loaded reminder not yet sent
+        self.heap = []
+        self.cursor = None
+        self.loaded_through = None
+        self.seen_id = None
+        # Ids pushed by the newly-booked scan and not yet sent; the stored last_seen_id stays below them
+        self.pending_new = set()
+
+    def start(self, now):
+        # The first run starts from ``now``: appointments that have already begun get no reminder
+        self.cursor, _ = ReminderCursor.objects.get_or_create(name=self.name, defaults={
+            'last_seen_id': Appointment.objects.aggregate(last=Max('id'))['last'] or 0,
+            'sent_through_date': now.date(),
+            'sent_through_time': now.time(),
+        })
+        self.loaded_through = (self.cursor.sent_through_date, self.cursor.sent_through_time, self.cursor.sent_through_id)
+        self.seen_id = self.cursor.last_seen_id
+
+    def push(self, pk, day, start):
+        heapq.heappush(self.heap, (datetime.combine(day, start) - self.lead, day, start, pk))
+
+    def load(self, now):
+        scheduled = Appointment.objects.filter(status='SCHEDULED')
+
+        newest = Appointment.objects.aggregate(newest=Max('id'))['newest'] or 0
+        if newest > self.seen_id:
+            booked = scheduled.filter(~starts_after(self.loaded_through), id__gt=self.seen_id, id__lte=newest)
+            for pk, day, start in booked.values_list('id', 'appointment_date', 'start_time'):
+                self.push(pk, day, start)
+                self.pending_new.add(pk)
+            self.seen_id = newest
+
+        horizon = now + self.lead + self.lookahead
+        upcoming = scheduled.filter(
+            starts_after(self.loaded_through),
+            Q(appointment_date__lt=horizon.date()) | Q(appointment_date=horizon.date(), start_time__lte=horizon.time()),
+            # Newer rows are left to the scan above on the next tick
+            id__lte=self.seen_id,
+        ).order_by('appointment_date', 'start_time', 'id').values_list('id', 'appointment_date', 'start_time')
+        rows = list(upcoming[:self.load_limit])
+        for pk, day, start in rows:
+            self.push(pk, day, start)
+        if rows:
+            pk, day, start = rows[-1]
+            self.loaded_through = (day, start, pk)
+
+    def tick(self, now):
+        """
+        Load new reminders and send every reminder due at ``now``. Returns the number sent.
+        """
+        if self.cursor is None:
+            self.start(now)
+        self.load(now)
+        sent = 0
+        while self.heap and self.heap[0][0] <= now:
+            batch = []
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self.heap))
+            delivered = self.deliver(batch, now)
+            if delivered is None:
+                break
+            sent += delivered
+        return sent
+
+    def deliver(self, batch, now):
+        appointments = Appointment.objects.filter(
+            pk__in=[entry[3] for entry in batch], status='SCHEDULED'
+        ).select_related('doctor', 'patient').in_bulk()
+        messages = []
+        for _, day, start, pk in batch:
+            appointment = appointments.get(pk)
+            # Cancelled, completed, moved or already started since it was loaded
+            if (
+                appointment is None
+                or (appointment.appointment_date, appointment.start_time) != (day, start)
+                or datetime.combine(day, start) <= now
+            ):
+                continue
+            messages.append(self.message(appointment))
+
+        if messages:
+            try:
+                self.connection.open()
+                self.connection.send_messages(messages)
+            except Exception:
+                logger.exception("Sending %d appointment reminders failed; retrying on the next tick.", len(messages))
+                for entry in batch:
+                    heapq.heappush(self.heap, entry)
+                self.connection.close()
+                return None
+
+        self.pending_new.difference_update(entry[3] for entry in batch)
+        _, day, start, pk = max(batch, key=lambda entry: entry[1:])
+        sent_through = max((self.cursor.sent_through_date, self.cursor.sent_through_time, self.cursor.sent_through_id), (day, start, pk))
+        self.cursor.sent_through_date, self.cursor.sent_through_time, self.cursor.sent_through_id = sent_through
+        self.cursor.last_seen_id = min(self.pending_new) - 1 if self.pending_new else self.seen_id
+        self.cursor.save(update_fields=['sent_through_date', 'sent_through_time', 'sent_through_id', 'last_seen_id', 'updated_at'])
+        return len(messages)
+
+    def message(self, appointment):
+        patient, doctor = appointment.patient, appointment.doctor
+        when = f"{appointment.appointment_date:%A %d %B %Y} at {appointment.start_time:%H:%M}"
+        return EmailMessage(
+            f"Appointment reminder: {appointment.appointment_date:%d %b %Y} at {appointment.start_time:%H:%M}",
+            f"Hello {patient.fullname or patient.email},\n\n"
+            f"This is a reminder of your appointment with Dr. {doctor.fullname or doctor.email} on {when}.\n",
+            to=[patient.email],
+            connection=self.connection,
+        )
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def close(self):
+        self.connection.close()
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Appointment
+from .models import Appointment, SlotUnavailable, WaitlistEntry
+from apps.accounts.models import CustomUser
 from datetime import date, datetime, timedelta
 
 class AppointmentSerializer(serializers.ModelSerializer):
@@ -23,22 +24,153 @@ class AppointmentSerializer(serializers.ModelSerializer):
         if data['appointment_date'] == date.today() and data['start_time'] < datetime.now().time():
             raise serializers.ValidationError("Appointment time cannot be in the past.")
 
-        # Ensure the time slot is not already booked
-        # Check if any existing appointment overlaps with the requested appointment slot
-        overlapping_appointments = Appointment.objects.filter(
-            doctor=data['doctor'],
-            appointment_date=data['appointment_date'],
-            start_time__lt=data['end_time'],  # Check if the start time of any appointment is before the requested end time
-            end_time__gt=data['start_time']   # Check if the end time of any appointment is after the requested start time
-        )
-
-        if overlapping_appointments.exists():
-            raise serializers.ValidationError("The selected time slot is already booked. Please choose a different time.")
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("Appointment end time must be after its start time.")
 
+        # The overlap check runs in create(), atomically with the insert
         return data
 
+    def create(self, validated_data):
+        try:
+            return Appointment.objects.book(**validated_data)
+        except SlotUnavailable as e:
+            raise serializers.ValidationError(str(e))
+
 
 class AppointmentStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['status']
+
+
+class SlotSerializer(serializers.Serializer):
+    appointment_date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+
+# Slots one bulk booking may hold, listed or generated by a recurrence
+MAX_BULK_SLOTS = 52
+
+
+class RecurrenceSerializer(serializers.Serializer):
+    """
+    A series of identical slots: ``count`` occurrences every ``interval`` days or weeks.
+    """
+    FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+
+    start_date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    frequency = serializers.ChoiceField(choices=list(FREQUENCY_DAYS), default='weekly')
+    interval = serializers.IntegerField(min_value=1, default=1)
+    count = serializers.IntegerField(min_value=1, max_value=MAX_BULK_SLOTS)
+
+    def expand(self, data):
+        try:
+            step = timedelta(days=self.FREQUENCY_DAYS[data['frequency']] * data['interval'])
+            return [
+                {
+                    'appointment_date': data['start_date'] + step * n,
+                    'start_time': data['start_time'],
+                    'end_time': data['end_time'],
+                }
+                for n in range(data['count'])
+            ]
+        except OverflowError:
+            raise serializers.ValidationError({'recurrence': "The recurrence runs past the last supported date."})
+
+
+class BulkAppointmentSerializer(serializers.Serializer):
+    """
+    Several appointments with one doctor, given either as an explicit list of ``slots``
+    or as a ``recurrence`` rule. ``validated_data['slots']`` is always the expanded list.
+    """
+    MAX_SLOTS = MAX_BULK_SLOTS
+
+    doctor = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.filter(role='doctor'))
+    reason_for_visit = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    slots = SlotSerializer(many=True, required=False, max_length=MAX_BULK_SLOTS)
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, data):
+        if ('slots' in data) == ('recurrence' in data):
+            raise serializers.ValidationError("Provide either 'slots' or 'recurrence'.")
+        if 'recurrence' in data:
+            data['slots'] = RecurrenceSerializer().expand(data.pop('recurrence'))
+        if not data['slots']:
+            raise serializers.ValidationError("At least one slot is required.")
+        if len(data['slots']) > self.MAX_SLOTS:
+            raise serializers.ValidationError(f"At most {self.MAX_SLOTS} slots can be booked at once.")
+
+        now = datetime.now()
+        for slot in data['slots']:
+            if slot['start_time'] >= slot['end_time']:
+                raise serializers.ValidationError("Appointment end time must be after its start time.")
+            if datetime.combine(slot['appointment_date'], slot['start_time']) < now:
+                raise serializers.ValidationError("Appointments cannot be booked in the past.")
+        return data
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    MAX_IDS = 500
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    status = serializers.ChoiceField(choices=Appointment.STATUS_CHOICES)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'doctor', 'patient', 'earliest_date', 'latest_date', 'earliest_time', 'latest_time',
+            'reason_for_visit', 'status', 'appointment', 'created_at',
+        ]
+        read_only_fields = ['patient', 'status', 'appointment', 'created_at']
+
+    def validate(self, data):
+        if data['doctor'].role != 'doctor':
+            raise serializers.ValidationError("Assigned doctor must have the 'doctor' role.")
+        if data['latest_date'] < date.today():
+            raise serializers.ValidationError("The waiting window cannot end in the past.")
+        if data['earliest_date'] > data['latest_date']:
+            raise serializers.ValidationError("'earliest_date' must not be after 'latest_date'.")
+        earliest_time, latest_time = data.get('earliest_time'), data.get('latest_time')
+        if earliest_time and latest_time and earliest_time >= latest_time:
+            raise serializers.ValidationError("'earliest_time' must be before 'latest_time'.")
+        return data
+
+
+class RecommendationRequestSerializer(serializers.Serializer):
+    """
+    One patient's request for a doctor and time slot recommendation. The accepted
+    specializations, time slots and genders are those the model was trained on, taken from
+    the registry in the serializer context.
+    """
+    specialization = serializers.CharField()
+    time_slot = serializers.CharField()
+    patient_age = serializers.IntegerField(min_value=0, max_value=150)
+    patient_gender = serializers.CharField()
+    date = serializers.DateField()
+    is_holiday = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        choices = self.context['registry'].choices
+        errors = {
+            field: f"Must be one of: {', '.join(choices[field])}."
+            for field in ('specialization', 'time_slot', 'patient_gender')
+            if data[field] not in choices[field]
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+
+class BatchRecommendationSerializer(serializers.Serializer):
+    MAX_REQUESTS = 1000
+
+    requests = serializers.ListField(
+        child=RecommendationRequestSerializer(), allow_empty=False, max_length=MAX_REQUESTS
+    )
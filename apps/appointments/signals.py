@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Appointment, DoctorDailyStats, DoctorDaySlots
+from . import stats
+
+
+@receiver(post_delete, sender=Appointment)
+def release_day_slots(sender, instance, **kwargs):
+    # Also runs for cascade deletes, which never call Appointment.delete()
+    if instance.status == 'SCHEDULED':
+        DoctorDaySlots.objects.rebuild_day(instance.doctor_id, instance.appointment_date)
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_from_daily_stats(sender, instance, **kwargs):
+    DoctorDailyStats.objects.apply(stats.fold([instance.slot_state()], sign=-1))
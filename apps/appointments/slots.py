@@ -0,0 +1,52 @@
+"""
+Fixed-width day bitmaps: one bit per 5-minute slot, 288 bits per day.
+
+Bit ``i`` covers minutes [5*i, 5*i + 5) of the day. An appointment occupies every slot it
+touches, so the bitmap of a day is a superset of its booked time. For a request whose start
+and end fall on slot boundaries that superset is exact: it conflicts iff the bits intersect.
+"""
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+
+
+def minutes(t):
+    return t.hour * 60 + t.minute + t.second / 60 + t.microsecond / 60_000_000
+
+
+def is_aligned(t):
+    return not t.second and not t.microsecond and t.minute % SLOT_MINUTES == 0
+
+
+def slot_range(start_time, end_time):
+    """
+    First and one-past-last slot index touched by [start_time, end_time).
+    """
+    first = int(minutes(start_time) // SLOT_MINUTES)
+    last = -int(-minutes(end_time) // SLOT_MINUTES)
+    return first, max(last, first)
+
+
+def slot_mask(start_time, end_time):
+    first, last = slot_range(start_time, end_time)
+    return ((1 << (last - first)) - 1) << first
+
+
+def to_bytes(mask):
+    return mask.to_bytes(BITMAP_BYTES, 'little')
+
+
+def from_bytes(data):
+    return int.from_bytes(data, 'little') if data else 0
+
+
+def day_masks(rows):
+    """
+    Fold ``(doctor_id, date, start_time, end_time)`` rows into ``{(doctor_id, date): mask}``.
+    """
+    masks = {}
+    for doctor_id, day, start_time, end_time in rows:
+        key = (doctor_id, day)
+        masks[key] = masks.get(key, 0) | slot_mask(start_time, end_time)
+    return masks
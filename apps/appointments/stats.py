@@ -0,0 +1,27 @@
+"""
+Per-doctor daily appointment totals: for every (doctor, date, status), how many appointments
+there are and how many minutes they book.
+
+DoctorDailyStats stores them and is kept current as appointments are created and change
+status; these helpers fold appointment rows into totals for it, for its migration and for
+`manage.py rebuild_daily_stats`.
+"""
+from . import slots
+
+
+def booked_minutes(start_time, end_time):
+    return max(round(slots.minutes(end_time) - slots.minutes(start_time)), 0)
+
+
+def fold(rows, sign=1, totals=None):
+    """
+    Add ``(doctor_id, date, start_time, end_time, status)`` rows -- the shape of
+    ``Appointment.slot_state()`` -- into ``{(doctor_id, date, status): (count, minutes)}``,
+    or subtract them with ``sign=-1``.
+    """
+    totals = {} if totals is None else totals
+    for doctor_id, day, start_time, end_time, status in rows:
+        key = (doctor_id, day, status)
+        count, minutes = totals.get(key, (0, 0))
+        totals[key] = (count + sign, minutes + sign * booked_minutes(start_time, end_time))
+    return totals
@@ -1,3 +1,1129 @@
-from django.test import TestCase
+import asyncio
+import random
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+from datetime import date, datetime, time, timedelta
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import CustomUser, DoctorProfile, Specialization
+from .models import (
+    Appointment, ArchivedAppointment, DoctorDailyStats, DoctorDaySlots, ReminderCursor, SlotUnavailable,
+    WaitlistEntry,
+)
+from .features import FEATURES
+from .forest import CompiledForest
+from .lookup import LookupTable, input_domains
+from .recommendations import ModelArtifactError, ModelRegistry
+from .reminders import ReminderScheduler
+from .views import AppointmentListCreateView, SpecializationAvailabilityView
+from . import events, recommendations, slots
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Hundreds of simultaneous bookings for overlapping slots must never double-book a doctor.
+    """
+    THREADS = 300
+
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patients = [
+            CustomUser.objects.create_user(email=f'patient{i}@example.com', username=f'patient{i}', role='patient')
+            for i in range(10)
+        ]
+        self.day = date.today() + timedelta(days=7)
+
+    def test_no_double_booking(self):
+        # 30-minute appointments starting on every 10 minutes of 9:00-11:00, so most requests collide
+        starts = [time(9 + m // 60, m % 60) for m in range(0, 120, 10)]
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def book(n):
+            start = random.Random(n).choice(starts)
+            minutes = start.hour * 60 + start.minute + 30
+            try:
+                barrier.wait()
+                Appointment.objects.book(
+                    doctor=self.doctor, patient=self.patients[n % 10], appointment_date=self.day,
+                    start_time=start, end_time=time(minutes // 60, minutes % 60),
+                )
+                outcomes.append('booked')
+            except SlotUnavailable:
+                outcomes.append('conflict')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(outcomes), self.THREADS)
+        booked = sorted(
+            Appointment.objects.filter(doctor=self.doctor, status='SCHEDULED').values_list('start_time', 'end_time')
+        )
+        self.assertEqual(len(booked), outcomes.count('booked'))
+        self.assertGreater(len(booked), 0)
+        for (_, previous_end), (next_start, _) in zip(booked, booked[1:]):
+            self.assertLessEqual(previous_end, next_start)
+
+
+class AppointmentListTests(TestCase):
+    """
+    The appointment list is filtered in the database and paged in schedule order.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.first_day = date.today() + timedelta(days=1)
+        # Two appointments a day for five days, inserted latest first; every third one is cancelled
+        for n in reversed(range(10)):
+            Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient,
+                appointment_date=self.first_day + timedelta(days=n // 2),
+                start_time=time(9 + n % 2), end_time=time(9 + n % 2, 30),
+                status='CANCELLED' if n % 3 == 0 else 'SCHEDULED',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def fetch_all(self, **params):
+        response = self.client.get(reverse('appointment-list-create'), params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        rows = data['results']
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            rows += data['results']
+        return [(row['appointment_date'], row['start_time'], row['status']) for row in rows]
+
+    def test_pages_follow_schedule_order(self):
+        rows = self.fetch_all(page_size=3)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows, sorted(rows))
+
+    def test_date_range_and_status_filters(self):
+        rows = self.fetch_all(
+            **{'from': (self.first_day + timedelta(days=1)).isoformat(),
+               'to': (self.first_day + timedelta(days=3)).isoformat(),
+               'status': 'scheduled'}
+        )
+        # n = 2..7 fall in the range; 3 and 6 are cancelled
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(status == 'SCHEDULED' for _, _, status in rows))
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse('appointment-list-create'), {'from': 'tomorrow', 'status': 'LOST'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'from', 'status'})
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get(reverse('appointment-list-create'), {'status': 'SCHEDULED'})
+        self.assertEqual(first.status_code, 200)
+        with mock.patch.object(AppointmentListCreateView, 'list') as listed:
+            for headers in ({'HTTP_IF_NONE_MATCH': first['ETag']}, {'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']}):
+                response = self.client.get(reverse('appointment-list-create'), {'status': 'SCHEDULED'}, **headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+        listed.assert_not_called()
+
+    def test_etag_changes_with_bookings_and_status_changes(self):
+        def etag():
+            return self.client.get(reverse('appointment-list-create'))['ETag']
+
+        seen = [etag()]
+        appointment = Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=self.first_day + timedelta(days=6),
+            start_time=time(9), end_time=time(9, 30),
+        )
+        seen.append(etag())
+        response = self.client.patch(
+            reverse('appointment-status-update', args=[appointment.pk]), {'status': 'COMPLETED'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        seen.append(etag())
+        self.assertEqual(len(set(seen)), 3)
+        response = self.client.get(reverse('appointment-list-create'), HTTP_IF_NONE_MATCH=seen[0])
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkBookingTests(TestCase):
+    """
+    A recurring series is validated and inserted with a fixed number of queries.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.first_day = date.today() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def book_series(self, count):
+        return self.client.post(reverse('appointment-bulk-create'), {
+            'doctor': self.doctor.id,
+            'recurrence': {
+                'start_date': self.first_day.isoformat(), 'start_time': '10:00', 'end_time': '10:45',
+                'frequency': 'weekly', 'count': count,
+            },
+        }, format='json')
+
+    def test_weekly_series_reports_conflicts_per_slot(self):
+        Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=self.first_day + timedelta(weeks=2),
+            start_time=time(10, 30), end_time=time(11),
+        )
+        response = self.book_series(12)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['booked'], data['conflicts']), (11, 1))
+        self.assertEqual([r['status'] for r in data['results']].index('conflict'), 2)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 12)
+        # The day bitmaps account for the bulk-inserted rows
+        week = self.first_day + timedelta(weeks=1)
+        self.assertEqual(DoctorDaySlots.objects.mask_for(self.doctor, week), slots.slot_mask(time(10), time(10, 45)))
+        self.assertFalse(Appointment.objects.is_free(self.doctor, week, time(10, 30), time(11)))
+
+    def test_query_count_does_not_grow_with_the_series(self):
+        with CaptureQueriesContext(connection) as short:
+            self.book_series(2)
+        Appointment.objects.all().delete()
+        with CaptureQueriesContext(connection) as long:
+            self.book_series(12)
+        self.assertEqual(len(short.captured_queries), len(long.captured_queries))
+
+    def test_fully_booked_series_is_a_conflict(self):
+        self.book_series(3)
+        response = self.book_series(3)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['booked'], 0)
+
+    def test_series_longer_than_a_booking_is_rejected_before_expanding(self):
+        response = self.book_series(3_000_000)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_series_past_the_last_date_is_rejected(self):
+        response = self.client.post(reverse('appointment-bulk-create'), {
+            'doctor': self.doctor.id,
+            'recurrence': {
+                'start_date': self.first_day.isoformat(), 'start_time': '10:00', 'end_time': '10:45',
+                'frequency': 'weekly', 'interval': 10 ** 6, 'count': 2,
+            },
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recurrence', response.json())
+        self.assertFalse(Appointment.objects.exists())
+
+
+class BulkStatusTests(TestCase):
+    """
+    A doctor closes a clinic day with one request and one UPDATE.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.other = CustomUser.objects.create_user(email='other@example.com', username='other', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=1)
+        self.appointments = [
+            Appointment.objects.book(
+                doctor=self.doctor, patient=self.patient, appointment_date=self.day,
+                start_time=time(9 + n // 2, 30 * (n % 2)), end_time=time(9 + n // 2, 30 * (n % 2) + 25),
+            )
+            for n in range(10)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def set_status(self, ids, new_status):
+        return self.client.patch(reverse('appointment-bulk-status'), {'ids': ids, 'status': new_status}, format='json')
+
+    def test_changes_owned_appointments_and_reports_the_rest(self):
+        foreign = Appointment.objects.book(
+            doctor=self.other, patient=self.patient, appointment_date=self.day, start_time=time(9), end_time=time(9, 30)
+        )
+        ids = [a.id for a in self.appointments]
+        Appointment.objects.filter(pk=ids[0]).update(status='CANCELLED')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.set_status(ids + [foreign.id], 'COMPLETED')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['updated'], ids[1:])
+        self.assertEqual({row['id'] for row in data['skipped']}, {ids[0], foreign.id})
+        self.assertEqual(Appointment.objects.filter(status='COMPLETED').count(), 9)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "appointments_appointment"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_released_slots_become_free(self):
+        self.assertFalse(Appointment.objects.is_free(self.doctor, self.day, time(9), time(9, 25)))
+        self.set_status([a.id for a in self.appointments[:2]], 'CANCELLED')
+        self.assertTrue(Appointment.objects.is_free(self.doctor, self.day, time(9), time(9, 55)))
+        self.assertFalse(Appointment.objects.is_free(self.doctor, self.day, time(10), time(10, 25)))
+        self.set_status([a.id for a in self.appointments], 'CANCELLED')
+        self.assertFalse(DoctorDaySlots.objects.filter(doctor=self.doctor).exists())
+
+    def test_patients_cannot_change_statuses(self):
+        self.client.force_authenticate(self.patient)
+        self.assertEqual(self.set_status([self.appointments[0].id], 'CANCELLED').status_code, 403)
+
+
+class DaySlotsTests(TestCase):
+    """
+    The day bitmaps follow bookings, reschedules and cancellations; rebuild_day_slots repairs drift.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=1)
+
+    def book(self, start, end, day=None):
+        return Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=day or self.day,
+            start_time=time.fromisoformat(start), end_time=time.fromisoformat(end),
+        )
+
+    def mask(self, day=None):
+        return DoctorDaySlots.objects.mask_for(self.doctor, day or self.day)
+
+    def test_reschedule_moves_the_bits(self):
+        appointment = self.book('10:00', '10:30')
+        appointment.start_time, appointment.end_time = time(11), time(11, 30)
+        appointment.save()
+        self.assertEqual(self.mask(), slots.slot_mask(time(11), time(11, 30)))
+
+        appointment.appointment_date = self.day + timedelta(days=1)
+        appointment.save()
+        self.assertFalse(DoctorDaySlots.objects.filter(doctor=self.doctor, date=self.day).exists())
+        self.assertEqual(self.mask(self.day + timedelta(days=1)), slots.slot_mask(time(11), time(11, 30)))
+
+    def test_cancelling_keeps_a_shared_slot_of_an_unaligned_neighbour(self):
+        first = self.book('10:00', '10:32')
+        self.book('10:33', '11:00')
+        self.assertEqual(self.mask(), slots.slot_mask(time(10), time(11)))
+        first.status = 'CANCELLED'
+        first.save()
+        # 10:30-10:35 is still touched by the second appointment
+        self.assertEqual(self.mask(), slots.slot_mask(time(10, 30), time(11)))
+        self.assertTrue(Appointment.objects.is_free(self.doctor, self.day, time(10), time(10, 30)))
+        self.assertTrue(Appointment.objects.is_free(self.doctor, self.day, time(10, 30), time(10, 33)))
+        self.assertFalse(Appointment.objects.is_free(self.doctor, self.day, time(10, 30), time(10, 35)))
+
+    def test_unaligned_times_fall_back_to_the_rows(self):
+        self.book('10:02', '10:28')
+        self.assertEqual(self.mask(), slots.slot_mask(time(10), time(10, 30)))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(Appointment.objects.is_free(self.doctor, self.day, time(10, 28), time(10, 40)))
+        self.assertEqual(len(ctx.captured_queries), 2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(Appointment.objects.is_free(self.doctor, self.day, time(10, 25), time(10, 35)))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        with self.assertRaises(SlotUnavailable):
+            self.book('10:27', '10:45')
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        self.book('09:00', '09:30')
+        self.book('14:00', '15:00', day=self.day + timedelta(days=1))
+        self.book('16:00', '16:30', day=self.day + timedelta(days=2))
+        DoctorDaySlots.objects.filter(date=self.day).update(bitmap=slots.to_bytes(0))
+        DoctorDaySlots.objects.filter(date=self.day + timedelta(days=2)).delete()
+        DoctorDaySlots.objects.create(doctor=self.doctor, date=self.day + timedelta(days=3), bitmap=slots.to_bytes(1))
+
+        out = StringIO()
+        call_command('rebuild_day_slots', stdout=out)
+        self.assertIn('Rebuilt 3 doctor-days (3 differed from the stored bitmaps)', out.getvalue())
+        self.assertEqual(self.mask(), slots.slot_mask(time(9), time(9, 30)))
+        self.assertEqual(self.mask(self.day + timedelta(days=2)), slots.slot_mask(time(16), time(16, 30)))
+        self.assertFalse(DoctorDaySlots.objects.filter(date=self.day + timedelta(days=3)).exists())
+
+        out = StringIO()
+        call_command('rebuild_day_slots', '--doctor', str(self.doctor.pk), stdout=out)
+        self.assertIn('(0 differed', out.getvalue())
+
+
+class ArchiveTests(TestCase):
+    """
+    Old final appointments move to the archive in batches and still show up in listings
+    whose date range reaches back that far.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.cutoff = ArchivedAppointment.objects.default_cutoff()
+        # Seven appointments a month apart before the horizon, one stale SCHEDULED, two after it
+        for n, (offset, status) in enumerate(
+            [(-30 * k, 'COMPLETED' if k % 2 else 'CANCELLED') for k in range(1, 8)]
+            + [(-60, 'SCHEDULED'), (10, 'COMPLETED'), (400, 'SCHEDULED')]
+        ):
+            Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient, appointment_date=self.cutoff + timedelta(days=offset),
+                start_time=time(9), end_time=time(9, 30), status=status, reason_for_visit=f'visit {n}',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def list_dates(self, **params):
+        response = self.client.get(reverse('appointment-list-create'), {'page_size': 3, **params})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        rows = data['results']
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            rows += data['results']
+        return [row['appointment_date'] for row in rows]
+
+    def test_batches_move_only_final_appointments_past_the_horizon(self):
+        before = self.list_dates()
+        call_command('archive_appointments', batch_size=3, max_batches=2, stdout=StringIO())
+        self.assertEqual(ArchivedAppointment.objects.count(), 6)
+        # A second run resumes where the first one stopped
+        call_command('archive_appointments', batch_size=3, stdout=StringIO())
+        self.assertEqual(ArchivedAppointment.objects.count(), 7)
+        self.assertEqual(Appointment.objects.count(), 3)
+        self.assertEqual(
+            set(ArchivedAppointment.objects.values_list('reason_for_visit', flat=True)),
+            {f'visit {n}' for n in range(7)},
+        )
+        self.assertEqual(self.list_dates(), before)
+        self.assertEqual(len(before), 10)
+        self.assertEqual(before, sorted(before))
+
+    def test_recent_ranges_do_not_read_the_archive(self):
+        call_command('archive_appointments', stdout=StringIO())
+        with CaptureQueriesContext(connection) as ctx:
+            dates = self.list_dates(**{'from': self.cutoff.isoformat()})
+        self.assertEqual(len(dates), 2)
+        self.assertFalse(any('archivedappointment' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(len(self.list_dates(status='CANCELLED')), 3)
+
+
+class AppointmentEventTests(TestCase):
+    """
+    Committed bookings and status changes are pushed to the doctor's and the patient's streams.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.broker = events.InProcessBroker()
+        patcher = mock.patch.object(events, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.book(
+                doctor=self.doctor, patient=self.patient, appointment_date=date.today() + timedelta(days=1),
+                start_time=time(9), end_time=time(9, 30),
+            )
+
+    def complete(self, appointment):
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.transition(self.doctor, [appointment.id], 'COMPLETED')
+
+    def test_events_reach_both_users(self):
+        async def scenario():
+            doctor_events = self.broker.subscribe(events.user_channel(self.doctor.id))
+            patient_events = self.broker.subscribe(events.user_channel(self.patient.id))
+            appointment = await sync_to_async(self.book)()
+            await sync_to_async(self.complete)(appointment)
+            received = [
+                [await asyncio.wait_for(subscription.get(), 1) for _ in range(2)]
+                for subscription in (doctor_events, patient_events)
+            ]
+            doctor_events.close()
+            patient_events.close()
+            return appointment, received
+
+        appointment, received = async_to_sync(scenario)()
+        for messages in received:
+            self.assertEqual(
+                [(m['type'], m['id'], m['status']) for m in messages],
+                [('appointment.created', appointment.id, 'SCHEDULED'),
+                 ('appointment.status_changed', appointment.id, 'COMPLETED')],
+            )
+
+    def test_stream_delivers_server_sent_events(self):
+        async def scenario():
+            client = AsyncClient()
+            ticket = await client.post(
+                reverse('appointment-event-ticket'), headers={'Authorization': f'Bearer {AccessToken.for_user(self.doctor)}'}
+            )
+            response = await client.get(reverse('appointment-events'), {'ticket': ticket.json()['ticket']})
+            stream = response.streaming_content
+            first = await anext(stream)
+            appointment = await sync_to_async(self.book)()
+            event = await asyncio.wait_for(anext(stream), 1)
+            await stream.aclose()
+            return response, first, event, appointment
+
+        response, first, event, appointment = async_to_sync(scenario)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(first, b'retry: 3000\n\n')
+        self.assertTrue(event.startswith(b'event: appointment.created\ndata: '))
+        self.assertIn(f'"id": {appointment.id}'.encode(), event)
+        self.assertFalse(self.broker._subscribers)
+
+    def test_stream_requires_a_valid_ticket(self):
+        async def status_of(params):
+            return (await AsyncClient().get(reverse('appointment-events'), params)).status_code
+
+        self.assertEqual(async_to_sync(status_of)({}), 401)
+        self.assertEqual(async_to_sync(status_of)({'ticket': 'nope'}), 401)
+        # The access token itself is not accepted in the URL
+        self.assertEqual(async_to_sync(status_of)({'token': str(AccessToken.for_user(self.doctor))}), 401)
+
+    def test_tickets_are_single_use_and_short_lived(self):
+        ticket = events.issue_stream_ticket(self.doctor.id)
+        self.assertEqual(events.redeem_stream_ticket(ticket), self.doctor.id)
+        self.assertIsNone(events.redeem_stream_ticket(ticket))
+        ticket = events.issue_stream_ticket(self.doctor.id)
+        with mock.patch('django.core.signing.time.time', return_value=datetime.now().timestamp() + events.TICKET_MAX_AGE + 5):
+            self.assertIsNone(events.redeem_stream_ticket(ticket))
+
+    def test_wsgi_offers_no_stream(self):
+        self.client.force_login(self.doctor)
+        self.assertEqual(self.client.get(reverse('appointment-events')).status_code, 501)
+        api = APIClient()
+        api.force_authenticate(self.doctor)
+        self.assertEqual(api.post(reverse('appointment-event-ticket')).status_code, 501)
+
+
+class DailyStatsTests(TestCase):
+    """
+    The daily totals follow every write path and always match a recount of the appointments.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def verify(self):
+        call_command('rebuild_daily_stats', verify=True, stdout=StringIO())
+
+    def test_totals_follow_bookings_status_changes_and_deletes(self):
+        first = Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=self.day, start_time=time(9), end_time=time(9, 45)
+        )
+        booked = Appointment.objects.book_many(
+            self.doctor, self.patient, [(self.day, time(10 + n), time(10 + n, 30)) for n in range(4)]
+        )
+        self.verify()
+        Appointment.objects.transition(self.doctor, [a.id for a in booked[:3]], 'COMPLETED')
+        first.status = 'CANCELLED'
+        first.save()
+        booked[3].delete()
+        self.verify()
+        self.assertEqual(
+            set(DoctorDailyStats.objects.values_list('status', 'count', 'booked_minutes')),
+            {('COMPLETED', 3, 90), ('CANCELLED', 1, 45)},
+        )
+
+        response = self.client.get(reverse('doctor-stats'), {'from': self.day, 'to': self.day})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['appointments'], 4)
+        self.assertEqual(data['cancellation_rate'], 0.25)
+        self.assertEqual(data['days'][0]['COMPLETED'], 3)
+
+    def test_staff_must_name_a_doctor(self):
+        self.client.force_authenticate(
+            CustomUser.objects.create_user(email='admin@example.com', username='admin', role='admin')
+        )
+        for params in ({}, {'doctor': ''}, {'doctor': 'abc'}):
+            self.assertEqual(self.client.get(reverse('doctor-stats'), params).status_code, 400, params)
+        self.assertEqual(self.client.get(reverse('doctor-stats'), {'doctor': self.patient.id}).status_code, 404)
+        response = self.client.get(reverse('doctor-stats'), {'doctor': self.doctor.id})
+        self.assertEqual((response.status_code, response.json()['doctor']), (200, self.doctor.id))
+
+    def test_archiving_keeps_the_totals(self):
+        old_day = ArchivedAppointment.objects.default_cutoff() - timedelta(days=1)
+        Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, appointment_date=old_day,
+            start_time=time(9), end_time=time(9, 30), status='COMPLETED',
+        )
+        call_command('archive_appointments', stdout=StringIO())
+        self.assertEqual(ArchivedAppointment.objects.count(), 1)
+        self.assertEqual(DoctorDailyStats.objects.get(date=old_day).count, 1)
+        self.verify()
+
+    def test_verify_reports_drift_and_rebuild_repairs_it(self):
+        Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=self.day, start_time=time(9), end_time=time(9, 30)
+        )
+        DoctorDailyStats.objects.update(count=7)
+        with self.assertRaises(CommandError):
+            self.verify()
+        call_command('rebuild_daily_stats', stdout=StringIO())
+        self.verify()
+
+
+class WaitlistTests(TestCase):
+    """
+    A cancelled slot goes to the first waiting patient whose window accepts it, in the same transaction.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patients = [
+            CustomUser.objects.create_user(email=f'patient{i}@example.com', username=f'patient{i}', role='patient')
+            for i in range(4)
+        ]
+        self.day = date.today() + timedelta(days=3)
+        self.client = APIClient()
+
+    def book(self, start_hour, patient=0):
+        return Appointment.objects.book(
+            doctor=self.doctor, patient=self.patients[patient], appointment_date=self.day,
+            start_time=time(start_hour), end_time=time(start_hour, 30),
+        )
+
+    def join(self, patient, **window):
+        self.client.force_authenticate(self.patients[patient])
+        response = self.client.post(reverse('waitlist-list-create'), {
+            'doctor': self.doctor.id,
+            'earliest_date': window.get('earliest_date', date.today()).isoformat(),
+            'latest_date': window.get('latest_date', self.day).isoformat(),
+            **{key: value for key, value in window.items() if key.endswith('_time')},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return WaitlistEntry.objects.get(pk=response.json()['id'])
+
+    def test_cancellation_books_the_first_eligible_waiter(self):
+        appointment = self.book(9)
+        too_late = self.join(1, earliest_time='12:00')
+        first = self.join(2)
+        second = self.join(3)
+
+        self.client.force_authenticate(self.doctor)
+        response = self.client.patch(
+            reverse('appointment-status-update', args=[appointment.id]), {'status': 'CANCELLED'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'BOOKED')
+        self.assertEqual(
+            (first.appointment.patient, first.appointment.start_time, first.appointment.status),
+            (self.patients[2], time(9), 'SCHEDULED'),
+        )
+        for entry in (too_late, second):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, 'WAITING')
+        self.assertFalse(Appointment.objects.is_free(self.doctor, self.day, time(9), time(9, 30)))
+
+    def test_cancelled_slot_cannot_be_rescheduled_over_its_new_booking(self):
+        appointment = self.book(10)
+        waiter = self.join(1)
+        self.client.force_authenticate(self.doctor)
+        url = reverse('appointment-status-update', args=[appointment.id])
+        self.assertEqual(self.client.patch(url, {'status': 'CANCELLED'}, format='json').status_code, 200)
+        waiter.refresh_from_db()
+        self.assertEqual(waiter.status, 'BOOKED')
+
+        response = self.client.patch(url, {'status': 'SCHEDULED'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('CANCELLED to SCHEDULED', response.json()['detail'])
+        scheduled = Appointment.objects.filter(doctor=self.doctor, appointment_date=self.day, status='SCHEDULED')
+        self.assertEqual(list(scheduled.values_list('patient_id', flat=True)), [self.patients[1].id])
+
+    def test_bulk_cancellation_fills_several_slots_in_queue_order(self):
+        appointments = [self.book(hour) for hour in (9, 10, 11)]
+        waiters = [self.join(n) for n in (1, 2, 3)]
+        Appointment.objects.transition(self.doctor, [a.id for a in appointments[:2]], 'CANCELLED')
+        statuses = [WaitlistEntry.objects.get(pk=w.pk).status for w in waiters]
+        self.assertEqual(statuses, ['BOOKED', 'BOOKED', 'WAITING'])
+        self.assertEqual(
+            sorted(Appointment.objects.filter(status='SCHEDULED').values_list('start_time', 'patient_id')),
+            [(time(9), self.patients[1].id), (time(10), self.patients[2].id), (time(11), self.patients[0].id)],
+        )
+
+    def test_matching_reads_a_long_queue_with_few_queries(self):
+        appointment = self.book(9)
+        # Thousands of earlier waiters whose windows do not fit, then one that does
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(
+                doctor=self.doctor, patient=self.patients[1], earliest_date=date.today(),
+                latest_date=self.day, earliest_time=time(15),
+            )
+            for _ in range(3000)
+        ])
+        last = self.join(2)
+        with CaptureQueriesContext(connection) as ctx:
+            Appointment.objects.transition(self.doctor, [appointment.id], 'CANCELLED')
+        last.refresh_from_db()
+        self.assertEqual(last.status, 'BOOKED')
+        self.assertLess(len(ctx.captured_queries), 40)
+
+    def test_withdrawn_entries_are_skipped(self):
+        appointment = self.book(9)
+        entry = self.join(1)
+        self.client.force_authenticate(self.patients[1])
+        self.assertEqual(self.client.delete(reverse('waitlist-withdraw', args=[entry.id])).status_code, 204)
+        Appointment.objects.transition(self.doctor, [appointment.id], 'CANCELLED')
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'WITHDRAWN')
+        self.assertTrue(Appointment.objects.is_free(self.doctor, self.day, time(9), time(9, 30)))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ReminderTests(TestCase):
+    """
+    Each scheduled appointment gets one reminder a day ahead, including across scheduler restarts.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=3)
+
+    def book(self, start_hour, start_minute=0):
+        return Appointment.objects.book(
+            doctor=self.doctor, patient=self.patient, appointment_date=self.day,
+            start_time=time(start_hour, start_minute), end_time=time(start_hour, start_minute + 30),
+        )
+
+    def at(self, hour, minute=0):
+        """A moment on the day before the appointments."""
+        return datetime.combine(self.day - timedelta(days=1), time(hour, minute))
+
+    def scheduler(self):
+        return ReminderScheduler(lead=timedelta(days=1))
+
+    def test_reminders_are_sent_once_when_due(self):
+        self.book(9)
+        ten, eleven = self.book(10), self.book(11)
+        scheduler = self.scheduler()
+        self.assertEqual(scheduler.tick(self.at(8)), 0)
+        self.assertEqual(scheduler.tick(self.at(9, 30)), 1)
+        self.assertEqual(mail.outbox[0].to, ['patient@example.com'])
+        self.assertIn(f'{self.day:%d %b %Y} at 09:00', mail.outbox[0].subject)
+
+        Appointment.objects.transition(self.doctor, [eleven.id], 'CANCELLED')
+        send = mock.patch.object(
+            type(scheduler.connection), 'send_messages', autospec=True, side_effect=type(scheduler.connection).send_messages
+        )
+        with send as sent:
+            self.assertEqual(scheduler.tick(self.at(12)), 1)
+            self.assertEqual(scheduler.tick(self.at(12, 5)), 0)
+        self.assertIn('10:00', mail.outbox[1].subject)
+        # Batches reuse the scheduler's one connection
+        self.assertEqual([call.args[0] for call in sent.call_args_list], [scheduler.connection])
+
+        cursor = ReminderCursor.objects.get()
+        self.assertEqual(
+            (cursor.sent_through_date, cursor.sent_through_time, cursor.sent_through_id), (self.day, time(10), ten.id)
+        )
+        # A restarted scheduler resumes from the cursor instead of resending
+        self.assertEqual(self.scheduler().tick(self.at(12, 10)), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_late_bookings_are_picked_up_by_id(self):
+        self.book(10)
+        scheduler = self.scheduler()
+        self.assertEqual(scheduler.tick(self.at(10, 30)), 1)
+        # Starts before the appointments already loaded, so only the new-booking scan finds it
+        late = self.book(9, 15)
+        self.assertEqual(scheduler.tick(self.at(10, 35)), 1)
+        self.assertIn('09:15', mail.outbox[1].subject)
+        self.assertEqual(ReminderCursor.objects.get().last_seen_id, late.id)
+
+        self.assertEqual(self.scheduler().tick(self.at(10, 40)), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_batches_are_retried(self):
+        self.book(9)
+        scheduler = self.scheduler()
+        with mock.patch.object(scheduler.connection, 'send_messages', side_effect=OSError('connection reset')):
+            with self.assertLogs('apps.appointments.reminders', 'ERROR'):
+                self.assertEqual(scheduler.tick(self.at(9, 30)), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(scheduler.tick(self.at(9, 31)), 1)
+
+
+class DoctorAvailabilityTests(TestCase):
+    """
+    /api/doctors/<pk>/availability/ returns the gaps between SCHEDULED appointments within opening hours.
+    """
+    def setUp(self):
+        self.doctor = CustomUser.objects.create_user(email='doctor@example.com', username='doctor', role='doctor')
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=1)
+        self.client = APIClient()
+
+    def appointment(self, start, end, day=None, status='SCHEDULED'):
+        return Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, appointment_date=day or self.day,
+            start_time=time.fromisoformat(start), end_time=time.fromisoformat(end), status=status,
+        )
+
+    def availability(self, **params):
+        params.setdefault('from', self.day.isoformat())
+        params.setdefault('to', self.day.isoformat())
+        return self.client.get(reverse('doctor-availability', args=[self.doctor.pk]), params)
+
+    def windows(self, **params):
+        response = self.availability(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {
+            day['date']: [(window['start'], window['end']) for window in day['windows']]
+            for day in response.json()['days']
+        }
+
+    def test_overlapping_appointments_merge(self):
+        self.appointment('10:00', '11:00')
+        self.appointment('10:30', '11:30')
+        self.appointment('11:30', '12:00')
+        self.appointment('14:00', '15:00', status='CANCELLED')
+        self.assertEqual(self.windows(), {self.day.isoformat(): [('09:00:00', '10:00:00'), ('12:00:00', '17:00:00')]})
+
+    def test_windows_are_clipped_to_opening_hours_and_duration(self):
+        self.appointment('08:00', '09:30')
+        self.appointment('10:00', '16:40')
+        self.assertEqual(self.windows(duration=30), {self.day.isoformat(): [('09:30:00', '10:00:00')]})
+        self.assertEqual(self.windows(duration=31), {self.day.isoformat(): []})
+
+    def test_past_time_today_is_excluded(self):
+        today = date.today()
+        frozen = datetime.combine(today, time(11, 20, 30))
+
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return frozen
+
+        with mock.patch('apps.appointments.views.datetime', FrozenDatetime):
+            windows = self.windows(**{'from': (today - timedelta(days=1)).isoformat(), 'to': self.day.isoformat()})
+        self.assertEqual(windows[(today - timedelta(days=1)).isoformat()], [])
+        self.assertEqual(windows[today.isoformat()], [('11:21:00', '17:00:00')])
+        self.assertEqual(windows[self.day.isoformat()], [('09:00:00', '17:00:00')])
+
+    def test_range_is_limited_to_90_days(self):
+        self.assertEqual(len(self.windows(to=(self.day + timedelta(days=89)).isoformat())), 90)
+        response = self.availability(to=(self.day + timedelta(days=90)).isoformat())
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_or_missing_parameters_are_rejected(self):
+        for params in (
+            {'from': ''}, {'to': ''}, {'from': 'tomorrow'}, {'to': '2026-02-30'},
+            {'to': (self.day - timedelta(days=1)).isoformat()}, {'duration': 'long'}, {'duration': '0'},
+        ):
+            response = self.availability(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('detail', response.json())
+        response = self.client.get(reverse('doctor-availability', args=[self.doctor.pk]))
+        self.assertEqual(response.status_code, 400)
+
+
+class SpecializationAvailabilityTests(TestCase):
+    """
+    /api/specializations/<pk>/availability/ returns the earliest free slots across the doctors of a specialization.
+    """
+    def setUp(self):
+        self.cardiology = Specialization.objects.create(name='Cardiology')
+        self.doctors = [self.doctor(n, self.cardiology) for n in range(3)]
+        self.other = self.doctor(3, Specialization.objects.create(name='Neurology'))
+        self.patient = CustomUser.objects.create_user(email='patient@example.com', username='patient', role='patient')
+        self.day = date.today() + timedelta(days=1)
+        self.client = APIClient()
+
+    def doctor(self, n, specialization):
+        user = CustomUser.objects.create_user(
+            email=f'doctor{n}@example.com', username=f'doctor{n}', role='doctor', fullname=f'Doctor {n}'
+        )
+        DoctorProfile.objects.create(user=user, license_number=f'LIC-{n}').specializations.add(specialization)
+        return user
+
+    def appointment(self, doctor, day, start, end):
+        Appointment.objects.create(
+            doctor=doctor, patient=self.patient, appointment_date=day, start_time=start, end_time=end,
+        )
+
+    def search(self, days=1, **params):
+        params = {'from': self.day.isoformat(), 'to': (self.day + timedelta(days=days - 1)).isoformat(), **params}
+        return self.client.get(reverse('specialization-availability', args=[self.cardiology.pk]), params)
+
+    def slots(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(slot['date'], slot['start'], slot['doctor']) for slot in response.json()['slots']]
+
+    def test_earliest_slots_are_ordered_across_doctors(self):
+        first, second, third = self.doctors
+        self.appointment(first, self.day, time(9), time(9, 10))
+        self.appointment(second, self.day, time(9), time(9, 5))
+        self.appointment(third, self.day, time(9), time(17))
+        self.appointment(self.other, self.day, time(12), time(17))
+        found = self.slots(limit=3, duration=30)
+        day = self.day.isoformat()
+        self.assertEqual(found, [(day, '09:05:00', second.pk), (day, '09:10:00', first.pk), (day, '09:35:00', second.pk)])
+        response = self.search(limit=1, duration=30).json()
+        self.assertEqual(response['slots'][0]['doctor_name'], 'Doctor 1')
+        self.assertEqual(response['slots'][0]['end'], '09:35:00')
+
+    def test_slots_of_a_doctor_do_not_overlap(self):
+        first = self.doctors[0]
+        for doctor in self.doctors[1:]:
+            self.appointment(doctor, self.day, time(9), time(17))
+        self.appointment(first, self.day, time(10), time(10, 20))
+        response = self.search(limit=20, duration=45).json()
+        slots = [(slot['start'], slot['end']) for slot in response['slots']]
+        self.assertEqual({slot['doctor'] for slot in response['slots']}, {first.pk})
+        self.assertEqual(slots[:3], [('09:00:00', '09:45:00'), ('10:20:00', '11:05:00'), ('11:05:00', '11:50:00')])
+        for (_, end), (start, _) in zip(slots, slots[1:]):
+            self.assertLessEqual(end, start)
+
+    def test_search_continues_past_the_first_chunk(self):
+        chunk = SpecializationAvailabilityView.FIRST_CHUNK_DAYS
+        # Every doctor is booked up for the first chunk and the day after it, but for the last hour
+        for offset in range(chunk + 2):
+            for doctor in self.doctors:
+                end = time(16) if offset == chunk + 1 and doctor == self.doctors[0] else time(17)
+                self.appointment(doctor, self.day + timedelta(days=offset), time(9), end)
+        found = self.slots(days=30, limit=2, duration=60)
+        self.assertEqual(found[0], ((self.day + timedelta(days=chunk + 1)).isoformat(), '16:00:00', self.doctors[0].pk))
+        self.assertEqual(found[1][:2], ((self.day + timedelta(days=chunk + 2)).isoformat(), '09:00:00'))
+
+    def test_limit_bounds_and_bad_parameters(self):
+        self.assertEqual(len(self.slots(days=3, limit=SpecializationAvailabilityView.MAX_LIMIT)), 100)
+        for params in (
+            {'limit': 0}, {'limit': SpecializationAvailabilityView.MAX_LIMIT + 1}, {'limit': 'many'},
+            {'from': ''}, {'to': 'soon'}, {'duration': -5},
+        ):
+            response = self.search(**params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(self.search(days=91).status_code, 400)
+        self.assertEqual(self.client.get(reverse('specialization-availability', args=[0])).status_code, 404)
+
+    def test_slots_match_the_doctor_endpoint(self):
+        rng = random.Random(0)
+        for doctor in self.doctors:
+            for offset in range(2):
+                for hour in range(9, 17):
+                    if rng.random() < 0.6:
+                        start = rng.choice([0, 15, 30])
+                        self.appointment(doctor, self.day + timedelta(days=offset), time(hour, start), time(hour, start + 25))
+        expected = []
+        for doctor in self.doctors:
+            response = self.client.get(reverse('doctor-availability', args=[doctor.pk]), {
+                'from': self.day.isoformat(), 'to': (self.day + timedelta(days=1)).isoformat(), 'duration': 30,
+            })
+            for day in response.json()['days']:
+                for window in day['windows']:
+                    start = datetime.combine(self.day, time.fromisoformat(window['start']))
+                    end = datetime.combine(self.day, time.fromisoformat(window['end']))
+                    while start + timedelta(minutes=30) <= end:
+                        expected.append((day['date'], start.time().isoformat(), doctor.pk))
+                        start += timedelta(minutes=30)
+        found = self.slots(days=2, limit=100, duration=30)
+        self.assertLess(len(found), 100)
+        self.assertEqual(found, sorted(found, key=lambda slot: slot[:2]))
+        self.assertEqual(sorted(found), sorted(expected))
+        # With a lower limit, slots tied with the last one may come from any of the doctors
+        found = self.slots(days=2, limit=40, duration=30)
+        last = found[-1][:2]
+        self.assertEqual({slot for slot in found if slot[:2] < last}, {slot for slot in expected if slot[:2] < last})
+        self.assertTrue({slot for slot in found if slot[:2] == last} <= set(expected))
+
+
+class RecommendationTests(TestCase):
+    """
+    The saved model is loaded once per process and scores batches in one call.
+    """
+    REQUEST = {
+        'specialization': 'Orthopedics', 'time_slot': 'Evening', 'patient_age': 41,
+        'patient_gender': 'Female', 'date': '2025-01-29', 'is_holiday': True,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.registry = ModelRegistry(compiled='').load()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(
+            email='patient@example.com', username='patient', role='patient'
+        ))
+        patcher = mock.patch('apps.appointments.views.get_registry', return_value=self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_request_matches_the_training_data(self):
+        with mock.patch('joblib.load') as load:
+            response = self.client.post('/api/recommendations/', self.REQUEST, format='json')
+        self.assertEqual(response.status_code, 200)
+        # The first row of data.csv
+        self.assertEqual(response.data['recommended_doctor'], 106)
+        self.assertEqual(response.data['recommended_time_slot'], 'Evening')
+        self.assertEqual(response.data['peak_demand_alert'], 'Yes')
+        self.assertEqual(response.data['model_version'], self.registry.version)
+        load.assert_not_called()
+
+    def test_batch_is_scored_in_one_predict_call(self):
+        requests = [dict(self.REQUEST, patient_age=age) for age in range(20, 70)]
+        with mock.patch.object(self.registry.model, 'predict', wraps=self.registry.model.predict) as predict:
+            response = self.client.post('/api/recommendations/', {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(predict.call_count, 1)
+        self.assertEqual(len(response.data['results']), len(requests))
+        single = self.client.post('/api/recommendations/', requests[7], format='json').data
+        self.assertEqual(response.data['results'][7], {key: single[key] for key in response.data['results'][7]})
+
+    def test_features_are_encoded_in_the_model_column_order(self):
+        features = self.registry.features
+        request = dict(self.REQUEST, date=date(2025, 1, 29))
+        # Orthopedics, Evening, 41, Female, a Wednesday on a holiday, 29 Jan 2025
+        self.assertEqual(features.encode_one(request).tolist(), [[3, 1, 41, 0, 2, 1, 1, 2025, 29]])
+        self.assertEqual(features.encode_one(dict(request, specialization='Astrology'))[0, 0], -1)
+
+        requests = [dict(request, patient_age=age) for age in (30, 40, 50)]
+        out = np.zeros((3, 9), dtype=np.float32)
+        self.assertIs(features.encode(requests, out=out), out)
+        self.assertEqual(out[:, 2].tolist(), [30, 40, 50])
+        self.assertEqual(out[1].tolist(), features.encode_one(requests[1])[0].tolist())
+
+    def test_compiled_forest_predicts_as_the_pickle(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('compile_recommendation_model', output=directory, stdout=StringIO())
+            compiled = ModelRegistry(compiled=directory).load()
+            self.assertIsInstance(compiled.model, CompiledForest)
+            self.assertEqual(compiled.version, self.registry.version)
+
+            holdout = self.registry.features.encode(self.registry.holdout_requests())
+            self.assertEqual(len(holdout), 200)
+            np.testing.assert_array_equal(compiled.predict(holdout), self.registry.predict(holdout))
+            # Inputs the model never saw, unknown categories included
+            rng = np.random.default_rng(0)
+            grid = np.column_stack([
+                rng.integers(-1, 5, 2000), rng.integers(-1, 3, 2000), rng.integers(0, 100, 2000),
+                rng.integers(-1, 3, 2000), rng.integers(0, 7, 2000), rng.integers(0, 2, 2000),
+                rng.integers(1, 13, 2000), rng.integers(2024, 2027, 2000), rng.integers(1, 29, 2000),
+            ]).astype(np.float32)
+            for ours, theirs in zip(compiled.model.predict_proba(grid), self.registry.model.predict_proba(grid)):
+                np.testing.assert_array_equal(ours, theirs)
+
+            request = dict(self.REQUEST, date=date(2025, 1, 29))
+            self.assertEqual(compiled.recommend([request]), self.registry.recommend([request]))
+
+    def test_health_reports_the_memory_of_the_compiled_model(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('compile_recommendation_model', output=directory, stdout=StringIO())
+            registry = ModelRegistry(compiled=directory)
+            with mock.patch('apps.appointments.views.get_registry', return_value=registry):
+                self.assertEqual(self.client.get('/api/recommendations/health/').status_code, 403)
+                self.client.force_authenticate(CustomUser.objects.create_user(
+                    email='admin@example.com', username='admin', role='patient', is_staff=True
+                ))
+                self.assertFalse(self.client.get('/api/recommendations/health/').data['loaded'])
+                self.client.post('/api/recommendations/', self.REQUEST, format='json')
+                response = self.client.get('/api/recommendations/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['backend'], 'compiled')
+        self.assertFalse(response.data['loaded_before_fork'])
+        self.assertGreater(response.data['process']['uss'], 0)
+        files = response.data['model_files']
+        self.assertGreater(files['rss'], 0)
+        self.assertEqual(files['unique'] + files['shared'], files['rss'])
+
+    def test_preload_loads_the_registry_and_freezes_it(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch('gc.freeze') as freeze:
+            registry = ModelRegistry(directory, archive='', compiled='')
+            with mock.patch('apps.appointments.recommendations.get_registry', return_value=registry):
+                with self.assertLogs('apps.appointments.recommendations', 'ERROR'):
+                    self.assertIs(recommendations.preload(), registry)
+            freeze.assert_not_called()
+
+            registry = mock.Mock()
+            with mock.patch('apps.appointments.recommendations.get_registry', return_value=registry):
+                with override_settings(RECOMMENDATION_PRELOAD=False):
+                    recommendations.preload()
+                registry.load.assert_not_called()
+                recommendations.preload()
+                registry.load.assert_called_once_with()
+            freeze.assert_called_once_with()
+
+    def test_lookup_table_answers_the_requests_it_covers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            CompiledForest.compile(
+                self.registry.model, FEATURES, version=self.registry.version,
+                encoders={name: encoder.classes_.tolist() for name, encoder in self.registry.encoders.items()},
+            ).save(directory)
+            lookup = LookupTable.build(self.registry, 1, (40, 42), input_domains(self.registry.choices))
+            lookup.save(directory)
+            registry = ModelRegistry(compiled=directory).load()
+            self.assertEqual(registry.lookup.table.shape, (5, 3, 3, 3, 7, 2, 4, 1, 31))
+
+            requests = [dict(self.REQUEST, date=date(2025, 3, day), patient_age=41) for day in range(1, 29)]
+            with mock.patch.object(registry, 'predict', wraps=registry.predict) as predict:
+                self.assertEqual(registry.recommend(requests), self.registry.recommend(requests))
+                predict.assert_not_called()
+                # Ages outside the table are predicted live, together
+                requests[3]['patient_age'] = requests[9]['patient_age'] = 70
+                self.assertEqual(registry.recommend(requests), self.registry.recommend(requests))
+                predict.assert_called_once()
+                self.assertEqual(len(predict.call_args.args[0]), 2)
+
+            lookup.manifest['version'] = 'retrained'
+            lookup.save(directory)
+            with self.assertLogs('apps.appointments.recommendations', 'WARNING'):
+                self.assertIsNone(ModelRegistry(compiled=directory).load().lookup)
+
+    def test_unknown_categories_are_rejected(self):
+        response = self.client.post(
+            '/api/recommendations/', dict(self.REQUEST, specialization='Astrology'), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('specialization', response.data)
+
+    def test_artifacts_from_another_sklearn_version_are_refused(self):
+        from sklearn.preprocessing import LabelEncoder
+        import joblib
+
+        with tempfile.TemporaryDirectory() as directory:
+            encoder = LabelEncoder().fit([101, 102])
+            with mock.patch('sklearn.base.__version__', '0.24.2'):
+                joblib.dump(encoder, f'{directory}/doctor_encoder.pkl')
+            with self.assertRaisesMessage(ModelArtifactError, 'scikit-learn 0.24.2'):
+                registry = ModelRegistry(directory, archive='', compiled='')
+                registry._unpickle('doctor_encoder.pkl', registry._read('doctor_encoder.pkl'))
+
+    def test_corrupt_artifacts_are_refused(self):
+        import joblib
+        from sklearn.preprocessing import LabelEncoder
+
+        with tempfile.TemporaryDirectory() as directory:
+            joblib.dump(LabelEncoder().fit([101, 102]), f'{directory}/doctor_encoder.pkl')
+            with open(f'{directory}/doctor_encoder.pkl', 'rb') as saved:
+                content = saved.read()
+            with open(f'{directory}/model.zip', 'wb') as archive:
+                archive.write(b'not a zip file')
+            registry = ModelRegistry(directory, archive=f'{directory}/model.zip', compiled='')
+            for damaged in (content[:len(content) // 2], b'\x80\x04garbage', b''):
+                with self.assertRaisesMessage(ModelArtifactError, 'could not be unpickled'):
+                    registry._unpickle('doctor_encoder.pkl', damaged)
+            with self.assertRaisesMessage(ModelArtifactError, 'could not be read'):
+                registry._read(recommendations.MODEL_FILE)
+            with mock.patch('apps.appointments.recommendations.get_registry', return_value=registry):
+                with self.assertLogs('apps.appointments.recommendations', 'ERROR'):
+                    recommendations.preload()
+            with mock.patch('apps.appointments.views.get_registry', return_value=registry):
+                response = self.client.post('/api/recommendations/', self.REQUEST, format='json')
+        self.assertEqual(response.status_code, 503)
+
+    def test_missing_artifacts_make_the_endpoint_unavailable(self):
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ModelRegistry(directory, archive='', compiled='')
+            with mock.patch('apps.appointments.views.get_registry', return_value=registry):
+                response = self.client.post('/api/recommendations/', self.REQUEST, format='json')
+        self.assertEqual(response.status_code, 503)
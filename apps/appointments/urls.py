@@ -1,7 +1,23 @@
 from django.urls import path
-from .views import AppointmentListCreateView, AppointmentStatusUpdateView
+from .views import (
+    AppointmentBulkCreateView, AppointmentBulkStatusView, AppointmentEventTicketView, AppointmentListCreateView,
+    AppointmentStatusUpdateView, DoctorAvailabilityView, DoctorStatsView, RecommendationHealthView,
+    RecommendationView, SpecializationAvailabilityView, WaitlistListCreateView, WaitlistWithdrawView,
+    appointment_events,
+)
 
 urlpatterns = [
     path('', AppointmentListCreateView.as_view(), name='appointment-list-create'),
+    path('events/', appointment_events, name='appointment-events'),
+    path('events/ticket/', AppointmentEventTicketView.as_view(), name='appointment-event-ticket'),
+    path('waitlist/', WaitlistListCreateView.as_view(), name='waitlist-list-create'),
+    path('waitlist/<int:pk>/', WaitlistWithdrawView.as_view(), name='waitlist-withdraw'),
+    path('stats/', DoctorStatsView.as_view(), name='doctor-stats'),
+    path('bulk/', AppointmentBulkCreateView.as_view(), name='appointment-bulk-create'),
+    path('status/', AppointmentBulkStatusView.as_view(), name='appointment-bulk-status'),
+    path('recommendations/', RecommendationView.as_view(), name='recommendations'),
+    path('recommendations/health/', RecommendationHealthView.as_view(), name='recommendations-health'),
     path('<int:pk>/status/', AppointmentStatusUpdateView.as_view(), name='appointment-status-update'),
+    path('doctors/<int:pk>/availability/', DoctorAvailabilityView.as_view(), name='doctor-availability'),
+    path('specializations/<int:pk>/availability/', SpecializationAvailabilityView.as_view(), name='specialization-availability'),
 ]
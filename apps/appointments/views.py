@@ -1,35 +1,532 @@
+import asyncio
+import json
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from .models import Appointment
-from .serializers import AppointmentSerializer, AppointmentStatusSerializer
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from .models import Appointment, ArchivedAppointment, DoctorDailyStats, DoctorDaySlots, WaitlistEntry
+from .archive import ArchiveUnion
+from .events import get_broker, issue_stream_ticket, redeem_stream_ticket, user_channel
+from .pagination import AppointmentCursorPagination
+from .serializers import (
+    AppointmentSerializer, AppointmentStatusSerializer, BatchRecommendationSerializer, BulkAppointmentSerializer,
+    BulkStatusSerializer, RecommendationRequestSerializer, WaitlistEntrySerializer,
+)
+from .recommendations import ModelArtifactError, get_registry
+from .availability import earliest_free_slots, free_windows, opening_hours
+from apps.accounts.authentication import CachedJWTAuthentication
+from apps.accounts.conditional import conditional_get, make_etag
+from apps.accounts.models import CustomUser, DoctorProfile, Specialization
 
 class AppointmentListCreateView(generics.ListCreateAPIView):
+    """
+    Appointments of the requesting doctor or patient in schedule order, cursor-paginated.
+    Optional filters: ?from= and ?to= (inclusive ISO dates) and ?status= (comma-separated).
+    Archived appointments are included when ?from= is missing or before the archive horizon.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentCursorPagination
 
     def get_queryset(self):
+        return self.appointments_of_user(Appointment.objects.all())
+
+    def get_archived_queryset(self):
+        """
+        The matching archived appointments, or None when there are none to merge in.
+        A range that starts after the archive horizon never touches the archive table.
+        """
+        start = self.request.query_params.get('from')
+        if start and parse_date(start) >= ArchivedAppointment.objects.default_cutoff():
+            return None
+        archived = self.appointments_of_user(ArchivedAppointment.objects.all())
+        return archived if archived.exists() else None
+
+    def appointments_of_user(self, queryset):
         user = self.request.user
         if user.role == 'doctor':
-            return Appointment.objects.filter(doctor=user)
+            queryset = queryset.filter(doctor=user)
         elif user.role == 'patient':
-            return Appointment.objects.filter(patient=user)
-        return Appointment.objects.none()
+            queryset = queryset.filter(patient=user)
+        else:
+            return queryset.none()
+        return self.filter_appointments(queryset, self.request.query_params)
+
+    def filter_appointments(self, queryset, params):
+        errors = {}
+        for param, lookup in (('from', 'appointment_date__gte'), ('to', 'appointment_date__lte')):
+            if not params.get(param):
+                continue
+            try:
+                value = parse_date(params[param])
+            except ValueError:
+                value = None
+            if value is None:
+                errors[param] = "Must be a valid date (YYYY-MM-DD)."
+            else:
+                queryset = queryset.filter(**{lookup: value})
+        if params.get('status'):
+            statuses = [value.strip().upper() for value in params['status'].split(',') if value.strip()]
+            valid = {choice for choice, _ in Appointment.STATUS_CHOICES}
+            if not set(statuses) <= valid:
+                errors['status'] = f"Must be one or more of: {', '.join(sorted(valid))}."
+            else:
+                queryset = queryset.filter(status__in=statuses)
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def list_validators(self, request, *args, **kwargs):
+        """
+        Validators for the list: one aggregate query, no serialization.
+        The row count catches deletions that max(updated_at) alone would miss.
+        """
+        stats = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max('updated_at'), count=Count('id')
+        )
+        etag = make_etag(
+            'appointments', request.user.pk, stats['count'],
+            stats['last_modified'] and stats['last_modified'].isoformat(),
+            request.META.get('QUERY_STRING', ''),
+        )
+        return etag, stats['last_modified']
+
+    @conditional_get(list_validators)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        archived = self.get_archived_queryset()
+        if archived is not None:
+            queryset = ArchiveUnion(queryset, archived)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         # Automatically set patient from request
         serializer.save(patient=self.request.user)
 
+
+class AppointmentBulkCreateView(generics.GenericAPIView):
+    """
+    Book several slots with one doctor in a single request, from a list of slots or a
+    recurrence rule. Free slots are booked and conflicting ones reported, slot by slot.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BulkAppointmentSerializer
+
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'patient':
+            return Response(
+                {"detail": "Booking must be done by a patient."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        requested = [(slot['appointment_date'], slot['start_time'], slot['end_time']) for slot in data['slots']]
+        booked = Appointment.objects.book_many(
+            data['doctor'], request.user, requested, reason_for_visit=data.get('reason_for_visit')
+        )
+
+        results = []
+        for (day, start_time, end_time), appointment in zip(requested, booked):
+            result = {"appointment_date": day, "start_time": start_time, "end_time": end_time}
+            if appointment is None:
+                result.update(status="conflict", detail="The selected time slot is already booked.")
+            else:
+                result.update(status="booked", id=appointment.id)
+            results.append(result)
+        booked_count = sum(appointment is not None for appointment in booked)
+        return Response(
+            {"booked": booked_count, "conflicts": len(booked) - booked_count, "results": results},
+            status=status.HTTP_201_CREATED if booked_count else status.HTTP_409_CONFLICT
+        )
+
 class AppointmentStatusUpdateView(generics.UpdateAPIView):
+    """
+    Change the status of one of the requesting doctor's appointments, through the same
+    transition table and doctor lock as the bulk status change.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = AppointmentStatusSerializer
     queryset = Appointment.objects.all()
 
-    def patch(self, request, *args, **kwargs):
+    def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        if instance.doctor != request.user:
+        if instance.doctor_id != request.user.id:
             return Response(
                 {"detail": "You are not authorized to update this appointment."},
                 status=status.HTTP_403_FORBIDDEN
             )
-        return super().patch(request, *args, **kwargs)
+        serializer = self.get_serializer(instance, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        _, skipped = Appointment.objects.transition(request.user, [instance.pk], serializer.validated_data['status'])
+        if skipped:
+            return Response({"detail": skipped[instance.pk]}, status=status.HTTP_400_BAD_REQUEST)
+        instance.refresh_from_db()
+        return Response(self.get_serializer(instance).data)
+
+
+class AppointmentBulkStatusView(generics.GenericAPIView):
+    """
+    Set one status on many of the requesting doctor's appointments. Ids that are not the
+    doctor's, or whose current status cannot move to the target, are reported and left alone.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BulkStatusSerializer
+
+    def patch(self, request, *args, **kwargs):
+        if request.user.role != 'doctor':
+            return Response(
+                {"detail": "Only doctors can update appointment statuses."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        changed, skipped = Appointment.objects.transition(
+            request.user, serializer.validated_data['ids'], new_status
+        )
+        return Response({
+            "status": new_status,
+            "updated": changed,
+            "skipped": [{"id": pk, "detail": detail} for pk, detail in skipped.items()],
+        })
+
+
+class RecommendationView(APIView):
+    """
+    Recommended doctor and time slot, and whether demand peaks, for a patient request.
+    POST one request, or {"requests": [...]} to score many at once in a single model call.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            registry = get_registry().load()
+        except ModelArtifactError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        batch = isinstance(request.data, dict) and 'requests' in request.data
+        serializer_class = BatchRecommendationSerializer if batch else RecommendationRequestSerializer
+        serializer = serializer_class(data=request.data, context={'registry': registry})
+        serializer.is_valid(raise_exception=True)
+        patient_requests = serializer.validated_data['requests'] if batch else [serializer.validated_data]
+        results = registry.recommend(patient_requests)
+        if batch:
+            return Response({"model_version": registry.version, "results": results})
+        return Response({"model_version": registry.version, **results[0]})
+
+
+class RecommendationHealthView(APIView):
+    """
+    Memory of the worker serving the request: the whole process and, with the compiled
+    model, its mapped files, split into pages the worker holds alone and pages it shares.
+    Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_registry().memory())
+
+
+def parse_availability_window(params, max_days=90):
+    """
+    Read ?from=, ?to= (inclusive ISO dates) and ?duration= (minutes); raises ValueError.
+    """
+    try:
+        start_date = parse_date(params.get('from', ''))
+        end_date = parse_date(params.get('to', ''))
+        duration = int(params.get('duration', 30))
+    except ValueError:
+        raise ValueError("'from' and 'to' must be valid dates (YYYY-MM-DD) and 'duration' an integer.")
+    if start_date is None or end_date is None:
+        raise ValueError("'from' and 'to' must be valid dates (YYYY-MM-DD).")
+    if end_date < start_date:
+        raise ValueError("'to' must not be before 'from'.")
+    if (end_date - start_date).days >= max_days:
+        raise ValueError(f"The date range cannot exceed {max_days} days.")
+    if duration <= 0:
+        raise ValueError("'duration' must be a positive number of minutes.")
+    return start_date, end_date, duration
+
+
+class DoctorAvailabilityView(APIView):
+    """
+    Free windows of a doctor between ?from= and ?to= (inclusive, ISO dates) that fit
+    ?duration= minutes. One query fetches the SCHEDULED appointments of the range.
+    """
+    def get(self, request, pk, *args, **kwargs):
+        doctor = get_object_or_404(CustomUser.objects.only('id'), pk=pk, role='doctor')
+        try:
+            start_date, end_date, duration = parse_availability_window(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        opening, closing = opening_hours()
+        busy = Appointment.objects.filter(
+            doctor=doctor,
+            appointment_date__range=(start_date, end_date),
+            status='SCHEDULED',
+        ).order_by('appointment_date', 'start_time').values_list('appointment_date', 'start_time', 'end_time')
+        windows = free_windows(busy, start_date, end_date, duration, opening, closing, now=datetime.now())
+
+        return Response({
+            "doctor": doctor.id,
+            "from": start_date,
+            "to": end_date,
+            "duration": duration,
+            "days": [
+                {
+                    "date": day,
+                    "windows": [{"start": start, "end": end} for start, end in day_windows],
+                }
+                for day, day_windows in windows.items()
+            ],
+        })
+
+
+class SpecializationAvailabilityView(APIView):
+    """
+    Earliest ?limit= open slots of ?duration= minutes between ?from= and ?to= across
+    every doctor of a specialization, computed from the doctors' day bitmaps.
+    """
+    MAX_LIMIT = 100
+    FIRST_CHUNK_DAYS = 7
+
+    def get(self, request, pk, *args, **kwargs):
+        specialization = get_object_or_404(Specialization, pk=pk)
+        try:
+            start_date, end_date, duration = parse_availability_window(request.query_params)
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < limit <= self.MAX_LIMIT:
+            return Response(
+                {"detail": f"'limit' must be between 1 and {self.MAX_LIMIT}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        doctors = dict(
+            DoctorProfile.objects.filter(specializations=specialization).values_list('user_id', 'user__fullname')
+        )
+        opening, closing = opening_hours()
+        now = datetime.now()
+
+        # The earliest slots are nearly always in the first days, so scan the window
+        # in chunks that double in size and stop once enough slots are found
+        found = []
+        chunk_start, chunk_days = start_date, self.FIRST_CHUNK_DAYS
+        while doctors and chunk_start <= end_date and len(found) < limit:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            day_bitmaps = DoctorDaySlots.objects.filter(
+                doctor_id__in=list(doctors), date__range=(chunk_start, chunk_end)
+            ).values_list('doctor_id', 'date', 'bitmap')
+            found += earliest_free_slots(
+                list(doctors), day_bitmaps, chunk_start, chunk_end, duration, opening, closing,
+                limit - len(found), now=now
+            )
+            chunk_start, chunk_days = chunk_end + timedelta(days=1), chunk_days * 2
+        return Response({
+            "specialization": specialization.name,
+            "from": start_date,
+            "to": end_date,
+            "duration": duration,
+            "slots": [
+                {
+                    "doctor": doctor_id,
+                    "doctor_name": doctors[doctor_id],
+                    "date": day,
+                    "start": start,
+                    "end": end,
+                }
+                for day, start, end, doctor_id in found
+            ],
+        })
+
+
+class WaitlistListCreateView(generics.ListCreateAPIView):
+    """
+    Patients join a doctor's waitlist and see their entries; doctors see their queue in order.
+    A cancelled appointment is rebooked for the first waiting patient whose window fits it.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = WaitlistEntrySerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'doctor':
+            return WaitlistEntry.objects.filter(doctor=user, status='WAITING').order_by('created_at', 'id')
+        elif user.role == 'patient':
+            return WaitlistEntry.objects.filter(patient=user).order_by('-created_at')
+        return WaitlistEntry.objects.none()
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role != 'patient':
+            return Response(
+                {"detail": "Only patients can join a waitlist."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return super().create(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(patient=self.request.user)
+
+
+class WaitlistWithdrawView(generics.DestroyAPIView):
+    """
+    A patient leaves a waitlist. The entry is kept, marked WITHDRAWN.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return WaitlistEntry.objects.filter(patient=self.request.user, status='WAITING')
+
+    def perform_destroy(self, instance):
+        instance.status = 'WITHDRAWN'
+        instance.save(update_fields=['status', 'updated_at'])
+
+
+class DoctorStatsView(APIView):
+    """
+    Appointment counts and booked minutes per status and per day between ?from= and ?to=
+    (inclusive ISO dates, default: the current month), read from the daily totals table.
+    Doctors see their own numbers; staff pass ?doctor= with the doctor's id.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 366
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_staff and (request.user.role != 'doctor' or 'doctor' in request.query_params):
+            try:
+                doctor_id = int(request.query_params['doctor'])
+            except (KeyError, ValueError):
+                return Response({"detail": "'doctor' must be a doctor's id."}, status=status.HTTP_400_BAD_REQUEST)
+            doctor = get_object_or_404(CustomUser.objects.only('id'), pk=doctor_id, role='doctor')
+        elif request.user.role == 'doctor':
+            doctor = request.user
+        else:
+            return Response({"detail": "Only doctors have appointment statistics."}, status=status.HTTP_403_FORBIDDEN)
+
+        params = request.query_params
+        try:
+            start_date = parse_date(params['from']) if params.get('from') else date.today().replace(day=1)
+            end_date = parse_date(params['to']) if params.get('to') else None
+        except ValueError:
+            start_date = None
+        if start_date is not None and not params.get('to'):
+            end_date = start_date.replace(day=monthrange(start_date.year, start_date.month)[1])
+        if start_date is None or end_date is None:
+            return Response({"detail": "'from' and 'to' must be valid dates (YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date or (end_date - start_date).days >= self.MAX_DAYS:
+            return Response(
+                {"detail": f"'to' must be on or after 'from' and the range cannot exceed {self.MAX_DAYS} days."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+        totals = {name: {"count": 0, "booked_minutes": 0} for name in statuses}
+        days = {}
+        for day, day_status, count, minutes in DoctorDailyStats.objects.filter(
+            doctor=doctor, date__range=(start_date, end_date)
+        ).order_by('date').values_list('date', 'status', 'count', 'booked_minutes'):
+            totals[day_status]["count"] += count
+            totals[day_status]["booked_minutes"] += minutes
+            entry = days.setdefault(day, {"date": day, **dict.fromkeys(statuses, 0), "booked_minutes": 0})
+            entry[day_status] = count
+            entry["booked_minutes"] += minutes
+
+        appointments = sum(total["count"] for total in totals.values())
+        return Response({
+            "doctor": doctor.id,
+            "from": start_date,
+            "to": end_date,
+            "appointments": appointments,
+            "cancellation_rate": totals["CANCELLED"]["count"] / appointments if appointments else 0.0,
+            "totals": totals,
+            "days": list(days.values()),
+        })
+
+
+STREAM_UNAVAILABLE = "Live events need the ASGI server; poll the appointment list instead."
+
+
+class AppointmentEventTicketView(APIView):
+    """
+    A stream ticket for /api/events/?ticket=, valid for a few seconds and accepted once,
+    so the access token never appears in a URL. 501 when the stream is not served.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request._request, ASGIRequest):
+            return Response({"detail": STREAM_UNAVAILABLE}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response({"ticket": issue_stream_ticket(request.user.id)})
+
+
+def stream_user(request):
+    """
+    The user of a JWT given in the Authorization header or, because EventSource cannot
+    send headers, of a stream ticket in ?ticket=. None if neither is valid.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        user_id = redeem_stream_ticket(request.GET.get('ticket', ''))
+        return CustomUser.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    raw_token = authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def appointment_event_stream(channel, heartbeat=15):
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+    finally:
+        subscription.close()
+
+
+async def appointment_events(request):
+    """
+    Server-sent events for the requesting user's appointments: ``appointment.created`` and
+    ``appointment.status_changed``, as they commit. Needs an ASGI server (e.g. uvicorn
+    config.asgi:application): under WSGI Django reads the whole of an async stream before
+    sending any of it, so an endless one would hold a worker forever. Answers 501 there.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": STREAM_UNAVAILABLE}, status=501)
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+    response = StreamingHttpResponse(appointment_event_stream(user_channel(user.id)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
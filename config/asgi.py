@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Load the recommendation model before a pre-forking server starts its workers
+from apps.appointments.recommendations import preload  # noqa: E402
+
+preload()
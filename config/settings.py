@@ -79,10 +79,58 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Per-process cache of JWT-authenticated users (see apps/accounts/cache.py). Saves retire the
+# entries of other workers through a version stamp in CACHES['default']; with the LocMemCache
+# below that stamp is per process as well, so other workers may serve a stale user until the TTL.
+AUTH_USER_CACHE_MAX_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60  # seconds
+
+# Caches
+# Point 'default' at a shared backend (Redis, Memcached, a shared file path) in production
+# so that workers share cached responses and invalidation stamps.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Rendered JSON of the doctor directory and specialization list (see apps/accounts/cache.py)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300  # seconds, shared tier
+RESPONSE_CACHE_LOCAL_MAX_SIZE = 256  # entries, per process
+RESPONSE_CACHE_LOCAL_TTL = 30  # seconds, per process
+
+# Hours within which free appointment windows are offered (see apps/appointments/availability.py)
+CLINIC_OPENING_TIME = '09:00'
+CLINIC_CLOSING_TIME = '17:00'
+
+# Completed and cancelled appointments older than this move to the archive table
+# (manage.py archive_appointments)
+APPOINTMENT_ARCHIVE_AFTER_DAYS = 365
+
+# Live dashboard events (apps/appointments/events.py). InProcessBroker serves one ASGI worker;
+# with several workers use CacheBroker over a cache they all share.
+APPOINTMENT_EVENTS_BROKER = 'apps.appointments.events.InProcessBroker'
+APPOINTMENT_EVENTS_CACHE_ALIAS = 'default'
+
+# Patients are emailed this long before a scheduled appointment (manage.py send_appointment_reminders)
+APPOINTMENT_REMINDER_LEAD_MINUTES = 24 * 60
+
+# Artifacts of the recommendation model (apps/appointments/recommendations.py), as saved by
+# model.ipynb. Files missing from the directory are read from the archive.
+RECOMMENDATION_MODEL_DIR = BASE_DIR / 'apps' / 'appointments' / 'models' / 'new'
+RECOMMENDATION_MODEL_ARCHIVE = BASE_DIR / 'apps' / 'appointments' / 'models' / 'new.zip'
+# The forest compiled into memory-mapped arrays (manage.py compile_recommendation_model),
+# used instead of the model pickle once it exists
+RECOMMENDATION_COMPILED_MODEL_DIR = BASE_DIR / 'apps' / 'appointments' / 'models' / 'compiled'
+# Load the model when config/wsgi.py or config/asgi.py is imported, so pre-forking servers
+# share one copy between their workers
+RECOMMENDATION_PRELOAD = True
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
@@ -103,6 +151,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so check-then-insert transactions
+            # (appointment booking) cannot interleave; wait up to 20s for it.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # A file rather than shared-cache memory, so concurrent test threads
+            # lock the database the same way production workers do.
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 